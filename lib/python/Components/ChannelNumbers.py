@@ -0,0 +1,126 @@
+from os import stat
+from time import monotonic
+
+from enigma import eServiceCenter, eServiceReference
+
+from Components.config import config
+
+BOUQUET_DIR = "/etc/enigma2/"
+# Bouquets written by a new file or a rename change the mtime of the directory, new or
+# removed bouquets change the top level bouquet files.
+BOUQUET_FILES = ("", "bouquets.tv", "bouquets.radio")
+CHECK_INTERVAL = 1  # seconds, the bouquet files are checked at most this often
+
+
+class ChannelNumbers:
+	"""Channel number index of the bouquets below a bouquet root.
+
+	For every bouquet root the index holds the first service of each channel number
+	over all visible bouquets, the first service of each channel number within every
+	bouquet and the number offset of every bouquet.  An index is built on its first
+	use and built again when the numbering settings or the bouquet directory and the
+	top level bouquet files change.  Code that changes a bouquet in place should call
+	invalidate() afterwards, this also takes effect at once.
+	"""
+	def __init__(self):
+		self.indexes = {}  # root -> (signature, index)
+		self.files = None  # (mtime, size) of BOUQUET_FILES
+		self.checked = 0
+
+	def invalidate(self):
+		self.indexes.clear()
+		self.files = None
+
+	def getFiles(self):
+		# Lookups come in bursts, like one per row of a list, so the files are only
+		# checked once per CHECK_INTERVAL.
+		now = monotonic()
+		if self.files is None or now - self.checked >= CHECK_INTERVAL:
+			files = []
+			for file in BOUQUET_FILES:
+				try:
+					st = stat(BOUQUET_DIR + file)
+					files.append((st.st_mtime_ns, st.st_size))
+				except OSError:
+					files.append(None)
+			self.files = tuple(files)
+			self.checked = now
+		return self.files
+
+	def getSignature(self):
+		return (config.usage.multibouquet.value, config.usage.alternative_number_mode.value, self.getFiles())
+
+	def getIndex(self, root):
+		key = root.toCompareString()
+		signature = self.getSignature()
+		index = self.indexes.get(key)
+		if index is None or index[0] != signature:
+			index = self.indexes[key] = (signature, self.buildIndex(root))
+		return index[1]
+
+	def buildIndex(self, root):
+		# Returns (numbers, bouquets, offsets, first) with numbers {number: (service, bouquet)},
+		# bouquets {bouquet: {number: service}}, offsets {bouquet: offset} and the first
+		# visible bouquet.
+		serviceHandler = eServiceCenter.getInstance()
+		numbers = {}
+		bouquets = {}
+		offsets = {}
+		first = None
+
+		def addBouquet(bouquet, visible):
+			services = {}
+			offset = None
+			servicelist = serviceHandler.list(bouquet)
+			if servicelist:
+				service = servicelist.getNext()
+				while service.valid():
+					number = service.getChannelNum()
+					if number not in services:
+						services[number] = service
+						if visible and number not in numbers:
+							numbers[number] = (service, bouquet)
+					if offset is None and number > 0:
+						offset = number - 1
+					service = servicelist.getNext()
+			key = bouquet.toCompareString()
+			bouquets[key] = services
+			offsets[key] = offset or 0
+
+		if config.usage.multibouquet.value:
+			bouquetlist = serviceHandler.list(root)
+			if bouquetlist:
+				bouquet = bouquetlist.getNext()
+				while bouquet.valid():
+					if bouquet.flags & eServiceReference.isDirectory:
+						visible = not bouquet.flags & eServiceReference.isInvisible
+						if visible and first is None:
+							first = bouquet
+						addBouquet(bouquet, visible)
+					bouquet = bouquetlist.getNext()
+		else:
+			addBouquet(root, False)
+		return numbers, bouquets, offsets, first
+
+	def getService(self, root, bouquet, number):
+		# Returns the first service with the number in the bouquet, None if the bouquet
+		# has no such service or is not indexed.
+		services = self.getIndex(root)[1].get(bouquet.toCompareString())
+		return None if services is None else services.get(number)
+
+	def isIndexed(self, root, bouquet):
+		return bouquet.toCompareString() in self.getIndex(root)[1]
+
+	def getFirstService(self, root, number):
+		# Returns (service, bouquet) of the first visible bouquet holding the number or (None, None).
+		return self.getIndex(root)[0].get(number, (None, None))
+
+	def getFirstBouquet(self, root):
+		return self.getIndex(root)[3]
+
+	def getBouquetNumOffset(self, root, bouquet):
+		# Returns None if the bouquet is not indexed.
+		return self.getIndex(root)[2].get(bouquet.toCompareString())
+
+
+channelNumbers = ChannelNumbers()
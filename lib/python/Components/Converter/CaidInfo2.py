@@ -4,16 +4,14 @@
 # Update By RAED for python3
 from Components.Converter.Converter import Converter
 from enigma import iServiceInformation, iPlayableService
-from Tools.Directories import fileExists
 from Components.Element import cached
-from Components.Converter.Poll import Poll
-import os
+from Tools.GetEcmInfo import ecmInfoMonitor
 
 info = {}
 old_ecm_mtime = None
 
 
-class CaidInfo2(Poll, Converter, object):
+class CaidInfo2(Converter, object):
 	CAID = 0
 	PID = 1
 	PROV = 2
@@ -53,12 +51,11 @@ class CaidInfo2(Poll, Converter, object):
 	IS_FTA = 36
 	IS_CRYPTED = 37
 	CRYPT3 = 38
-	my_interval = 1000
 
 
 	def __init__(self, type):
-		Poll.__init__(self)
 		Converter.__init__(self, type)
+		self.ecmWatched = False
 		if type == "CAID":
 			self.type = self.CAID
 		elif type == "PID":
@@ -245,8 +242,6 @@ class CaidInfo2(Poll, Converter, object):
 					if ("%0.4X" % int(caid))[:2] == "26":
 						return True
 				return False
-			self.poll_interval = self.my_interval
-			self.poll_enabled = True
 			ecm_info = self.ecmfile()
 			if ecm_info:
 				caid = ("%0.4X" % int(ecm_info.get("caid", ""), 16))[:2]
@@ -334,10 +329,8 @@ class CaidInfo2(Poll, Converter, object):
 		service = self.source.service
 		if service:
 			if self.type == self.CRYPT2:
-				self.poll_interval = self.my_interval
-				self.poll_enabled = True
 				ecm_info = self.ecmfile()
-				if fileExists("/tmp/ecm.info"):
+				if ecmInfoMonitor.getSnapshot()[0] is not None:
 					try:
 						caid = "%0.4X" % int(ecm_info.get("caid", ""), 16)
 						return "%s" % self.systemTxtCaids.get(caid[:2])
@@ -346,10 +339,8 @@ class CaidInfo2(Poll, Converter, object):
 				else:
 					return 'FTA'
 			if self.type == self.CRYPT3:
-				self.poll_interval = self.my_interval
-				self.poll_enabled = True
 				ecm_info = self.ecmfile()
-				if fileExists("/tmp/ecm.info"):
+				if ecmInfoMonitor.getSnapshot()[0] is not None:
 					try:
 						caid = "%0.4X" % int(ecm_info.get("caid", ""), 16)
 						return "%s" % self.systemCaids.get(caid[:2])
@@ -361,8 +352,6 @@ class CaidInfo2(Poll, Converter, object):
 			info = service and service.info()
 			if info:
 				if info.getInfoObject(iServiceInformation.sCAIDs):
-					self.poll_interval = self.my_interval
-					self.poll_enabled = True
 					ecm_info = self.ecmfile()
 					# crypt2
 					if ecm_info:
@@ -515,23 +504,21 @@ class CaidInfo2(Poll, Converter, object):
 	def ecmfile(self):
 		global info
 		global old_ecm_mtime
-		ecm = None
+		if not self.ecmWatched:
+			self.ecmWatched = True
+			if not self.suspended:
+				ecmInfoMonitor.connectCallback(self.ecmChanged)
 		service = self.source.service
 		if service:
-			try:
-				ecm_mtime = os.stat("/tmp/ecm.info").st_mtime
-				if not os.stat("/tmp/ecm.info").st_size > 0:
-					info = {}
-				if ecm_mtime == old_ecm_mtime:
-					return info
-				old_ecm_mtime = ecm_mtime
-				# ecmf = open("/tmp/ecm.info", "rb")
-				ecmf = open("/tmp/ecm.info", "r")  # Fix Python3 (TypeError: a bytes-like object is required, not 'str' )
-				ecm = ecmf.readlines()
-			except:
+			ecm_mtime, ecm = ecmInfoMonitor.getSnapshot()
+			if ecm_mtime is None:
 				old_ecm_mtime = None
 				info = {}
 				return info
+			if ecm_mtime == old_ecm_mtime:
+				return info
+			old_ecm_mtime = ecm_mtime
+			info = {}
 
 			if ecm:
 				for line in ecm:
@@ -634,8 +621,21 @@ class CaidInfo2(Poll, Converter, object):
 										info["pid"] = line[x + 4:y]
 									elif z != -1:
 										info["pid"] = line[x + 4:z]
-				ecmf.close()
 		return info
 
+	def ecmChanged(self):
+		self.changed((self.CHANGED_POLL,))
+
+	def doSuspend(self, suspended):
+		if self.ecmWatched:
+			if suspended:
+				ecmInfoMonitor.disconnectCallback(self.ecmChanged)
+			else:
+				ecmInfoMonitor.connectCallback(self.ecmChanged)
+				self.ecmChanged()
+
+	def destroy(self):
+		ecmInfoMonitor.disconnectCallback(self.ecmChanged)
+
 	def changed(self, what):
 		Converter.changed(self, (self.CHANGED_POLL,))
@@ -7,6 +7,8 @@ from ServiceReference import ServiceReference
 
 
 class ClientsStreaming(Converter, Poll):
+	POLL_WHILE_SUSPENDED = True
+
 	UNKNOWN = -1
 	REF = 0
 	IP = 1
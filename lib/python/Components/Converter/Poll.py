@@ -1,19 +1,101 @@
+from time import monotonic, perf_counter
+from traceback import print_exc
+from weakref import WeakKeyDictionary
+
 from enigma import eTimer
 
 
+class PollScheduler:
+	"""Runs the polls of all Poll instances.
+
+	Instances with the same interval share one timer and the ticks of every interval are
+	aligned to multiples of that interval, so one main loop wakeup serves all instances
+	that are due.  Suspended elements are skipped and the time spent in every poll is
+	counted, see getStats().
+	"""
+	def __init__(self):
+		self.buckets = {}  # interval -> (timer, {poller: None})
+		self.stats = WeakKeyDictionary()  # poller -> [polls, seconds]
+
+	def add(self, poller, interval):
+		bucket = self.buckets.get(interval)
+		if bucket is None:
+			timer = eTimer()
+			timer.callback.append(lambda: self.tick(interval))
+			bucket = self.buckets[interval] = (timer, WeakKeyDictionary())
+			self.startTimer(interval)
+		bucket[1][poller] = None
+
+	def remove(self, poller, interval):
+		bucket = self.buckets.get(interval)
+		if bucket is not None:
+			bucket[1].pop(poller, None)
+			if not bucket[1]:
+				bucket[0].stop()
+				del self.buckets[interval]
+
+	def startTimer(self, interval):
+		delay = interval - int(monotonic() * 1000) % interval if interval > 0 else 0
+		self.buckets[interval][0].start(delay, True)
+
+	def tick(self, interval):
+		bucket = self.buckets.get(interval)
+		if bucket is None:
+			return
+		pollers = bucket[1]
+		for poller in list(pollers.keys()):
+			if poller not in pollers:  # removed by an earlier poll
+				continue
+			if getattr(poller, "suspended", False) and not poller.POLL_WHILE_SUSPENDED:
+				continue
+			start = perf_counter()
+			try:
+				poller.poll()
+			except Exception:
+				print("[Poll] Error: Poll of %s failed!" % poller.__class__.__name__)
+				print_exc()
+			stats = self.stats.get(poller)
+			if stats is None:
+				stats = self.stats[poller] = [0, 0.0]
+			stats[0] += 1
+			stats[1] += perf_counter() - start
+		if not pollers:  # the remaining instances were garbage collected
+			self.buckets.pop(interval, None)
+		elif interval in self.buckets:
+			self.startTimer(interval)
+
+	def getStats(self):
+		# Returns (name, interval, polls, seconds) for all active pollers, most expensive first.
+		stats = []
+		for interval, (timer, pollers) in self.buckets.items():
+			for poller in pollers.keys():
+				polls, seconds = self.stats.get(poller, (0, 0.0))
+				stats.append((poller.__class__.__name__, interval, polls, seconds))
+		return sorted(stats, key=lambda x: -x[3])
+
+
+pollScheduler = PollScheduler()
+
+
 class Poll:
+	POLL_WHILE_SUSPENDED = False  # set by converters which keep polling while their screen is not shown
+
 	def __init__(self):
-		self.__poll_timer = eTimer()
-		self.__poll_timer.callback.append(self.poll)
 		self.__interval = 1000
 		self.__enabled = False
+		self.__scheduled = None  # interval of the bucket this instance is polled in
+
+	def __schedule(self, interval):
+		if interval != self.__scheduled:
+			if self.__scheduled is not None:
+				pollScheduler.remove(self, self.__scheduled)
+			self.__scheduled = interval
+			if interval is not None:
+				pollScheduler.add(self, interval)
 
 	def __setInterval(self, interval):
 		self.__interval = interval
-		if self.__enabled:
-			self.__poll_timer.start(self.__interval)
-		else:
-			self.__poll_timer.stop()
+		self.__schedule(self.__interval if self.__enabled else None)
 
 	def __setEnable(self, enabled):
 		self.__enabled = enabled
@@ -28,10 +110,10 @@ class Poll:
 	def doSuspend(self, suspended):
 		if self.__enabled:
 			if suspended:
-				self.__poll_timer.stop()
+				self.__schedule(None)
 			else:
 				self.poll()
 				self.poll_enabled = True
 
 	def destroy(self):
-		self.__poll_timer.callback.remove(self.poll)
+		self.__schedule(None)
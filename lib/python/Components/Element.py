@@ -1,7 +1,42 @@
 from functools import reduce
+from traceback import print_exc
+
+from enigma import eTimer
 
 from Tools.CList import CList
 
+changeCounters = {}  # element class name -> [changes received, changes delivered] of the elements batching their changes
+pendingChanges = {}  # element -> change waiting for the end of the main loop iteration, dropped when the element is disconnected
+flushTimer = None
+
+
+def getChangeCounters():
+	# Returns (class name, received, delivered) for all batching element classes, busiest first.
+	return sorted(((name, counters[0], counters[1]) for name, counters in changeCounters.items()), key=lambda x: -x[1])
+
+
+def mergeChanges(old, new):
+	# The strongest change wins.  Two different specific changes become a full change.
+	if old == new:
+		return old
+	rank = CHANGE_RANK.get(new[0], 0) - CHANGE_RANK.get(old[0], 0)
+	if rank == 0 and new[0] == Element.CHANGED_SPECIFIC:
+		return (Element.CHANGED_ALL,)
+	return new if rank >= 0 else old
+
+
+def flushChanges():
+	while pendingChanges:  # delivering a change may queue new ones further down
+		changes = list(pendingChanges.items())
+		pendingChanges.clear()
+		for element, what in changes:
+			changeCounters[element.__class__.__name__][1] += 1
+			try:
+				element.changed(what)
+			except Exception:
+				print("[Element] Error: Delivering change %s to %s failed!" % (str(what), element.__class__.__name__))
+				print_exc()
+
 
 # Render (Down) - Converter - Converter - Source (Up)
 # A bidirectional connection.
@@ -14,6 +49,7 @@ class Element:
 	CHANGED_POLL = 4  # A timer has expired.
 
 	SINGLE_SOURCE = True
+	BATCH_CHANGES = False  # Collect the changes pushed to this element and deliver the strongest once per main loop iteration.
 
 	def __init__(self):
 		self.downstream_elements = CList()
@@ -42,6 +78,7 @@ class Element:
 	def disconnectAll(self):  # We disconnect from down (Renderer) to up (Source).
 		# We should not disconnect from upstream if there are still elements depending on us.
 		assert len(self.downstream_elements) == 0, "there are still downstream elements left"
+		pendingChanges.pop(self, None)
 		for source in self.sources:  # Sources don't have a source themselves. don't do anything here.
 			source.disconnectDownstream(self)
 		if self.source:  # Sources are owned by the Screen, so don't destroy them here.
@@ -57,8 +94,23 @@ class Element:
 			self.disconnectAll()
 
 	def changed(self, *args, **kwargs):  # The default action is to push downstream.
+		global flushTimer
 		self.cache = {}
-		self.downstream_elements.changed(*args, **kwargs)
+		for element in self.downstream_elements:
+			if element.BATCH_CHANGES and len(args) == 1 and isinstance(args[0], tuple) and not kwargs:
+				counters = changeCounters.get(element.__class__.__name__)
+				if counters is None:
+					counters = changeCounters[element.__class__.__name__] = [0, 0]
+				counters[0] += 1
+				what = pendingChanges.get(element)
+				pendingChanges[element] = args[0] if what is None else mergeChanges(what, args[0])
+				if flushTimer is None:
+					flushTimer = eTimer()
+					flushTimer.callback.append(flushChanges)
+				if not flushTimer.isActive():
+					flushTimer.start(0, True)
+			else:
+				element.changed(*args, **kwargs)
 		self.cache = None
 
 	def setSuspend(self, suspended):
@@ -81,7 +133,16 @@ class Element:
 		pass
 
 	def destroy(self):
-		pass
+		pendingChanges.pop(self, None)
+
+
+CHANGE_RANK = {
+	Element.CHANGED_CLEAR: 0,
+	Element.CHANGED_POLL: 1,
+	Element.CHANGED_SPECIFIC: 2,
+	Element.CHANGED_DEFAULT: 3,
+	Element.CHANGED_ALL: 4
+}
 
 
 class ElementError(Exception):
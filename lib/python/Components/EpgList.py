@@ -16,6 +16,7 @@ EPG_TYPE_SINGLE = 0
 EPG_TYPE_MULTI = 1
 EPG_TYPE_SIMILAR = 2
 EPG_TYPE_PARTIAL = 3
+TIME_TEXT_LIMIT = 4096  # memo entries kept before a memo is started again
 
 
 class Rect:
@@ -83,6 +84,10 @@ class EPGList(GUIComponent):
 			"_post"
 		)
 		self.clocks = tuple(LoadPixmap(cached=True, path=resolveFilename(SCOPE_GUISKIN, "icons/%s%s.png" % (m, a))) for m in main_icons for a in add_icons)
+		self.timeTexts = {}  # (format, minute) -> formatted time
+		self.clockTypes = {}  # (service, eventId, beginTime, duration) -> clock types
+		self.rowCache = {}  # entry -> built row, single and similar lists only
+		self.cacheState = None
 
 	def getEventFromId(self, service, eventid):
 		event = None
@@ -151,6 +156,7 @@ class EPGList(GUIComponent):
 			pass
 		self.space = self.iconSize + self.iconDistance
 		self.dy = int((height - self.iconSize) / 2.)
+		self.rowCache = {}
 
 		if self.type == EPG_TYPE_SINGLE:
 			if self.skinColumns:
@@ -200,28 +206,71 @@ class EPGList(GUIComponent):
 	def gap(self, width):
 		return width - self.colGap
 
+	def formatTime(self, format, timestamp):
+		# The same times show up in many rows, so the texts are kept per minute.
+		key = (format, timestamp if "%S" in format else timestamp // 60)
+		text = self.timeTexts.get(key)
+		if text is None:
+			if len(self.timeTexts) >= TIME_TEXT_LIMIT:
+				self.timeTexts = {}
+			text = self.timeTexts[key] = strftime(format, localtime(timestamp))
+		return text
+
+	def validateCache(self):
+		# Built rows and clock types are only valid for the timers and formats they were made with.
+		state = (self.timer.timerGeneration, config.usage.date.dayshort.value, config.usage.time.short.value)
+		if state != self.cacheState:
+			self.cacheState = state
+			self.clockTypes = {}
+			self.rowCache = {}
+
+	def prepareClockTypes(self, events):
+		# Settles the clock icons of a whole event list at once: all events of a service which
+		# has no timers in the time span of those events need no lookup of their own.
+		self.validateCache()
+		if len(self.clockTypes) >= TIME_TEXT_LIMIT:
+			self.clockTypes = {}
+		spans = {}
+		for service, eventId, beginTime, duration in events:
+			if service and beginTime:
+				span = spans.get(service)
+				if span is None:
+					span = spans[service] = [beginTime, beginTime + duration, []]
+				else:
+					span[0] = min(span[0], beginTime)
+					span[1] = max(span[1], beginTime + duration)
+				span[2].append((service, eventId, beginTime, duration))
+		for service, (begin, end, keys) in spans.items():
+			if not self.timer.getServiceTimers(":".join(service.split(":")[:11]), begin, end):
+				for key in keys:
+					self.clockTypes[key] = None
+
 	def getClockTypesForEntry(self, service, eventId, beginTime, duration):
 		if not beginTime:
 			return None
+		key = (service, eventId, beginTime, duration)
+		if key in self.clockTypes:
+			return self.clockTypes[key]
 		rec = self.timer.isInTimer(eventId, beginTime, duration, service)
-		if rec is not None:
-			return rec[1]
-		else:
-			return None
+		clockTypes = self.clockTypes[key] = rec[1] if rec is not None else None
+		return clockTypes
 
 	def buildSingleEntry(self, service, eventId, beginTime, duration, EventName):
+		self.validateCache()
+		key = (service, eventId, beginTime, duration, EventName)
+		res = self.rowCache.get(key)
+		if res is not None:
+			return res
 		clock_types = self.getClockTypesForEntry(service, eventId, beginTime, duration)
 		r1 = self.weekday_rect
 		r2 = self.datetime_rect
 		r3 = self.descr_rect
 		split = int(r2.w * 0.55)
-		t = localtime(beginTime)
-		et = localtime(beginTime + duration)
-		res = [
+		res = self.rowCache[key] = [
 			None,  # no private data needed
-			(eListboxPythonMultiContent.TYPE_TEXT, r1.x, r1.y, r1.w, r1.h, 0, RT_HALIGN_LEFT | RT_VALIGN_CENTER, strftime(config.usage.date.dayshort.value, t)),
-			(eListboxPythonMultiContent.TYPE_TEXT, r2.x, r2.y, split, r2.h, 0, RT_HALIGN_RIGHT | RT_VALIGN_CENTER, strftime(config.usage.time.short.value + " -", t)),
-			(eListboxPythonMultiContent.TYPE_TEXT, r2.x + split, r2.y, r2.w - split, r2.h, 0, RT_HALIGN_RIGHT | RT_VALIGN_CENTER, strftime(config.usage.time.short.value, et))
+			(eListboxPythonMultiContent.TYPE_TEXT, r1.x, r1.y, r1.w, r1.h, 0, RT_HALIGN_LEFT | RT_VALIGN_CENTER, self.formatTime(config.usage.date.dayshort.value, beginTime)),
+			(eListboxPythonMultiContent.TYPE_TEXT, r2.x, r2.y, split, r2.h, 0, RT_HALIGN_RIGHT | RT_VALIGN_CENTER, self.formatTime(config.usage.time.short.value + " -", beginTime)),
+			(eListboxPythonMultiContent.TYPE_TEXT, r2.x + split, r2.y, r2.w - split, r2.h, 0, RT_HALIGN_RIGHT | RT_VALIGN_CENTER, self.formatTime(config.usage.time.short.value, beginTime + duration))
 		]
 		if clock_types:
 			for i in range(len(clock_types)):
@@ -232,18 +281,21 @@ class EPGList(GUIComponent):
 		return res
 
 	def buildSimilarEntry(self, service, eventId, beginTime, service_name, duration):
+		self.validateCache()
+		key = (service, eventId, beginTime, service_name, duration)
+		res = self.rowCache.get(key)
+		if res is not None:
+			return res
 		clock_types = self.getClockTypesForEntry(service, eventId, beginTime, duration)
 		r1 = self.weekday_rect
 		r2 = self.datetime_rect
 		r3 = self.service_rect
 		split = int(r2.w * 0.55)
-		t = localtime(beginTime)
-		et = localtime(beginTime + duration)
-		res = [
+		res = self.rowCache[key] = [
 			None,  # no private data needed
-			(eListboxPythonMultiContent.TYPE_TEXT, r1.x, r1.y, r1.w, r1.h, 0, RT_HALIGN_LEFT | RT_VALIGN_CENTER, strftime(config.usage.date.dayshort.value, t)),
-			(eListboxPythonMultiContent.TYPE_TEXT, r2.x, r2.y, split, r2.h, 0, RT_HALIGN_RIGHT | RT_VALIGN_CENTER, strftime(config.usage.time.short.value + " -", t)),
-			(eListboxPythonMultiContent.TYPE_TEXT, r2.x + split, r2.y, r2.w - split, r2.h, 0, RT_HALIGN_RIGHT | RT_VALIGN_CENTER, strftime(config.usage.time.short.value, et))
+			(eListboxPythonMultiContent.TYPE_TEXT, r1.x, r1.y, r1.w, r1.h, 0, RT_HALIGN_LEFT | RT_VALIGN_CENTER, self.formatTime(config.usage.date.dayshort.value, beginTime)),
+			(eListboxPythonMultiContent.TYPE_TEXT, r2.x, r2.y, split, r2.h, 0, RT_HALIGN_RIGHT | RT_VALIGN_CENTER, self.formatTime(config.usage.time.short.value + " -", beginTime)),
+			(eListboxPythonMultiContent.TYPE_TEXT, r2.x + split, r2.y, r2.w - split, r2.h, 0, RT_HALIGN_RIGHT | RT_VALIGN_CENTER, self.formatTime(config.usage.time.short.value, beginTime + duration))
 		]
 		if clock_types:
 			for i in range(len(clock_types)):
@@ -254,6 +306,7 @@ class EPGList(GUIComponent):
 		return res
 
 	def buildMultiEntry(self, changecount, service, eventId, beginTime, duration, EventName, nowTime, service_name):
+		self.validateCache()
 		clock_types = self.getClockTypesForEntry(service, eventId, beginTime, duration)
 		r1 = self.service_rect
 		r2 = self.progress_rect
@@ -267,12 +320,10 @@ class EPGList(GUIComponent):
 			res.append((eListboxPythonMultiContent.TYPE_TEXT, r1.x, r1.y, r1.w, r1.h, 0, RT_HALIGN_LEFT | RT_VALIGN_CENTER, service_name))
 		if beginTime is not None:
 			if nowTime < beginTime:
-				begin = localtime(beginTime)
-				end = localtime(beginTime + duration)
 				split = int(r2.w * 0.55)
 				res.extend((
-					(eListboxPythonMultiContent.TYPE_TEXT, r2.x, r2.y, split, r2.h, 0, RT_HALIGN_RIGHT | RT_VALIGN_CENTER, strftime(config.usage.time.short.value + "- ", begin)),
-					(eListboxPythonMultiContent.TYPE_TEXT, r2.x + split, r2.y, r2.w - split, r2.h, 0, RT_HALIGN_LEFT | RT_VALIGN_CENTER, strftime(config.usage.time.short.value, end)),
+					(eListboxPythonMultiContent.TYPE_TEXT, r2.x, r2.y, split, r2.h, 0, RT_HALIGN_RIGHT | RT_VALIGN_CENTER, self.formatTime(config.usage.time.short.value + "- ", beginTime)),
+					(eListboxPythonMultiContent.TYPE_TEXT, r2.x + split, r2.y, r2.w - split, r2.h, 0, RT_HALIGN_LEFT | RT_VALIGN_CENTER, self.formatTime(config.usage.time.short.value, beginTime + duration)),
 					(eListboxPythonMultiContent.TYPE_TEXT, r3.x + self.tw, r3.y, r3.w, r3.h, 0, RT_HALIGN_LEFT | RT_VALIGN_CENTER, EventName)
 				))
 			else:
@@ -301,6 +352,7 @@ class EPGList(GUIComponent):
 		test = [(service.ref.toString(), 0, stime) for service in services]
 		test.insert(0, 'X0RIBDTCn')
 		self.list = self.queryEPG(test)
+		self.prepareClockTypes((x[1], x[2], x[3], x[4]) for x in self.list)
 		self.l.setList(self.list)
 		# print(time() - t)
 		self.selectionChanged()
@@ -317,6 +369,7 @@ class EPGList(GUIComponent):
 				if x[2] is not None:
 					self.list[cnt] = (changecount, x[0], x[1], x[2], x[3], x[4], x[5], x[6])
 			cnt += 1
+		self.prepareClockTypes((x[1], x[2], x[3], x[4]) for x in self.list)
 		self.l.setList(self.list)
 		# print(time() - t)
 		self.selectionChanged()
@@ -326,6 +379,7 @@ class EPGList(GUIComponent):
 		epg_time = t - config.epg.histminutes.getValue() * 60
 		test = ['RIBDT', (service.ref.toString(), 0, epg_time, -1)]
 		self.list = self.queryEPG(test)
+		self.prepareClockTypes((x[0], x[1], x[2], x[3]) for x in self.list)
 		self.l.setList(self.list)
 		if t != epg_time:
 			idx = 0
@@ -386,6 +440,7 @@ class EPGList(GUIComponent):
 	def fill_list(self, event_list):
 		if event_list and len(event_list):
 			event_list.sort(key=lambda x: x[2])
+			self.prepareClockTypes((x[0], x[1], x[2], x[4]) for x in event_list)
 		self.l.setList(event_list)
 		self.selectionChanged()
 
@@ -56,20 +56,28 @@ def getFolderSize(path):
 		st = os.lstat(path)
 		return (st.st_size, st.st_blocks * 512)
 	total_bytes = 0
-	have = []
-	for dirpath, dirnames, filenames in os.walk(path):
-		total_bytes += os.lstat(dirpath).st_blocks * 512
-		for f in filenames:
-			fp = os.path.join(dirpath, f)
-			if os.path.islink(fp):
-				continue
-			st = os.lstat(fp)
-			if st.st_ino in have:
-				continue  # skip hardlinks which were already counted
-			have.append(st.st_ino)
-			total_bytes += st.st_blocks * 512
-		for d in dirnames:
-			dp = os.path.join(dirpath, d)
+	have = set()
+	stack = [path]
+	while stack:
+		dirpath = stack.pop()
+		try:
+			total_bytes += os.lstat(dirpath).st_blocks * 512
+			with os.scandir(dirpath) as entries:
+				for entry in entries:
+					if entry.is_symlink():
+						continue
+					if entry.is_dir(follow_symlinks=False):
+						stack.append(entry.path)
+						continue
+					st = entry.stat(follow_symlinks=False)
+					if st.st_nlink > 1:
+						key = (st.st_dev, st.st_ino)
+						if key in have:
+							continue  # skip hardlinks which were already counted
+						have.add(key)
+					total_bytes += st.st_blocks * 512
+		except OSError:
+			continue
 	return total_bytes
 
 
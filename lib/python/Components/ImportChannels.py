@@ -5,12 +5,13 @@ import shutil
 import tempfile
 import threading
 from base64 import encodebytes
-from json import loads
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from filecmp import cmp
+from json import dump, loads
 from time import sleep
-from urllib.error import URLError
+from urllib.error import HTTPError, URLError
 from urllib.parse import quote
 from urllib.request import Request, urlopen
-from json import loads
 from Components.config import config
 from Screens.MessageBox import MessageBox
 from Tools.Notifications import AddNotificationWithID
@@ -19,6 +20,30 @@ supportfiles = ('lamedb', 'blacklist', 'whitelist', 'alternatives.')
 
 e2path = "/etc/enigma2"
 
+MANIFEST_FILE = "importchannels.json"  # validators of the files of the last import, in e2path
+MAX_WORKERS = 4  # parallel downloads from the fallback receiver
+CHUNK_SIZE = 65536  # bytes, downloads are streamed to disk in chunks of this size
+
+bouquetReference = re.compile('#SERVICE 1:7:[12]:0:0:0:0:0:0:0:FROM BOUQUET "(.*)" ORDER BY bouquet')
+
+
+def isPlainFileName(file):
+	return file == os.path.basename(file) and file not in ("", ".", "..") and file != MANIFEST_FILE
+
+
+def getBouquetReferences(lines):
+	# Returns the bouquet files referenced by the lines of a bouquet file.  References
+	# are used as file names in e2path, anything else is left out.
+	references = []
+	for line in lines:
+		r = bouquetReference.match(line)
+		if r:
+			if isPlainFileName(r.group(1)):
+				references.append(r.group(1))
+			else:
+				print("[Import Channels] Ignoring bouquet reference %s" % r.group(1))
+	return references
+
 
 class ImportChannels:
 
@@ -37,18 +62,20 @@ class ImportChannels:
 			self.thread = threading.Thread(target=self.threaded_function, name="ChannelsImport")
 			self.thread.start()
 
-	def getUrl(self, url, timeout=5):
-		request = Request(url)
+	def getUrl(self, url, timeout=5, headers=None):
+		request = Request(url, headers=headers or {})
 		if self.header:
 			request.add_header("Authorization", self.header)
 		try:
 			result = urlopen(request, timeout=timeout)
+		except HTTPError:
+			raise
 		except URLError as e:
 			if "[Errno -3]" in str(e.reason):
 				print("[Import Channels] Network is not up yet, delay 5 seconds")
 				# network not up yet
 				sleep(5)
-				return self.getUrl(url, timeout)
+				return self.getUrl(url, timeout, headers)
 			print("[Import Channels] URLError ", e)
 			raise (e)
 		return result
@@ -85,37 +112,24 @@ class ImportChannels:
 		config.usage.remote_fallback_dvbt_region.value = description
 
 	"""
-	Enumerate all the files that make up the bouquet system, either local or on a remote machine
+	Enumerate all the local files that make up the bouquet system
 	"""
 
-	def ImportGetFilelist(self, remote=False, *files):
+	def ImportGetFilelist(self, *files):
 		result = []
 		for file in files:
 			# read the contents of the file
 			try:
-				if remote:
-					try:
-						content = self.getUrl("%s/file?file=%s/%s" % (self.url, e2path, quote(file))).readlines()
-						content = map(lambda l: l.decode('utf-8', 'replace'), content)
-					except Exception as e:
-						print("[Import Channels] Exception: %s" % str(e))
-						continue
-				else:
-					with open('%s/%s' % (e2path, file)) as f:
-						content = f.readlines()
+				with open('%s/%s' % (e2path, file)) as f:
+					content = f.readlines()
 			except Exception as e:
 				# for the moment just log and ignore
 				print("[Import Channels] %s" % str(e))
 				continue
 
-			# check the contents for more bouquet files
-			for line in content:
-				# print ("[Import Channels] %s" % line)
-				# check if it contains another bouquet reference, first tv type then radio type
-				r = re.match('#SERVICE 1:7:1:0:0:0:0:0:0:0:FROM BOUQUET "(.*)" ORDER BY bouquet', line) or re.match('#SERVICE 1:7:2:0:0:0:0:0:0:0:FROM BOUQUET "(.*)" ORDER BY bouquet', line)
-				if r:
-					# recurse
-					result.extend(self.ImportGetFilelist(remote, r.group(1)))
+			# check the contents for more bouquet files and recurse
+			for reference in getBouquetReferences(content):
+				result.extend(self.ImportGetFilelist(reference))
 
 			# add add the file itself
 			result.append(file)
@@ -123,10 +137,159 @@ class ImportChannels:
 		# return the file list
 		return result
 
+	"""
+	Synchronise the bouquet system with the fallback receiver
+
+	The files are fetched by a small pool of workers, bouquet files as soon as the
+	bouquet referencing them is in.  The validators (ETag / Last-Modified) of every
+	file are kept in a manifest together with the size and mtime of the local copy,
+	so a file that did not change on either side is asked for conditionally and
+	not transferred again.  All changed files are staged in a directory in e2path
+	and only moved in place, top level bouquets last, when every file could be
+	fetched, so a failed import leaves the local files untouched.
+	"""
+
+	def loadManifest(self):
+		try:
+			with open(os.path.join(e2path, MANIFEST_FILE)) as fd:
+				manifest = loads(fd.read())
+			if manifest.get("url") == self.url:
+				return manifest["files"]
+		except FileNotFoundError:
+			pass
+		except Exception as e:
+			print("[Import Channels] Failed to read manifest: %s" % str(e))
+		return {}
+
+	def saveManifest(self, files):
+		filename = os.path.join(e2path, MANIFEST_FILE)
+		try:
+			with open(filename + ".writing", "w") as fd:
+				dump({"url": self.url, "files": files}, fd)
+			os.replace(filename + ".writing", filename)
+		except Exception as e:
+			print("[Import Channels] Failed to write manifest: %s" % str(e))
+
+	def fetchFile(self, file, known, bouquet):
+		# Returns (file, references, validators, changed), a changed file is left in tmp_dir.
+		path = os.path.join(e2path, file)
+		headers = {}
+		if known:
+			try:
+				st = os.stat(path)
+				if st.st_size == known["size"] and st.st_mtime_ns == known["mtime"]:
+					if known["etag"]:
+						headers["If-None-Match"] = known["etag"]
+					if known["modified"]:
+						headers["If-Modified-Since"] = known["modified"]
+			except OSError:
+				pass
+		staged = os.path.join(self.tmp_dir, file)
+		try:
+			with self.getUrl("%s/file?file=%s/%s" % (self.url, e2path, quote(file)), headers=headers) as response:
+				validators = {"etag": response.headers.get("ETag"), "modified": response.headers.get("Last-Modified")}
+				with open(staged, "wb") as fd:
+					shutil.copyfileobj(response, fd, CHUNK_SIZE)
+		except HTTPError as e:
+			if e.code != 304 or not headers:
+				raise
+			# not modified, the local copy is the current one
+			validators = {"etag": known["etag"], "modified": known["modified"]}
+			staged = None
+		if staged and os.path.isfile(path) and cmp(staged, path, shallow=False):
+			os.remove(staged)
+			staged = None
+		references = []
+		if bouquet:
+			with open(staged or path, encoding="utf-8", errors="replace") as fd:
+				references = getBouquetReferences(fd)
+		return file, references, validators, staged is not None
+
+	def fetchFiles(self, bouquets, supports):
+		# Returns {file: (validators, changed)} for all files that could be fetched.
+		manifest = self.loadManifest()
+		fetched = {}
+		submitted = set()
+		futures = set()
+		with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+
+			def submit(file, bouquet):
+				if file not in submitted:
+					submitted.add(file)
+					futures.add(pool.submit(self.fetchFile, file, manifest.get(file), bouquet))
+
+			for file in bouquets:
+				submit(file, True)
+			for file in supports:
+				submit(file, False)
+			try:
+				while futures:
+					done, futures = wait(futures, return_when=FIRST_COMPLETED)
+					for future in done:
+						try:
+							file, references, validators, changed = future.result()
+						except HTTPError as e:
+							# like a missing bouquet, skip the file
+							print("[Import Channels] Exception: %s" % str(e))
+							continue
+						fetched[file] = (validators, changed)
+						for reference in references:
+							submit(reference, True)
+			except Exception:
+				for future in futures:
+					future.cancel()
+				raise
+		return fetched
+
+	def installFiles(self, fetched):
+		# The files that are still in use by the old bouquets are enumerated before the swap.
+		old = set(self.ImportGetFilelist('bouquets.tv', 'bouquets.radio'))
+		changed = sorted((file for file, (validators, changed) in fetched.items() if changed), key=lambda file: file.startswith("bouquets."))
+		print("[Import Channels] Updating %d of %d files..." % (len(changed), len(fetched)))
+		for file in changed:
+			os.replace(os.path.join(self.tmp_dir, file), os.path.join(e2path, file))
+		for file in old.difference(fetched):
+			try:
+				os.remove(os.path.join(e2path, file))
+			except OSError:
+				print("[Import Channels] File %s did not exist" % file)
+		files = {}
+		for file, (validators, changed) in fetched.items():
+			try:
+				st = os.stat(os.path.join(e2path, file))
+			except OSError:
+				continue
+			files[file] = dict(validators, size=st.st_size, mtime=st.st_mtime_ns)
+		self.saveManifest(files)
+
+	def downloadEpg(self, location):
+		# Streams epg.dat next to its destination and moves it in place, returns False if
+		# neither the epg cache location nor / (like in epgcache.cpp) can be written.
+		with self.getUrl("%s/file?file=%s" % (self.url, quote(location)), timeout=30) as response:
+			for destination in (config.misc.epgcache_filename.value, "/epg.dat"):
+				download = destination + ".download"
+				try:
+					fd = open(download, "wb")
+				except OSError as e:
+					print("[Import Channels] Exception: %s" % str(e))
+					continue
+				try:
+					with fd:
+						shutil.copyfileobj(response, fd, CHUNK_SIZE)
+					os.replace(download, destination)
+				except Exception:
+					try:
+						os.remove(download)
+					except OSError:
+						pass
+					raise
+				return True
+		return False
+
 	def threaded_function(self):
 		settings = self.getFallbackSettings()
 		self.getTerrestrialRegion(settings)
-		self.tmp_dir = tempfile.mkdtemp(prefix="ImportChannels_")
+		self.tmp_dir = tempfile.mkdtemp(prefix=".ImportChannels_", dir=e2path)
 
 		if "epg" in self.remote_fallback_import:
 			print("[Import Channels] Writing epg.dat file on server box")
@@ -153,57 +316,43 @@ class ImportChannels:
 			if epg_location:
 				print("[Import Channels] Copy EPG file...")
 				try:
-					open(os.path.join(self.tmp_dir, "epg.dat"), "wb").write(self.getUrl("%s/file?file=%s" % (self.url, epg_location)).read())
+					moved = self.downloadEpg(epg_location)
 				except Exception as e:
 					print("[Import Channels] Exception: %s" % str(e))
 					self.ImportChannelsDone(False, _("Error while retrieving epg.dat from the fallback receiver"))
 					return
-				try:
-					shutil.move(os.path.join(self.tmp_dir, "epg.dat"), config.misc.epgcache_filename.value)
-				except:
-					# follow same logic as in epgcache.cpp
-					try:
-						shutil.move(os.path.join(self.tmp_dir, "epg.dat"), "/epg.dat")
-					except Exception as e:
-						print("[Import Channels] Exception: %s" % str(e))
-						self.ImportChannelsDone(False, _("Error while moving epg.dat to its destination"))
-						return
+				if not moved:
+					self.ImportChannelsDone(False, _("Error while moving epg.dat to its destination"))
+					return
 			else:
 				self.ImportChannelsDone(False, _("No epg.dat file found on the fallback receiver"))
 
 		if "channels" in self.remote_fallback_import:
-			print("[Import Channels] Enumerate remote files")
-			files = self.ImportGetFilelist(True, 'bouquets.tv', 'bouquets.radio')
-
 			print("[Import Channels] Enumerate remote support files")
-			for file in loads(self.getUrl("%s/file?dir=%s" % (self.url, e2path)).read())["files"]:
-				if os.path.basename(file).startswith(supportfiles):
-					files.append(file.replace(e2path, ''))
+			supports = []
+			try:
+				for file in loads(self.getUrl("%s/file?dir=%s" % (self.url, e2path)).read())["files"]:
+					if os.path.basename(file).startswith(supportfiles):
+						supports.append(os.path.basename(file))
+			except Exception as e:
+				print("[Import Channels] Exception: %s" % str(e))
+				self.ImportChannelsDone(False, _("Error while retrieving the file list from the fallback receiver"))
+				return
 
 			print("[Import Channels] Fetch remote files")
-			for file in files:
-				# print("[Import Channels] Downloading %s..." % file)
-				try:
-					open(os.path.join(self.tmp_dir, os.path.basename(file)), "wb").write(self.getUrl("%s/file?file=%s/%s" % (self.url, e2path, quote(file))).read())
-				except Exception as e:
-					print("[Import Channels] Exception: %s" % str(e))
-
-			print("[Import Channels] Enumerate local files")
-			files = self.ImportGetFilelist(False, 'bouquets.tv', 'bouquets.radio')
+			try:
+				fetched = self.fetchFiles(('bouquets.tv', 'bouquets.radio'), supports)
+			except Exception as e:
+				print("[Import Channels] Exception: %s" % str(e))
+				self.ImportChannelsDone(False, _("Error while retrieving files from the fallback receiver"))
+				return
 
-			print("[Import Channels] Removing old local files...")
-			for file in files:
-				# print("- Removing %s..." % file)
-				try:
-					os.remove(os.path.join(e2path, file))
-				except OSError:
-					print("[Import Channels] File %s did not exist" % file)
-
-			print("[Import Channels] Updating files...")
-			files = [x for x in os.listdir(self.tmp_dir)]
-			for file in files:
-				# print("- Moving %s..." % file)
-				shutil.move(os.path.join(self.tmp_dir, file), os.path.join(e2path, file))
+			try:
+				self.installFiles(fetched)
+			except Exception as e:
+				print("[Import Channels] Exception: %s" % str(e))
+				self.ImportChannelsDone(False, _("Error while updating the channel files"))
+				return
 
 		self.ImportChannelsDone(True, {"channels": _("Channels"), "epg": _("EPG"), "channels_epg": _("Channels and EPG")}[self.remote_fallback_import])
 
@@ -10,6 +10,8 @@ import random
 from time import localtime, strftime
 from Tools.LoadPixmap import LoadPixmap
 from Tools.Directories import SCOPE_CURRENT_SKIN, resolveFilename
+from Tools.MovieIndex import getEntryStamp, movieIndex
+from Tools.ResumePoints import resumePoints
 from Screens.LocationBox import defaultInhibitDirs
 import NavigationInstance
 
@@ -60,15 +62,62 @@ class StubInfo:
 justStubInfo = StubInfo()
 
 
+class IndexedInfo:
+	# Answers name, begin time and tags from the movie index, the real service
+	# information is only looked up when anything else is asked for.
+	def __init__(self, serviceHandler, serviceref, name, begin, tags):
+		self.serviceHandler = serviceHandler
+		self.serviceref = serviceref
+		self.name = name
+		self.begin = begin
+		self.tags = tags
+		self.info = None
+
+	def getRealInfo(self):
+		if self.info is None:
+			self.info = self.serviceHandler.info(self.serviceref) or justStubInfo
+		return self.info
+
+	def getName(self, serviceref):
+		return self.name
+
+	def getInfo(self, serviceref, w):
+		if w == iServiceInformation.sTimeCreate:
+			return self.begin
+		return self.getRealInfo().getInfo(serviceref, w)
+
+	def getInfoString(self, serviceref, w):
+		if w == iServiceInformation.sTags:
+			return self.tags
+		return self.getRealInfo().getInfoString(serviceref, w)
+
+	def __getattr__(self, name):
+		return getattr(self.getRealInfo(), name)
+
+
 def lastPlayPosFromCache(ref):
-	from Screens.InfoBarGenerics import resumePointCache
-	return resumePointCache.get(ref.toString(), None)
+	return resumePoints.get(ref.toString())
 
 
 def moviePlayState(cutsFileName, ref, length):
 	'''Returns None, 0..100 for percentage'''
+	# See what we have in RAM first, it holds both the position and the length
+	last = lastPlayPosFromCache(ref)
+	if last:
+		lastPosition = last[1]
+		if last[2]:
+			length = last[2]
+		elif length and (length > 0):
+			length = length * 90000
+		if length:
+			if lastPosition >= length:
+				return 100
+			return (100 * lastPosition) // length
+		if lastPosition:
+			return 50
+		return None
 	try:
-		# read the cuts file first
+		# read the cuts file
 		f = open(cutsFileName, 'rb')
 		lastPosition = None
 		while True:
@@ -79,19 +128,11 @@ def moviePlayState(cutsFileName, ref, length):
 			if cutType == 3:  # undocumented, but 3 appears to be the stop
 				lastPosition = cut
 		f.close()
-		# See what we have in RAM (it might help)
-		last = lastPlayPosFromCache(ref)
-		if last:
-			# Get the cut point from the cache if not in the file
-			lastPosition = last[1]
-			# Get the length from the cache
-			length = last[2]
+		if length and (length > 0):
+			length = length * 90000
 		else:
-			if length and (length > 0):
-				length = length * 90000
-			else:
-				if lastPosition:
-					return 50
+			if lastPosition:
+				return 50
 		if lastPosition is None:
 			# Unseen movie
 			return None
@@ -99,18 +140,6 @@ def moviePlayState(cutsFileName, ref, length):
 			return 100
 		return (100 * lastPosition) // length
 	except:
-		last = lastPlayPosFromCache(ref)
-		if last:
-			lastPosition = last[1]
-			if not length or (length < 0):
-				length = last[2]
-			if length:
-				if lastPosition >= length:
-					return 100
-				return (100 * lastPosition) // length
-			else:
-				if lastPosition:
-					return 50
 		return None
 
 
@@ -227,6 +256,7 @@ class MovieList(GUIComponent):
 	playInBackground = property(get_playInBackground, set_playInBackground)
 
 	def updateRecordings(self, timer=None):
+		changed = timer
 		if timer is not None:
 			if timer.justplay:
 				return
@@ -238,6 +268,8 @@ class MovieList(GUIComponent):
 			return
 		self.runningTimers = result
 		if timer is not None:
+			if changed is not None:
+				movieIndex.invalidate(os.path.dirname(changed.Filename))
 			if self.reloadDelayTimer is not None:
 				self.reloadDelayTimer.stop()
 			self.reloadDelayTimer = eTimer()
@@ -656,6 +688,8 @@ class MovieList(GUIComponent):
 		realtags = set()
 		autotags = {}
 		rootPath = os.path.normpath(root.getPath())
+		indexed = movieIndex.getDirectory(rootPath)
+		entries = {}
 		parent = None
 		# Don't navigate above the "root"
 		if len(rootPath) > 1 and (os.path.realpath(rootPath) != os.path.realpath(config.movielist.root.value)):
@@ -672,21 +706,28 @@ class MovieList(GUIComponent):
 			serviceref = reflist.getNext()
 			if not serviceref.valid():
 				break
+			key = serviceref.toString()
+			stamp = getEntryStamp(serviceref.getPath())
+			entry = indexed.get(key)
+			if entry is None or entry[3] != stamp:
+				info = serviceHandler.info(serviceref)
+				if info is None:
+					info = justStubInfo
+				entry = (info.getName(serviceref), info.getInfo(serviceref, iServiceInformation.sTimeCreate), info.getInfoString(serviceref, iServiceInformation.sTags), stamp)
+			else:
+				info = IndexedInfo(serviceHandler, serviceref, *entry[:3])
+			entries[key] = entry
 			if config.ParentalControl.servicepinactive.value and config.ParentalControl.storeservicepin.value != "never":
 				from Components.ParentalControl import parentalControl
 				if not parentalControl.sessionPinCached and parentalControl.isProtected(serviceref) and config.ParentalControl.storeservicepin.value != 'never' and config.ParentalControl.hideBlacklist.value:
 					continue
-			info = serviceHandler.info(serviceref)
-			if info is None:
-				info = justStubInfo
-			begin = info.getInfo(serviceref, iServiceInformation.sTimeCreate)
+			name, begin, tags = entry[:3]
 			if serviceref.flags & eServiceReference.mustDescent:
 				self.list.append((serviceref, info, begin, -1))
 				numberOfDirs += 1
 				continue
 			# convert separe-separated list of tags into a set
-			this_tags = info.getInfoString(serviceref, iServiceInformation.sTags).split(' ')
-			name = info.getName(serviceref)
+			this_tags = tags.split(' ')
 			if this_tags == ['']:
 				# No tags? Auto tag!
 				this_tags = name.replace(',', ' ').replace('.', ' ').split()
@@ -710,6 +751,7 @@ class MovieList(GUIComponent):
 
 			self.list.append((serviceref, info, begin, -1))
 
+		movieIndex.setDirectory(rootPath, entries)
 		self.firstFileEntry = numberOfDirs
 		self.parentDirectory = 0
 		if self.sort_type == MovieList.SORT_ALPHANUMERIC:
@@ -1,12 +1,114 @@
 # -*- coding: utf-8 -*-
 import os
-from enigma import eProfileWrite
 from bisect import insort
-from Tools.Directories import fileExists, resolveFilename, SCOPE_PLUGINS
+from hashlib import sha1
+from inspect import Parameter, Signature, getfullargspec
+from json import dump, load
+from types import SimpleNamespace
+from Components.config import config, getConfigGeneration
+from Tools.Directories import fileExists, resolveFilename, SCOPE_CONFIG, SCOPE_PLUGINS
 from Tools.Import import my_import
+from Tools.Profile import profile, profileCall
 from Plugins.Plugin import PluginDescriptor
 import keymapparser
 
+MANIFEST_FILE = "pluginmanifest.json"
+MANIFEST_VERSION = 2  # raise when the layout of the entries changes
+# Plugins only listed in these places are not imported at boot when their descriptors are
+# in the manifest, the module is imported when one of the descriptors is first called.
+# Plugins that add to or change the config tree while they are imported or build their
+# descriptors are always imported at boot, as screens may read that config before the
+# plugin is called.
+LAZY_WHERE = frozenset((
+	PluginDescriptor.WHERE_EXTENSIONSMENU,
+	PluginDescriptor.WHERE_MAINMENU,
+	PluginDescriptor.WHERE_PLUGINMENU,
+	PluginDescriptor.WHERE_MOVIELIST,
+	PluginDescriptor.WHERE_MENU,
+	PluginDescriptor.WHERE_TELETEXT,
+	PluginDescriptor.WHERE_EVENTINFO,
+	PluginDescriptor.WHERE_AUDIOMENU,
+	PluginDescriptor.WHERE_CHANNEL_CONTEXT_MENU
+))
+DESCRIPTOR_ATTRIBUTES = frozenset(("name", "internal", "needsRestart", "path", "where", "description", "iconstr", "_icon", "weight", "wakeupfnc", "fnc"))
+lazyModules = {}  # module name -> plugin descriptors returned by Plugins()
+
+
+def describePlugins(plugins):
+	# Returns the manifest entries for the descriptors or None if they can not be
+	# recreated without importing the plugin.
+	descriptors = []
+	for p in plugins:
+		if type(p) is not PluginDescriptor or not set(p.__dict__) <= DESCRIPTOR_ATTRIBUTES or not set(p.where) <= LAZY_WHERE:
+			return None
+		if not callable(p.fnc) or p.wakeupfnc is not None or p._icon is not None or not isinstance(p.name, str) or not isinstance(p.description, str):
+			return None
+		# Menus pick plugins by the arguments of fnc, see LazyPluginFunction.
+		try:
+			varnames = list(p.fnc.__code__.co_varnames)
+			args = getfullargspec(p.fnc)[0]
+		except (AttributeError, TypeError):
+			return None
+		descriptors.append({
+			"name": p.name,
+			"where": p.where,
+			"description": p.description,
+			"icon": p.iconstr,
+			"needsRestart": p.needsRestart,
+			"internal": p.internal,
+			"weight": p.weight,
+			"varnames": varnames,
+			"args": args
+		})
+	return descriptors
+
+
+class LazyPluginFunction:
+	"""Stands in for the fnc of a plugin descriptor read from the manifest and imports
+	the plugin when it is called for the first time.  The argument names of the real
+	fnc are kept in the manifest and exposed as __code__.co_varnames and __signature__,
+	as menus check them to decide which plugins to list and how to call them."""
+	def __init__(self, module, path, index, name, where, varnames, args):
+		self.module = module
+		self.path = path
+		self.index = index
+		self.name = name
+		self.where = where
+		self.fnc = None
+		self.__code__ = SimpleNamespace(co_varnames=tuple(varnames), co_argcount=len(args))
+		self.__signature__ = Signature([Parameter(arg, Parameter.POSITIONAL_OR_KEYWORD) for arg in args])
+
+	def resolve(self):
+		if self.fnc is None:
+			plugins = lazyModules.get(self.module)
+			if plugins is None:
+				print("[PluginComponent] Importing plugin '%s' on first use." % self.module)
+				plugins = my_import(self.module).Plugins(path=self.path)
+				if not isinstance(plugins, list):
+					plugins = [plugins]
+				plugins = lazyModules[self.module] = [p for p in plugins if p]
+			candidates = plugins[self.index:self.index + 1] + plugins
+			for p in candidates:
+				if p.name == self.name and p.where == self.where:
+					self.fnc = p.fnc
+					break
+			else:
+				print("[PluginComponent] Error: Plugin '%s' no longer provides '%s'!" % (self.module, self.name))
+				self.fnc = lambda *args, **kwargs: None
+		return self.fnc
+
+	def __call__(self, *args, **kwargs):
+		return self.resolve()(*args, **kwargs)
+
+	def __eq__(self, other):
+		return isinstance(other, LazyPluginFunction) and (self.module, self.index) == (other.module, other.index)
+
+	def __ne__(self, other):
+		return not self == other
+
+	def __hash__(self):
+		return hash((self.module, self.index))
+
 
 class PluginComponent:
 	firstRun = True
@@ -28,7 +130,7 @@ class PluginComponent:
 			for x in plugin.where:
 				insort(self.plugins.setdefault(x, []), plugin)
 				if x == PluginDescriptor.WHERE_AUTOSTART:
-					plugin(reason=0)
+					profileCall("autostart", plugin.name, plugin, reason=0)
 		else:
 			self.restartRequired = True
 
@@ -44,6 +146,10 @@ class PluginComponent:
 	def readPluginList(self, directory):
 		"""enumerates plugins"""
 		new_plugins = []
+		manifest, settings = self.loadManifest()
+		if not self.firstRun:  # a reload after a change, descriptors are read from the plugins themselves
+			manifest = {}
+		new_manifest = {}
 		for c in os.listdir(directory):
 			directory_category = os.path.join(directory, c)
 			if not os.path.isdir(directory_category):
@@ -53,45 +159,60 @@ class PluginComponent:
 					continue
 				path = os.path.join(directory_category, pluginname)
 				if os.path.isdir(path):
-						eProfileWrite('plugin ' + pluginname)
-						try:
-							plugin = my_import('.'.join(["Plugins", c, pluginname, "plugin"]))
-							plugins = plugin.Plugins(path=path)
-						except Exception as exc:
-							print("Plugin ", c + "/" + pluginname, "failed to load:", exc)
-							# supress errors due to missing plugin.py* files (badly removed plugin)
-							for fn in ('plugin.py', 'plugin.pyc'):
-								if os.path.exists(os.path.join(path, fn)):
-									self.pluginWarnings.append((c + "/" + pluginname, str(exc)))
-									from traceback import print_exc
-									print_exc()
-									break
-							else:
-								print("Plugin probably removed, but not cleanly in", path)
-								try:
-									os.rmdir(path)
-								except:
-									pass
-							continue
-
-						# allow single entry not to be a list
-						if not isinstance(plugins, list):
-							plugins = [plugins]
+						profile('plugin ' + pluginname)
+						module = '.'.join(["Plugins", c, pluginname, "plugin"])
+						entry = manifest.get(path)
+						if entry and entry["descriptors"] is not None and entry["key"] == self.getManifestKey(path):
+							plugins = [PluginDescriptor(name=x["name"], where=x["where"], description=x["description"], icon=x["icon"], needsRestart=x["needsRestart"], internal=x["internal"], weight=x["weight"], fnc=LazyPluginFunction(module, path, index, x["name"], x["where"], x["varnames"], x["args"])) for index, x in enumerate(entry["descriptors"])]
+							keymap = entry["keymap"]
+						else:
+							try:
+								generation = getConfigGeneration(config)
+								plugin = my_import(module)
+								plugins = plugin.Plugins(path=path)
+								configured = getConfigGeneration(config) != generation
+							except Exception as exc:
+								print("Plugin ", c + "/" + pluginname, "failed to load:", exc)
+								# supress errors due to missing plugin.py* files (badly removed plugin)
+								for fn in ('plugin.py', 'plugin.pyc'):
+									if os.path.exists(os.path.join(path, fn)):
+										self.pluginWarnings.append((c + "/" + pluginname, str(exc)))
+										from traceback import print_exc
+										print_exc()
+										break
+								else:
+									print("Plugin probably removed, but not cleanly in", path)
+									try:
+										os.rmdir(path)
+									except:
+										pass
+								continue
+
+							# allow single entry not to be a list
+							if not isinstance(plugins, list):
+								plugins = [plugins]
+							plugins = [p for p in plugins if p]
+							keymap = os.path.join(path, "keymap.xml")
+							if not fileExists(keymap):
+								keymap = None
+							entry = {"key": self.getManifestKey(path), "descriptors": None if configured else describePlugins(plugins), "keymap": keymap}  # after the import which may have added __pycache__
+						new_manifest[path] = entry
 
 						for p in plugins:
-							if p:
-								p.path = path
-								p.updateIcon(path)
-								new_plugins.append(p)
+							p.path = path
+							p.updateIcon(path)
+							new_plugins.append(p)
 
-						keymap = os.path.join(path, "keymap.xml")
-						if fileExists(keymap):
+						if keymap:
 							try:
 								keymapparser.readKeymap(keymap)
 							except Exception as exc:
 								print("keymap for plugin %s/%s failed to load: " % (c, pluginname), exc)
 								self.pluginWarnings.append((c + "/" + pluginname, str(exc)))
 
+		if new_manifest != manifest:
+			self.saveManifest(new_manifest, settings)
+
 		# build a diff between the old list of plugins and the new one
 		# internally, the "fnc" argument will be compared with __eq__
 		plugins_added = [p for p in new_plugins if p not in self.pluginList]
@@ -120,6 +241,49 @@ class PluginComponent:
 			self.firstRun = False
 			self.installedPluginList = self.pluginList
 
+	def getManifestKey(self, path):
+		key = []
+		for name in ("", "plugin.py", "plugin.pyc"):
+			try:
+				key.append(os.stat(os.path.join(path, name)).st_mtime_ns)
+			except OSError:
+				key.append(None)
+		return key
+
+	def getSettingsHash(self):
+		# Descriptors often depend on plugin settings or the language, so the manifest is only
+		# valid for the settings it was made with.  Other settings changing plugin entries are
+		# followed by reloadPlugins() which refreshes the manifest.
+		settings = sha1()
+		try:
+			with open(resolveFilename(SCOPE_CONFIG, "settings"), "rb") as fd:
+				for line in fd:
+					if line.startswith((b"config.plugins.", b"config.osd.language=")):
+						settings.update(line)
+		except OSError:
+			return None
+		return settings.hexdigest()
+
+	def loadManifest(self):
+		settings = self.getSettingsHash()
+		try:
+			with open(resolveFilename(SCOPE_CONFIG, MANIFEST_FILE)) as fd:
+				manifest = load(fd)
+			if manifest.get("version") == MANIFEST_VERSION and manifest.get("settings") == settings:
+				return manifest.get("plugins", {}), settings
+		except Exception as err:
+			print("[PluginComponent] Plugin manifest not loaded!  (%s)" % str(err))
+		return {}, settings
+
+	def saveManifest(self, manifest, settings):
+		filename = resolveFilename(SCOPE_CONFIG, MANIFEST_FILE)
+		try:
+			with open(filename + ".tmp", "w") as fd:
+				dump({"version": MANIFEST_VERSION, "settings": settings, "plugins": manifest}, fd)
+			os.rename(filename + ".tmp", filename)
+		except Exception as err:
+			print("[PluginComponent] Error: Unable to save plugin manifest!  (%s)" % str(err))
+
 	def getPlugins(self, where):
 		"""Get list of plugins in a specific category"""
 		if not isinstance(where, list):
@@ -1,7 +1,9 @@
 # -*- coding: utf-8 -*-
 import os
 import re
+import time
 import unicodedata
+from collections import OrderedDict
 from Components.Renderer.Renderer import Renderer
 from enigma import ePixmap
 from Tools.Alternatives import GetWithAlternative
@@ -11,37 +13,80 @@ from ServiceReference import ServiceReference
 
 
 class PiconLocator:
+	CACHE_SIZE = 512  # number of resolved service references to remember
+	REVALIDATE_INTERVAL = 60  # seconds between directory mtime checks of the indexed paths
+
 	def __init__(self, piconDirectories=['picon']):
 		harddiskmanager.on_partition_list_change.append(self.__onPartitionChange)
 		self.piconDirectories = piconDirectories
 		self.activePiconPath = None
 		self.searchPaths = []
+		self.piconIndex = {}  # search path -> set of picon file names (with extension)
+		self.piconIndexMtime = {}  # search path -> directory mtime when the index was built
+		self.piconCache = OrderedDict()  # service reference -> resolved picon file name (LRU)
+		self.lastRevalidate = 0
 		for mp in ('/usr/share/enigma2/', '/'):
 			self.__onMountpointAdded(mp)
 		for part in harddiskmanager.getMountedPartitions():
 			self.__onMountpointAdded(part.mountpoint)
 
+	def __indexPath(self, path):
+		try:
+			mtime = os.stat(path).st_mtime
+			with os.scandir(path) as entries:
+				index = set(entry.name for entry in entries if entry.name.endswith('.png') or entry.name.endswith('.svg'))
+		except OSError:
+			mtime = None
+			index = set()
+		self.piconIndex[path] = index
+		self.piconIndexMtime[path] = mtime
+		return index
+
+	def __dropPath(self, path):
+		self.piconIndex.pop(path, None)
+		self.piconIndexMtime.pop(path, None)
+		if self.activePiconPath == path:
+			self.activePiconPath = None
+
+	def __revalidate(self):
+		now = time.monotonic()
+		if now - self.lastRevalidate < self.REVALIDATE_INTERVAL:
+			return
+		self.lastRevalidate = now
+		changed = False
+		for path in self.searchPaths:
+			try:
+				mtime = os.stat(path).st_mtime
+			except OSError:
+				mtime = None
+			if mtime != self.piconIndexMtime.get(path):
+				print("[Picon] refreshing index of path:", path)
+				self.__indexPath(path)
+				changed = True
+		if changed:
+			self.piconCache.clear()
+
 	def __onMountpointAdded(self, mountpoint):
 		for piconDirectory in self.piconDirectories:
-			try:
-				path = os.path.join(mountpoint, piconDirectory) + '/'
-				if os.path.isdir(path) and path not in self.searchPaths:
-					for fn in os.listdir(path):
-						if fn.endswith('.png') or fn.endswith('.svg'):
-							print("[Picon] adding path:", path)
-							self.searchPaths.append(path)
-							break
-			except:
-				pass
+			path = os.path.join(mountpoint, piconDirectory) + '/'
+			if os.path.isdir(path) and path not in self.searchPaths:
+				if self.__indexPath(path):
+					print("[Picon] adding path:", path)
+					self.searchPaths.append(path)
+					self.piconCache.clear()
+				else:
+					self.__dropPath(path)
 
 	def __onMountpointRemoved(self, mountpoint):
 		for piconDirectory in self.piconDirectories:
-			path = os.path.join(mountpoint, self.piconDirectories) + '/'
+			path = os.path.join(mountpoint, piconDirectory) + '/'
 			try:
 				self.searchPaths.remove(path)
 				print("[Picon] removed path:", path)
 			except:
 				pass
+			self.__dropPath(path)
+		self.piconCache.clear()
 
 	def __onPartitionChange(self, why, part):
 		if why == 'add':
@@ -51,17 +96,17 @@ class PiconLocator:
 
 	def findPicon(self, serviceName):
 		if self.activePiconPath is not None:
+			index = self.piconIndex.get(self.activePiconPath, ())
 			for ext in ('.png', '.svg'):
-				pngname = self.activePiconPath + serviceName + ext
-				if pathExists(pngname):
-					return pngname
+				if serviceName + ext in index:
+					return self.activePiconPath + serviceName + ext
 		else:
 			for path in self.searchPaths:
+				index = self.piconIndex.get(path, ())
 				for ext in ('.png', '.svg'):
-					pngname = path + serviceName + ext
-					if pathExists(pngname):
+					if serviceName + ext in index:
 						self.activePiconPath = path
-						return pngname
+						return path + serviceName + ext
 		return ""
 
 	def addSearchPath(self, value):
@@ -69,9 +114,23 @@ class PiconLocator:
 			if not value.endswith('/'):
 				value += '/'
 			if not value.startswith('/media/net') and not value.startswith('/media/autofs') and value not in self.searchPaths:
+				self.__indexPath(value)
 				self.searchPaths.append(value)
+				self.piconCache.clear()
 
 	def getPiconName(self, serviceName):
+		self.__revalidate()
+		pngname = self.piconCache.get(serviceName)
+		if pngname is not None:
+			self.piconCache.move_to_end(serviceName)
+			return pngname
+		pngname = self.resolvePiconName(serviceName)
+		self.piconCache[serviceName] = pngname
+		if len(self.piconCache) > self.CACHE_SIZE:
+			self.piconCache.popitem(last=False)
+		return pngname
+
+	def resolvePiconName(self, serviceName):
 		#remove the path and name fields, and replace ':' by '_'
 		fields = GetWithAlternative(serviceName).split(':', 10)[:10]
 		if not fields or len(fields) < 10:
@@ -103,15 +162,9 @@ class PiconLocator:
 					series = re.sub(r's[0-9]*e[0-9]*$', '', name)
 					pngname = self.findPicon(series)
 		if not pngname: # picon default
-			tmp = resolveFilename(SCOPE_CURRENT_SKIN, 'picon_default.png') # picon_default in current active skin
-			tmp2 = self.findPicon("picon_default") # picon_default in picon folder
-			if pathExists(tmp2):
-				pngname = tmp2
-			else:
-				if pathExists(tmp):
-					pngname = tmp
-				else:
-					pngname = resolveFilename(SCOPE_CURRENT_SKIN, 'picon_default.png')
+			pngname = self.findPicon("picon_default") # picon_default in picon folder
+			if not pngname:
+				pngname = resolveFilename(SCOPE_CURRENT_SKIN, 'picon_default.png') # picon_default in current active skin
 		return pngname
 
 
@@ -1,5 +1,6 @@
 from enigma import eListboxServiceContent, eListbox, eServiceCenter, eServiceReference, gFont, eRect, eSize
 
+from Components.ChannelNumbers import channelNumbers
 from Components.config import config
 from Components.GUIComponent import GUIComponent
 from Components.Renderer.Picon import getPiconName
@@ -14,6 +15,7 @@ def InitServiceListSettings():
 
 
 def refreshServiceList(configElement=None):
+	channelNumbers.invalidate()
 	from Screens.InfoBar import InfoBar
 	InfoBarInstance = InfoBar.instance
 	if InfoBarInstance is not None:
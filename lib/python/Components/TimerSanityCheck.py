@@ -1,5 +1,8 @@
 # -*- coding: utf-8 -*-
 import NavigationInstance
+from bisect import bisect_left, bisect_right, insort
+from datetime import date, timedelta
+from itertools import count
 from time import localtime, mktime, gmtime, time
 from enigma import iServiceInformation, eServiceCenter, eServiceReference, getBestPlayableServiceReference
 from timer import TimerEntry
@@ -8,11 +11,117 @@ from Tools.CIHelper import cihelper
 from Components.config import config
 
 
+def repeatedOccurrences(timer, begin, end):
+	# yields the (begin, end) occurrences of a repeated timer overlapping begin..end,
+	# computed on the local time of day so they follow daylight saving changes
+	duration = timer.end - timer.begin
+	first = localtime(timer.begin)
+	day = date.fromtimestamp(max(begin - duration, timer.begin))
+	last = date.fromtimestamp(end)
+	while day <= last:
+		if timer.repeated & (1 << day.weekday()):
+			occurrence = int(mktime((day.year, day.month, day.day, first.tm_hour, first.tm_min, first.tm_sec, 0, 0, -1)))
+			if timer.begin <= occurrence <= end and occurrence + duration >= begin:
+				yield (occurrence, occurrence + duration)
+		day += timedelta(days=1)
+
+
+class TimerOccupancy:
+	"""Interval index of the time the timers of a RecordTimer occupy.
+
+	Single timers are kept sorted on their begin time, repeated timers are expanded
+	lazily by repeatedOccurrences() for the period that is asked for.
+	"""
+	def __init__(self):
+		self.entries = []  # sorted (begin, sequence) of the single timers
+		self.keys = {}  # timer -> its entry, None for repeated timers
+		self.singles = {}  # sequence -> timer
+		self.repeated = set()
+		self.sequence = count()
+		self.maxDuration = 0
+		self.lastEnd = 0
+
+	def __contains__(self, timer):
+		return timer in self.keys
+
+	def __len__(self):
+		return len(self.keys)
+
+	def issuperset(self, timers):
+		return self.keys.keys() >= set(timers)
+
+	def add(self, timer):
+		if timer in self.keys:
+			self.remove(timer)
+		if timer.repeated:
+			self.keys[timer] = None
+			self.repeated.add(timer)
+		else:
+			key = (int(timer.begin), next(self.sequence))
+			self.keys[timer] = key
+			self.singles[key[1]] = timer
+			insort(self.entries, key)
+			self.maxDuration = max(self.maxDuration, timer.end - timer.begin)
+			self.lastEnd = max(self.lastEnd, timer.end)
+
+	def remove(self, timer):
+		key = self.keys.pop(timer, ())
+		if key is None:
+			self.repeated.discard(timer)
+		elif key:
+			del self.singles[key[1]]
+			del self.entries[bisect_left(self.entries, key)]
+			if not self.entries:
+				self.maxDuration = self.lastEnd = 0
+
+	def update(self, timer):
+		if timer in self.keys:
+			self.add(timer)
+
+	def retain(self, timers):
+		for timer in set(self.keys) - set(timers):
+			self.remove(timer)
+
+	def overlapping(self, begin, end):
+		# all timers with an occurrence overlapping begin..end (limits included), as (timer, begin, end)
+		lo = bisect_left(self.entries, (begin - self.maxDuration,))
+		hi = bisect_right(self.entries, (end, float("inf")))
+		for key in self.entries[lo:hi]:
+			timer = self.singles[key[1]]
+			if timer.begin <= end and timer.end >= begin:
+				yield (timer, timer.begin, timer.end)
+		for timer in self.repeated:
+			for occurrence in repeatedOccurrences(timer, begin, end):
+				yield (timer,) + occurrence
+
+	def findChained(self, timer, isCandidate):
+		# returns the timers linked to the occurrences of timer by a chain of overlapping occurrences
+		if timer.repeated:
+			windows = list(repeatedOccurrences(timer, timer.begin, max(self.lastEnd, timer.begin + 14 * 86400)))
+		else:
+			windows = [(timer.begin, timer.end)]
+		seen = set()
+		chained = set()
+		while windows:
+			begin, end = windows.pop()
+			for other, otherBegin, otherEnd in self.overlapping(begin, end):
+				if other is timer or (other, otherBegin) in seen or not isCandidate(other):
+					continue
+				seen.add((other, otherBegin))
+				chained.add(other)
+				windows.append((otherBegin, otherEnd))
+		return chained
+
+
 class TimerSanityCheck:
-	def __init__(self, timerlist, newtimer=None):
+	def __init__(self, timerlist, newtimer=None, occupancy=None):
 		self.localtimediff = 25 * 3600 - mktime(gmtime(25 * 3600))
 		self.timerlist = timerlist
 		self.newtimer = newtimer
+		if occupancy is None:
+			# The RecordTimer is not set on the navigation yet while it loads its timers.
+			occupancy = getattr(getattr(NavigationInstance.instance, "RecordTimer", None), "occupancy", None)
+		self.occupancy = occupancy
 		self.simultimer = []
 		self.rep_eventlist = []
 		self.nrep_eventlist = []
@@ -33,6 +142,17 @@ class TimerSanityCheck:
 	def getSimulTimerList(self):
 		return self.simultimer
 
+	@staticmethod
+	def isCheckable(timer):
+		return not (timer.disabled or not timer.conflict_detection or not timer.service_ref or '%3a//' in timer.service_ref.ref.toString() or timer.state == TimerEntry.StateEnded)
+
+	def getCheckTimerlist(self):
+		# only the timers chained to the new timer by overlapping occupancy can take part in a conflict with it
+		if self.occupancy is None or not self.occupancy.issuperset(self.timerlist):
+			return self.timerlist
+		candidates = self.occupancy.findChained(self.newtimer, self.isCheckable) & set(self.timerlist)
+		return sorted(candidates)
+
 	def doubleCheck(self):
 		if self.newtimer and self.newtimer.service_ref and self.newtimer.service_ref.ref.valid():
 			self.simultimer = [self.newtimer]
@@ -103,9 +223,9 @@ class TimerSanityCheck:
 # now process existing timers
 		self.check_timerlist = []
 		idx = 0
-		for timer in self.timerlist:
+		for timer in self.getCheckTimerlist():
 			if timer != self.newtimer:
-				if timer.disabled or not timer.conflict_detection or not timer.service_ref or '%3a//' in timer.service_ref.ref.toString() or timer.state == TimerEntry.StateEnded:
+				if not self.isCheckable(timer):
 					continue
 				if timer.repeated:
 					rflags = timer.repeated
@@ -1,11 +1,11 @@
 # -*- coding: utf-8 -*-
 import os
-from os import fsync, rename, sep
+from os import fsync, rename, sep, stat
 from os.path import realpath
 from copy import copy as shallowcopy
-from time import localtime, strftime, struct_time
+from time import localtime, monotonic, strftime, struct_time
 
-from enigma import getPrevAsciiCode
+from enigma import eTimer, getPrevAsciiCode
 
 from Tools.Directories import SCOPE_CONFIG, fileExists, fileAccess, resolveFilename
 from Tools.LoadPixmap import LoadPixmap
@@ -80,6 +80,36 @@ def NoSave(element):
 	return element
 
 
+# Change tracking for the config file.  Every item of the config tree knows the
+# subsections, lists and dicts it was added to and every change of a saved value
+# raises the generation of those containers up to the root.  Config.pickle() only
+# serialises the top level subtrees whose generation changed since the last time.
+#
+def getConfigNode(item):
+	return item.content if isinstance(item, ConfigSubsection) else item
+
+
+def addConfigParent(parent, item):
+	node = getConfigNode(item)
+	parents = node.__dict__.get("configParents")
+	if parents is None:
+		node.configParents = [parent]
+	elif not [x for x in parents if x is parent]:  # Lists and dicts compare by content.
+		parents.append(parent)
+	configChanged(parent)
+
+
+def configChanged(item):
+	node = getConfigNode(item)
+	node.configGeneration = getattr(node, "configGeneration", 0) + 1
+	for parent in getattr(node, "configParents", ()):
+		configChanged(parent)
+
+
+def getConfigGeneration(item):
+	return getattr(getConfigNode(item), "configGeneration", 0)
+
+
 # ConfigElement, the base class of all ConfigElements.
 
 # it stores:
@@ -101,6 +131,8 @@ def NoSave(element):
 #            or invalid.
 #
 class ConfigElement:
+	__saved_value = None
+
 	def __init__(self):
 		self.saved_value = None
 		self.save_forced = False
@@ -131,6 +163,13 @@ class ConfigElement:
 
 	notifiers_final = property(getNotifiersFinal, setNotifiersFinal)
 
+	def __setSavedValue(self, value):
+		if value != self.__saved_value:
+			self.__saved_value = value
+			configChanged(self)
+
+	saved_value = property(lambda self: self.__saved_value, __setSavedValue)
+
 	# you need to override this to do input validation
 	def setValue(self, value):
 		self._value = value
@@ -1778,6 +1817,7 @@ class ConfigSubList(list):
 
 	def setSavedValue(self, values):
 		self.stored_values = dict(values)
+		configChanged(self)
 		for (key, val) in self.stored_values.items():
 			if int(key) < len(self):
 				self[int(key)].saved_value = val
@@ -1787,10 +1827,45 @@ class ConfigSubList(list):
 	def append(self, item):
 		i = str(len(self))
 		list.append(self, item)
+		addConfigParent(self, item)
 		if i in self.stored_values:
 			item.saved_value = self.stored_values[i]
 			item.load()
 
+	# The saved values are numbered by position, so any other change of the list changes them.
+	def __setitem__(self, index, item):
+		if isinstance(index, slice):
+			item = list(item)
+		list.__setitem__(self, index, item)
+		for x in (item if isinstance(index, slice) else (item,)):
+			addConfigParent(self, x)
+		configChanged(self)
+
+	def __delitem__(self, index):
+		list.__delitem__(self, index)
+		configChanged(self)
+
+	def insert(self, index, item):
+		list.insert(self, index, item)
+		addConfigParent(self, item)
+
+	def extend(self, items):
+		for item in items:
+			self.append(item)
+
+	def pop(self, index=-1):
+		item = list.pop(self, index)
+		configChanged(self)
+		return item
+
+	def remove(self, item):
+		list.remove(self, item)
+		configChanged(self)
+
+	def clear(self):
+		list.clear(self)
+		configChanged(self)
+
 	def dict(self):
 		return dict([(str(index), value) for index, value in enumerate(self)])
 
@@ -1823,6 +1898,7 @@ class ConfigSubDict(dict):
 
 	def setSavedValue(self, values):
 		self.stored_values = dict(values)
+		configChanged(self)
 		for (key, val) in self.items():
 			if str(key) in self.stored_values:
 				val.saved_value = self.stored_values[str(key)]
@@ -1831,10 +1907,29 @@ class ConfigSubDict(dict):
 
 	def __setitem__(self, key, item):
 		dict.__setitem__(self, key, item)
+		addConfigParent(self, item)
 		if str(key) in self.stored_values:
 			item.saved_value = self.stored_values[str(key)]
 			item.load()
 
+	def __delitem__(self, key):
+		dict.__delitem__(self, key)
+		configChanged(self)
+
+	def pop(self, *args):
+		item = dict.pop(self, *args)
+		configChanged(self)
+		return item
+
+	def popitem(self):
+		item = dict.popitem(self)
+		configChanged(self)
+		return item
+
+	def clear(self):
+		dict.clear(self)
+		configChanged(self)
+
 	def dict(self):
 		return self
 
@@ -1863,6 +1958,7 @@ class ConfigSubsection:
 		assert isinstance(value, (ConfigSubsection, ConfigElement, ConfigSubList, ConfigSubDict)), "ConfigSubsections can only store ConfigSubsections, ConfigSubLists, ConfigSubDicts or ConfigElements"
 		content = self.content
 		content.items[name] = value
+		addConfigParent(self, value)
 		x = content.stored_values.get(name, None)
 		if x is not None:
 			# print "ok, now we have a new item,", name, "and have the following value for it:", x
@@ -1887,6 +1983,7 @@ class ConfigSubsection:
 	def setSavedValue(self, values):
 		values = dict(values)
 		self.content.stored_values = values
+		configChanged(self)
 		for (key, val) in self.content.items.items():
 			value = values.get(key, None)
 			if value is not None:
@@ -1917,6 +2014,7 @@ class ConfigSubsection:
 class Config(ConfigSubsection):
 	def __init__(self):
 		ConfigSubsection.__init__(self)
+		self.content.pickles = {}  # key -> (item, generation, text) of the top level subtrees
 
 	def pickle_this(self, prefix, topickle, result):
 		for (key, val) in sorted(topickle.items(), key=lambda x: int(x[0]) if x[0].isdigit() else x[0].lower()):
@@ -1929,13 +2027,39 @@ class Config(ConfigSubsection):
 				result += [f"{name}={str(val)}\n"]
 
 	def pickle(self):
+		# Same as pickle_this("config", self.saved_value, result) but the text of a top
+		# level subtree is only built again when its generation has changed.
 		result = []
-		self.pickle_this("config", self.saved_value, result)
+		content = self.content
+		pickles = {}
+		for key in sorted(set(content.stored_values) | set(content.items), key=lambda x: int(x) if x.isdigit() else x.lower()):
+			item = content.items.get(key)
+			if isinstance(item, (ConfigSubsection, ConfigSubList, ConfigSubDict)):
+				generation = getConfigGeneration(item)
+				cached = content.pickles.get(key)
+				if cached is None or cached[0] is not item or cached[1] != generation:
+					text = []
+					content.stored_values[key] = item.saved_value
+					self.pickle_this("config", {key: content.stored_values[key]}, text)
+					cached = (item, generation, ''.join(text))
+				pickles[key] = cached
+				result.append(cached[2])
+				continue
+			if item is not None:
+				sv = item.saved_value
+				if sv is None:
+					content.stored_values.pop(key, None)
+					continue
+				content.stored_values[key] = sv
+			if key in content.stored_values:
+				self.pickle_this("config", {key: content.stored_values[key]}, result)
+		content.pickles = pickles
 		return ''.join(result)
 
 	def unpickle(self, lines, base_file=True):
-		tree = {}
-		configbase = tree.setdefault("config", {})
+		# The lines are first collected in a flat index of dotted names, where the last
+		# line of a name wins, and the tree of saved values is built from that index.
+		values = {}
 		for l in lines:
 			if not l or l[0] == '#':
 				continue
@@ -1944,8 +2068,11 @@ class Config(ConfigSubsection):
 			if len(result) != 2:
 				continue
 			(name, val) = result
-			val = val.strip()
+			values[name] = val.strip()
 
+		tree = {}
+		configbase = tree.setdefault("config", {})
+		for (name, val) in values.items():
 			names = name.split('.')
 			base = configbase
 
@@ -1956,20 +2083,29 @@ class Config(ConfigSubsection):
 
 			if not base_file:  # not the initial config file..
 				# update config.x.y.value when exist
-				try:
-					configEntry = eval(name)
-					if configEntry is not None:
-						configEntry.value = val
-				except (SyntaxError, KeyError):
-					pass
+				configEntry = self.getElement(names)
+				if configEntry is not None:
+					configEntry.value = val
 
 		# we inherit from ConfigSubsection, so ...
 		# object.__setattr__(self, "saved_value", tree["config"])
 		if "config" in tree:
 			self.setSavedValue(tree["config"])
 
-	def saveToFile(self, filename):
-		text = self.pickle()
+	def getElement(self, names):
+		# Returns the element for the dotted name split into names, None if there is none.
+		if names[0] != "config":
+			return None
+		item = self
+		for name in names[1:]:
+			if not isinstance(item, ConfigSubsection):
+				return None
+			item = item.content.items.get(name)
+		return item if isinstance(item, ConfigElement) else None
+
+	def saveToFile(self, filename, text=None):
+		if text is None:
+			text = self.pickle()
 		try:
 			import os
 			f = open(filename + ".writing", "w", encoding="UTF-8")
@@ -1987,8 +2123,15 @@ class Config(ConfigSubsection):
 
 class ConfigFile:
 	CONFIG_FILE = resolveFilename(SCOPE_CONFIG, "settings")
+	SAVE_INTERVAL = 1000  # ms, saves closer to the previous write than this are written together
+
+	def __init__(self):
+		self.saveTimer = None
+		self.lastWrite = 0
+		self.written = None  # (generation, text, file stat) of the last write
 
 	def load(self):
+		self.flush()
 		try:
 			config.loadFromFile(self.CONFIG_FILE, True)
 		except OSError as err:
@@ -1996,7 +2139,43 @@ class ConfigFile:
 
 	def save(self):
 		# config.save()
-		config.saveToFile(self.CONFIG_FILE)
+		if self.saveTimer is not None and self.saveTimer.isActive():
+			return
+		delay = int(self.lastWrite + self.SAVE_INTERVAL - monotonic() * 1000)
+		if delay > 0:
+			if self.saveTimer is None:
+				self.saveTimer = eTimer()
+				self.saveTimer.callback.append(self.write)
+			self.saveTimer.start(delay, True)
+		else:
+			self.write()
+
+	def flush(self):
+		# Writes a pending save now, call this before the settings file is read by other means.
+		if self.saveTimer is not None and self.saveTimer.isActive():
+			self.saveTimer.stop()
+			self.write()
+
+	def getFileStat(self):
+		try:
+			st = stat(self.CONFIG_FILE)
+			return (st.st_mtime_ns, st.st_size, st.st_ino)
+		except OSError:
+			return None
+
+	def write(self):
+		self.lastWrite = monotonic() * 1000
+		generation = getConfigGeneration(config)
+		written = self.written
+		fileStat = self.getFileStat()
+		if written and written[0] == generation and written[2] == fileStat:
+			return
+		text = config.pickle()
+		if written and written[1] == text and written[2] == fileStat:
+			self.written = (generation, text, fileStat)
+			return
+		config.saveToFile(self.CONFIG_FILE, text)
+		self.written = (generation, text, self.getFileStat())
 
 	def __resolveValue(self, pickles, cmap):
 		key = pickles[0]
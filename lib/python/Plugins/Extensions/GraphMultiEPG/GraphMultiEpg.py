@@ -34,6 +34,7 @@ from Tools.TextBoundary import getTextBoundarySize
 from enigma import eEPGCache, eListbox, gFont, eListboxPythonMultiContent, RT_HALIGN_LEFT, RT_HALIGN_RIGHT, RT_HALIGN_CENTER, RT_VALIGN_CENTER, RT_WRAP, BT_SCALE, BT_KEEP_ASPECT_RATIO, BT_ALIGN_CENTER, eSize, eRect, eTimer, eServiceReference
 from Plugins.Extensions.GraphMultiEPG.GraphMultiEpgSetup import GraphMultiEpgSetup
 from time import localtime, time, strftime, mktime
+from bisect import bisect_left, bisect_right
 from Components.PluginComponent import plugins
 from Plugins.Plugin import PluginDescriptor
 from Tools.BoundFunction import boundFunction
@@ -81,6 +82,10 @@ listscreen = config.misc.graph_mepg.default_mode.value
 
 
 class EPGList(GUIComponent):
+	ROW_CELL_LIMIT = 256  # cached event cells per row before they are rebuilt
+	EPG_BUFFER_LIFETIME = 300  # seconds before buffered EPG data is looked up again
+	PREFETCH_DELAY = 500  # ms after a page is shown before the neighbouring epochs are fetched
+
 	def __init__(self, selChangedCB=None, timer=None, time_epoch=120, overjump_empty=True, epg_bouquet=None):
 		GUIComponent.__init__(self)
 		self.cur_event = None
@@ -171,6 +176,11 @@ class EPGList(GUIComponent):
 		self.borderLeftPix = None
 		self.borderRightPix = None
 		self.graphics_mode = False
+		self.rowLayout = None
+		self.rowCache = {}  # service -> cached service cells, timer states, event geometry and cells
+		self.epgBuffer = {}  # service -> (service name, events, start, end, fetch time, event begin times)
+		self.prefetchTimer = eTimer()
+		self.prefetchTimer.callback.append(self.prefetchEPG)
 
 	def applySkin(self, desktop, screen):
 		def EntryFont(value):
@@ -427,6 +437,7 @@ class EPGList(GUIComponent):
 			self.graphics_mode = False
 		else:
 			self.graphics_mode = True
+		self.rowCache = {}
 
 	def setEventFontsize(self):
 		self.l.setFont(1, gFont(self.entryFontName, self.entryFontSize + config.misc.graph_mepg.ev_fontsize.getValue()))
@@ -438,6 +449,7 @@ class EPGList(GUIComponent):
 		self.l.setSelectionClip(eRect(0, 0, 0, 0), False)
 
 	def preWidgetRemove(self, instance):
+		self.prefetchTimer.stop()
 		instance.selectionChanged.get().remove(self.serviceChanged)
 		instance.setContent(None)
 
@@ -475,27 +487,106 @@ class EPGList(GUIComponent):
 		return xpos + event_rect.left(), width
 
 	def buildEntry(self, service, service_name, events, picon, serviceref):
+		# Rows are cached per service.  The service cells are kept until the layout or the
+		# service itself changes, the event cells per event and selection state until the
+		# timers or the playing service change, so moving the cursor or paging back and
+		# forth only builds the cells which are actually different.
+		r1 = self.service_rect
+		r2 = self.event_rect
+		selected = self.cur_service[0] == service
+		if self.showPicon and picon is None:  # go find picon and cache its location
+			picon = getPiconName(service)
+			curIdx = self.l.getCurrentSelectionIndex()
+			self.list[curIdx] = (service, service_name, events, picon, serviceref)
+		playing = self.currentlyPlaying and self.currentlyPlaying.toString()
+		layout = (r1.x, r1.y, r1.w, r1.h, r2.x, r2.y, r2.w, r2.h, self.number_width, self.showPicon, self.showServiceTitle, self.graphics_mode,
+			config.misc.graph_mepg.servicename_alignment.value, config.misc.graph_mepg.event_alignment.value,
+			config.misc.graph_mepg.show_record_clocks.value, config.misc.graph_mepg.show_disabled_timers.value)
+		if layout != self.rowLayout:
+			self.rowLayout = layout
+			self.rowCache = {}
+		row = self.rowCache.get(service)
+		serviceKey = (service_name, picon, serviceref, playing)
+		if row is None or row["service"] != serviceKey:
+			currentservice = CompareWithAlternatives(service, playing)
+			row = self.rowCache[service] = {
+				"service": serviceKey,
+				"currentservice": currentservice,
+				"serviceCells": self.buildServiceCells(service_name, picon, serviceref, currentservice),
+				"geometry": {},  # (begin_time, duration, start, end) -> (xpos, ewidth)
+				"generation": None
+			}
+		if row["generation"] != self.timer.timerGeneration:
+			row["generation"] = self.timer.timerGeneration
+			row["playable"] = None
+			row["timers"] = {}  # (event_id, begin_time, duration) -> (rec, dis)
+			row["cells"] = {}  # (event, xpos, ewidth, now, selected, backColorSel) -> event cells
+		res = [None] + row["serviceCells"]
+
+		# Events for service
+		left = r2.left()
+		width = r2.width()
+		if events:
+			start = self.time_base + self.offs * self.time_epoch * 60
+			end = start + self.time_epoch * 60
+			if len(row["cells"]) > self.ROW_CELL_LIMIT:
+				row["geometry"] = {}
+				row["cells"] = {}
+			timers = row["timers"]
+			geometry = row["geometry"]
+			cells = row["cells"]
+			backColorSel = self.backColorSelected
+			now = time()
+			for ev in events:  # (event_id, event_title, begin_time, duration)
+				stime = ev[2]
+				duration = ev[3]
+				position = geometry.get((stime, duration, start, end))
+				if position is None:
+					position = geometry[(stime, duration, start, end)] = self.calcEntryPosAndWidthHelper(stime, duration, start, end, width)
+				xpos, ewidth = position
+				isNow = stime <= now and now < stime + duration
+				selectedEvent = bool(selected and self.select_rect.x == xpos + left and self.selEvPix)
+				key = (ev, xpos, ewidth, isNow, selectedEvent, backColorSel is None)
+				eventCells = cells.get(key)
+				if eventCells is None:
+					timerKey = (ev[0], stime, duration)
+					if timerKey not in timers:
+						timers[timerKey] = (self.timer.isInTimer(ev[0], stime, duration, service),
+							self.timer.isInTimer(ev[0], stime, duration, service, disabledTimers=True) if config.misc.graph_mepg.show_disabled_timers.value else None)
+					if isNow and row["playable"] is None:
+						row["playable"] = bool(isPlayableForCur(ServiceReference(service).ref))
+					eventCells = cells[key] = self.buildEventCells(ev, xpos, ewidth, isNow, selectedEvent, backColorSel, timers[timerKey], row["currentservice"], row["playable"])
+				res.extend(eventCells)
+				if selectedEvent:
+					backColorSel = None
+		else:
+			if selected and self.selEvPix:
+				res.append(MultiContentEntryPixmapAlphaBlend(
+					pos=(r2.x + self.eventBorderVerWidth, r2.y + self.eventBorderHorWidth),
+					size=(r2.w - 2 * self.eventBorderVerWidth, r2.h - 2 * self.eventBorderHorWidth),
+					png=self.selEvPix,
+					flags=BT_SCALE))
+		return res
+
+	def buildServiceCells(self, service_name, picon, serviceref, currentservice):
 		r1 = self.service_rect
 		r2 = self.event_rect
 		left = r2.left()
 		top = r2.top()
 		width = r2.width()
 		height = r2.height()
-		selected = self.cur_service[0] == service
 
 		# Picon and Service name
-		if CompareWithAlternatives(service, self.currentlyPlaying and self.currentlyPlaying.toString()):
+		if currentservice:
 			serviceForeColor = self.foreColorServiceSelected
 			serviceBackColor = self.backColorServiceSelected
 			bgpng = self.curSerPix or self.nowEvPix
-			currentservice = True
 		else:
 			serviceForeColor = self.foreColorService
 			serviceBackColor = self.backColorService
 			bgpng = self.othEvPix
-			currentservice = False
 
-		res = [None]
+		res = []
 		if self.graphics_mode:  # render borders if GMEPG is in graphics mode
 			if self.borderTopPix is not None:
 				res.append(MultiContentEntryPixmapAlphaBlend(
@@ -567,10 +658,6 @@ class EPGList(GUIComponent):
 				color=serviceForeColor, color_sel=serviceForeColor,
 				backcolor=serviceBackColor if bgpng is None else None, backcolor_sel=serviceBackColor if bgpng is None else None))
 		if self.showPicon:
-			if picon is None:  # go find picon and cache its location
-				picon = getPiconName(service)
-				curIdx = self.l.getCurrentSelectionIndex()
-				self.list[curIdx] = (service, service_name, events, picon, serviceref)
 			piconWidth = self.picon_size.width()
 			piconHeight = self.picon_size.height()
 			if picon != "":
@@ -605,135 +692,122 @@ class EPGList(GUIComponent):
 				text=service_name,
 				color=serviceForeColor, color_sel=serviceForeColor,
 				backcolor=serviceBackColor if bgpng is None else None, backcolor_sel=serviceBackColor if bgpng is None else None))
+		return res
 
-		# Events for service
-		backColorSel = self.backColorSelected
-		if events:
-			start = self.time_base + self.offs * self.time_epoch * 60
-			end = start + self.time_epoch * 60
-
-			now = time()
-			for ev in events:  # (event_id, event_title, begin_time, duration)
-				stime = ev[2]
-				duration = ev[3]
-				xpos, ewidth = self.calcEntryPosAndWidthHelper(stime, duration, start, end, width)
-				rec = self.timer.isInTimer(ev[0], stime, duration, service)
-				dis = self.timer.isInTimer(ev[0], stime, duration, service, disabledTimers=True) if config.misc.graph_mepg.show_disabled_timers.value else None
-
-				# event box background
-				foreColorSelected = foreColor = self.foreColor
-				if stime <= now and now < stime + duration:
-					backColor = self.backColorNow
-					if isPlayableForCur(ServiceReference(service).ref):
-						foreColor = self.foreColorNow
-						foreColorSelected = self.foreColorSelected
-				else:
-					backColor = self.backColor
-
-				if selected and self.select_rect.x == xpos + left and self.selEvPix:
-					if rec is not None and rec[1][-1] in (2, 12, 17, 27):
-						foreColorSelected = self.foreColorSelectedRec
-					elif dis is not None and dis[1][-1] in (2, 12, 17, 27):
-						foreColorSelected = self.foreColorSelected
-					bgpng = self.selEvPix
-					backColorSel = None
-				elif rec is not None and rec[1][-1] in (2, 12, 17, 27):
-					bgpng = self.recEvPix
-					foreColor = self.foreColorRec
-					backColor = self.backColorRec
-				elif dis is not None and dis[1][-1] in (2, 12, 17, 27):
-					bgpng = self.disEvPix
-					foreColor = self.foreColorDis
-					backColor = self.backColorDis
-
-				elif stime <= now and now < stime + duration:
-					bgpng = self.nowEvPix
-				elif currentservice:
-					bgpng = self.curSerPix or self.othEvPix
-					backColor = self.backColorServiceSelected
-				else:
-					bgpng = self.othEvPix
+	def buildEventCells(self, ev, xpos, ewidth, isNow, selectedEvent, backColorSel, timers, currentservice, playable):
+		r2 = self.event_rect
+		left = r2.left()
+		top = r2.top()
+		height = r2.height()
+		rec, dis = timers
+		res = []
+
+		# event box background
+		foreColorSelected = foreColor = self.foreColor
+		if isNow:
+			backColor = self.backColorNow
+			if playable:
+				foreColor = self.foreColorNow
+				foreColorSelected = self.foreColorSelected
+		else:
+			backColor = self.backColor
+
+		if selectedEvent:
+			if rec is not None and rec[1][-1] in (2, 12, 17, 27):
+				foreColorSelected = self.foreColorSelectedRec
+			elif dis is not None and dis[1][-1] in (2, 12, 17, 27):
+				foreColorSelected = self.foreColorSelected
+			bgpng = self.selEvPix
+			backColorSel = None
+		elif rec is not None and rec[1][-1] in (2, 12, 17, 27):
+			bgpng = self.recEvPix
+			foreColor = self.foreColorRec
+			backColor = self.backColorRec
+		elif dis is not None and dis[1][-1] in (2, 12, 17, 27):
+			bgpng = self.disEvPix
+			foreColor = self.foreColorDis
+			backColor = self.backColorDis
+
+		elif isNow:
+			bgpng = self.nowEvPix
+		elif currentservice:
+			bgpng = self.curSerPix or self.othEvPix
+			backColor = self.backColorServiceSelected
+		else:
+			bgpng = self.othEvPix
 
-				if bgpng is not None:
-					res.append(MultiContentEntryPixmap(
-						pos=(left + xpos, top + self.eventBorderHorWidth),
-						size=(ewidth, height - self.eventBorderHorWidth),
-						png=bgpng,
+		if bgpng is not None:
+			res.append(MultiContentEntryPixmap(
+				pos=(left + xpos, top + self.eventBorderHorWidth),
+				size=(ewidth, height - self.eventBorderHorWidth),
+				png=bgpng,
+				flags=BT_SCALE))
+		else:
+			res.append(MultiContentEntryText(
+				pos=(left + xpos, top), size=(ewidth, height),
+				font=1, flags=int(config.misc.graph_mepg.event_alignment.value),
+				text="", color=None, color_sel=None,
+				backcolor=backColor, backcolor_sel=backColorSel,
+				border_width=self.eventBorderWidth, border_color=self.borderColor))
+
+		# event text
+		evX = left + xpos + self.eventBorderVerWidth + self.eventNamePadding
+		evY = top + self.eventBorderHorWidth
+		evW = ewidth - 2 * (self.eventBorderVerWidth + self.eventNamePadding)
+		evH = height - 2 * self.eventBorderHorWidth
+		if evW > 0:
+			res.append(MultiContentEntryText(
+				pos=(evX, evY),
+				size=(evW, evH),
+				font=1,
+				flags=int(config.misc.graph_mepg.event_alignment.value),
+				text=ev[1],
+				color=foreColor,
+				color_sel=foreColorSelected,
+				backcolor=backColor if bgpng is None else None, backcolor_sel=backColorSel if bgpng is None else None))
+
+		# Event box borders.
+		if self.graphics_mode:
+			if self.borderTopPix is not None:
+				res.append(MultiContentEntryPixmapAlphaBlend(
+						pos=(left + xpos, top),
+						size=(ewidth, self.eventBorderWidth),
+						png=self.borderTopPix,
+						flags=BT_SCALE))
+			if self.borderBottomPix is not None:
+				res.append(MultiContentEntryPixmapAlphaBlend(
+						pos=(left + xpos, height - self.eventBorderWidth),
+						size=(ewidth, self.eventBorderWidth),
+						png=self.borderBottomPix,
+						flags=BT_SCALE))
+			if self.borderLeftPix is not None:
+				res.append(MultiContentEntryPixmapAlphaBlend(
+						pos=(left + xpos, top),
+						size=(self.eventBorderWidth, height),
+						png=self.borderLeftPix,
+						flags=BT_SCALE))
+			if self.borderRightPix is not None:
+				res.append(MultiContentEntryPixmapAlphaBlend(
+						pos=(left + xpos + ewidth - self.eventBorderWidth, top),
+						size=(self.eventBorderWidth, height),
+						png=self.borderRightPix,
 						flags=BT_SCALE))
-				else:
-					res.append(MultiContentEntryText(
-						pos=(left + xpos, top), size=(ewidth, height),
-						font=1, flags=int(config.misc.graph_mepg.event_alignment.value),
-						text="", color=None, color_sel=None,
-						backcolor=backColor, backcolor_sel=backColorSel,
-						border_width=self.eventBorderWidth, border_color=self.borderColor))
-
-				# event text
-				evX = left + xpos + self.eventBorderVerWidth + self.eventNamePadding
-				evY = top + self.eventBorderHorWidth
-				evW = ewidth - 2 * (self.eventBorderVerWidth + self.eventNamePadding)
-				evH = height - 2 * self.eventBorderHorWidth
-				if evW > 0:
-					res.append(MultiContentEntryText(
-						pos=(evX, evY),
-						size=(evW, evH),
-						font=1,
-						flags=int(config.misc.graph_mepg.event_alignment.value),
-						text=ev[1],
-						color=foreColor,
-						color_sel=foreColorSelected,
-						backcolor=backColor if bgpng is None else None, backcolor_sel=backColorSel if bgpng is None else None))
-
-				# Event box borders.
-				if self.graphics_mode:
-					if self.borderTopPix is not None:
-						res.append(MultiContentEntryPixmapAlphaBlend(
-								pos=(left + xpos, top),
-								size=(ewidth, self.eventBorderWidth),
-								png=self.borderTopPix,
-								flags=BT_SCALE))
-					if self.borderBottomPix is not None:
-						res.append(MultiContentEntryPixmapAlphaBlend(
-								pos=(left + xpos, height - self.eventBorderWidth),
-								size=(ewidth, self.eventBorderWidth),
-								png=self.borderBottomPix,
-								flags=BT_SCALE))
-					if self.borderLeftPix is not None:
-						res.append(MultiContentEntryPixmapAlphaBlend(
-								pos=(left + xpos, top),
-								size=(self.eventBorderWidth, height),
-								png=self.borderLeftPix,
-								flags=BT_SCALE))
-					if self.borderRightPix is not None:
-						res.append(MultiContentEntryPixmapAlphaBlend(
-								pos=(left + xpos + ewidth - self.eventBorderWidth, top),
-								size=(self.eventBorderWidth, height),
-								png=self.borderRightPix,
-								flags=BT_SCALE))
-
-				# recording icons
-				clockIconXPos = left + xpos + ewidth
-				if config.misc.graph_mepg.show_record_clocks.value and rec is not None:
-					for i in range(len(rec[1])):
-						clockpng = self.clocks[rec[1][len(rec[1]) - 1 - i]]
-						pix_size = clockpng.size()
-						pix_width = pix_size.width()
-						pix_height = pix_size.height()
-						if ewidth < pix_width:
-							break
-						clockIconXPos -= pix_width + self.iconXPadding
-						res.append(MultiContentEntryPixmapAlphaBlend(
-							pos=(clockIconXPos, top + height - (pix_height + self.iconYPadding)),
-							size=(pix_width, pix_height),
-							png=clockpng))
 
-		else:
-			if selected and self.selEvPix:
+		# recording icons
+		clockIconXPos = left + xpos + ewidth
+		if config.misc.graph_mepg.show_record_clocks.value and rec is not None:
+			for i in range(len(rec[1])):
+				clockpng = self.clocks[rec[1][len(rec[1]) - 1 - i]]
+				pix_size = clockpng.size()
+				pix_width = pix_size.width()
+				pix_height = pix_size.height()
+				if ewidth < pix_width:
+					break
+				clockIconXPos -= pix_width + self.iconXPadding
 				res.append(MultiContentEntryPixmapAlphaBlend(
-					pos=(r2.x + self.eventBorderVerWidth, r2.y + self.eventBorderHorWidth),
-					size=(r2.w - 2 * self.eventBorderVerWidth, r2.h - 2 * self.eventBorderHorWidth),
-					png=self.selEvPix,
-					flags=BT_SCALE))
+					pos=(clockIconXPos, top + height - (pix_height + self.iconYPadding)),
+					size=(pix_width, pix_height),
+					png=clockpng))
 		return res
 
 	def selEntry(self, dir, visible=True):
@@ -794,44 +868,75 @@ class EPGList(GUIComponent):
 		if stime is not None:
 			self.time_base = int(stime)
 		if services is None:
-			time_base = self.time_base + self.offs * self.time_epoch * 60
-			test = [(service[0], 0, time_base, self.time_epoch) for service in self.list]
-			serviceList = self.list
-			piconIdx = 3
-			channelIdx = 4
+			serviceList = [(service[0], service[3], service[4]) for service in self.list]  # (service, picon, serviceref)
 		else:
 			self.cur_event = None
 			self.cur_service = None
-			test = [(service.ref.toString(), 0, self.time_base, self.time_epoch) for service in services]
-			serviceList = services
-			piconIdx = 0
-			channelIdx = None
-
-		test.insert(0, 'XRnITBD')  # return record, service ref, service name, event id, event title, begin time, duration
-		epg_data = [] if self.epgcache is None else self.epgcache.lookupEvent(test)
+			self.rowCache = {}
+			self.epgBuffer = {}
+			serviceList = [(service.ref.toString(), None, service) for service in services]
+		start = self.time_base + self.offs * self.time_epoch * 60
+		end = start + self.time_epoch * 60
+		self.loadEPGWindow([x[0] for x in serviceList], start, end)
 		self.list = []
-		tmp_list = None
-		service = ""
-		sname = ""
-
-		serviceIdx = 0
-		for x in epg_data:
-			if service != x[0]:
-				if tmp_list is not None:
-					picon = None if piconIdx == 0 else serviceList[serviceIdx][piconIdx]
-					self.list.append((service, sname, tmp_list[0][0] is not None and tmp_list or None, picon, serviceList[serviceIdx] if (channelIdx is None) else serviceList[serviceIdx][channelIdx]))
-					serviceIdx += 1
-				service = x[0]
-				sname = x[1]
-				tmp_list = []
-			tmp_list.append((x[2], x[3], x[4], x[5]))  # (event_id, event_title, begin_time, duration)
-		if tmp_list and len(tmp_list):
-			picon = None if piconIdx == 0 else serviceList[serviceIdx][piconIdx]
-			self.list.append((service, sname, tmp_list[0][0] is not None and tmp_list or None, picon, serviceList[serviceIdx] if (channelIdx is None) else serviceList[serviceIdx][channelIdx]))
-			serviceIdx += 1
+		for service, picon, serviceref in serviceList:
+			sname, events = self.getEPGWindow(service, start, end)
+			self.list.append((service, sname, events or None, picon, serviceref))
 
 		self.l.setList(self.list)
 		self.findBestEvent()
+		self.prefetchTimer.start(self.PREFETCH_DELAY, True)
+
+	def loadEPGWindow(self, services, start, end):
+		# Make sure the EPG buffer covers start ... end for all services, anything missing
+		# is looked up together with one epoch either side.
+		now = time()
+		missing = []
+		for service in services:
+			entry = self.epgBuffer.get(service)
+			if entry is None or entry[2] > start or entry[3] < end or now - entry[4] > self.EPG_BUFFER_LIFETIME:
+				missing.append(service)
+		if missing:
+			margin = self.time_epoch * 60
+			self.fetchEPG(missing, start - margin, end + margin)
+
+	def fetchEPG(self, services, start, end):
+		fetched = {}
+		if self.epgcache is not None:
+			query = ["XRnITBD"]  # return record, service ref, service name, event id, event title, begin time, duration
+			query.extend((service, 0, start, (end - start) // 60) for service in services)
+			for x in self.epgcache.lookupEvent(query):
+				sname, events = fetched.setdefault(x[0], (x[1], []))
+				if x[2] is not None:
+					events.append((x[2], x[3], x[4], x[5]))  # (event_id, event_title, begin_time, duration)
+		now = time()
+		for service in services:
+			sname, events = fetched.get(service, ("", []))
+			fetchTime, bufferStart, bufferEnd = now, start, end
+			entry = self.epgBuffer.get(service)
+			if entry is not None and now - entry[4] <= self.EPG_BUFFER_LIFETIME and entry[2] <= end and entry[3] >= start:
+				# merge with the slice we already have, the new lookup wins where both overlap
+				merged = {ev[2]: ev for ev in entry[1] if ev[2] + ev[3] <= start or ev[2] >= end}
+				merged.update((ev[2], ev) for ev in events)
+				events = [merged[begin] for begin in sorted(merged)]
+				fetchTime = entry[4]
+				bufferStart, bufferEnd = min(start, entry[2]), max(end, entry[3])
+			self.epgBuffer[service] = (sname, events, bufferStart, bufferEnd, fetchTime, [ev[2] for ev in events])
+
+	def getEPGWindow(self, service, start, end):
+		sname, events, bufferStart, bufferEnd, fetchTime, begins = self.epgBuffer.get(service, ("", [], 0, 0, 0, []))
+		first = max(bisect_right(begins, start) - 1, 0)
+		if first < len(events) and events[first][2] + events[first][3] <= start:
+			first += 1
+		return sname, events[first:bisect_left(begins, end)]
+
+	def prefetchEPG(self):
+		# Runs once the page is shown, so the next page shift in either direction is
+		# served from the buffer.
+		if self.list:
+			epoch = self.time_epoch * 60
+			start = self.getTimeBase()
+			self.loadEPGWindow([service[0] for service in self.list], start - epoch, start + 2 * epoch)
 
 	def getEventRect(self):
 		rc = self.event_rect
@@ -59,6 +59,7 @@ class BackupScreen(ConfigListScreen, Screen):
 
 	def doBackup(self):
 		configfile.save()
+		configfile.flush()
 		if config.plugins.softwaremanager.epgcache.value:
 			eEPGCache.getInstance().save()
 		try:
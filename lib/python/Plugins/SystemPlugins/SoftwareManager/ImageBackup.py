@@ -149,6 +149,7 @@ class ImageBackup(Screen):
 	def doFullBackup(self, answer):
 		if answer is not None and answer[1]:
 			configfile.save()
+			configfile.flush()
 
 			self.RECOVERY = answer[3]
 			self.DIRECTORY = "%s/images" % answer[2]
@@ -586,6 +587,7 @@ class ImageBackup(Screen):
 		cmdlist.append(self.makeEcho(_("Now building the Backup Image")))
 
 		configfile.save()
+		configfile.flush()
 
 		def initDestination(destination):
 			system("rm -rf %s" % destination)
@@ -1,11 +1,11 @@
 # -*- coding: utf-8 -*-
 import os
-from enigma import eEPGCache, getBestPlayableServiceReference, eStreamServer, eServiceReference, iRecordableService, quitMainloop, eActionMap, setPreferredTuner
+from enigma import eEPGCache, eTimer, getBestPlayableServiceReference, eStreamServer, eServiceReference, iRecordableService, quitMainloop, eActionMap, setPreferredTuner
 
 from Components.config import config
 from Components.UsageConfig import defaultMoviePath
 from Components.SystemInfo import BoxInfo
-from Components.TimerSanityCheck import TimerSanityCheck
+from Components.TimerSanityCheck import TimerOccupancy, TimerSanityCheck
 
 from Screens.MessageBox import MessageBox
 from Screens.PictureInPicture import PictureInPicture
@@ -26,7 +26,7 @@ import NavigationInstance
 from ServiceReference import ServiceReference, isPlayableForCur
 
 from time import localtime, strftime, ctime, time
-from bisect import insort
+from bisect import bisect_left, bisect_right, insort
 from sys import maxsize
 
 # ok, for descriptions etc we have:
@@ -176,6 +176,7 @@ class RecordTimerEntry(timer.TimerEntry):
 		self.description = description
 		self.disabled = disabled
 		self.timer = None
+		self.Timer = None
 		self.__record_service = None
 		self.rec_ref = None
 		self.start_prepare = 0
@@ -622,7 +623,8 @@ class RecordTimerEntry(timer.TimerEntry):
 
 		dummyentry = RecordTimerEntry(self.service_ref, self.begin, new_end, self.name, self.description, self.eit, disabled=True, justplay=self.justplay, afterEvent=self.afterEvent, dirname=self.dirname, tags=self.tags)
 		dummyentry.disabled = self.disabled
-		timersanitycheck = TimerSanityCheck(NavigationInstance.instance.RecordTimer.timer_list, dummyentry)
+		recordTimer = NavigationInstance.instance.RecordTimer
+		timersanitycheck = TimerSanityCheck(recordTimer.timer_list, dummyentry, occupancy=recordTimer.occupancy)
 		if not timersanitycheck.check():
 			simulTimerList = timersanitycheck.getSimulTimerList()
 			if simulTimerList is not None and len(simulTimerList) > 1:
@@ -770,6 +772,8 @@ class RecordTimerEntry(timer.TimerEntry):
 
 		if int(old_prepare) != int(self.start_prepare):
 			self.log(15, "record time changed, start prepare is now: %s" % ctime(self.start_prepare))
+		if self.Timer is not None:
+			self.Timer.occupancy.update(self)
 
 	def gotRecordEvent(self, record, event):
 		# TODO: this is not working (never true), please fix. (comparing two swig wrapped ePtrs)
@@ -869,11 +873,18 @@ def createTimer(xml):
 
 
 class RecordTimer(timer.Timer):
+	SAVE_DELAY = 1000  # milliseconds to wait for further changes before timers.xml is written
+
 	def __init__(self):
 		timer.Timer.__init__(self)
 
 		self.Filename = resolveFilename(SCOPE_CONFIG, "timers.xml")
 		self.fallback_timer_list = []
+		self.occupancy = TimerOccupancy()
+		self.timerGeneration = 0
+		self.serviceTimerIndex = {}
+		self.timerXMLCache = {}  # timer -> (saved values, XML fragment)
+		self.saveTimerDelay = None
 
 		try:
 			self.loadTimer()
@@ -900,11 +911,13 @@ class RecordTimer(timer.Timer):
 				w.state += 1
 
 		self.timer_list.remove(w)
+		self.unqueueEntry(w)
 
 		# did this timer reached the last state?
 		if w.state < RecordTimerEntry.StateEnded:
 			# no, sort it into active list
 			insort(self.timer_list, w)
+			self.queueEntry(w)
 		else:
 			# yes. Process repeated, and re-add.
 			if w.repeated:
@@ -924,6 +937,7 @@ class RecordTimer(timer.Timer):
 					insort(self.processed_timers, w)
 					self.saveTimer()
 
+		self.timersChanged()
 		self.stateChanged(w)
 
 	def checkWrongRunningTimers(self):
@@ -941,8 +955,17 @@ class RecordTimer(timer.Timer):
 		return False
 
 	def loadTimer(self):
+		# stream the file, but only record the timers once all of it could be parsed
+		timers = []
 		try:
-			doc = xml.etree.ElementTree.parse(self.Filename)
+			root = None
+			for event, element in xml.etree.ElementTree.iterparse(self.Filename, events=("start", "end")):
+				if event == "start":
+					if root is None:
+						root = element
+				elif element.tag == "timer":
+					timers.append(createTimer(element))
+					root.clear()  # the timer is built, don't keep its element around
 		except SyntaxError:
 			AddPopup(_("The timer file (timers.xml) is corrupt and could not be loaded."), type=MessageBox.TYPE_ERROR, timeout=0, id="TimerLoadFailed")
 
@@ -957,12 +980,9 @@ class RecordTimer(timer.Timer):
 			print("[RecordTimer] timers.xml not found!")
 			return
 
-		root = doc.getroot()
-
 		checkit = False
 		timer_text = ""
-		for timer in root.findall("timer"):
-			newTimer = createTimer(timer)
+		for newTimer in timers:
 			conflict_list = self.record(newTimer, ignoreTSC=True, dosave=False, loadtimer=True)
 			if conflict_list:
 				checkit = True
@@ -972,103 +992,83 @@ class RecordTimer(timer.Timer):
 			AddPopup(_("Timer overlap in timers.xml detected!\nPlease recheck it!") + timer_text, type=MessageBox.TYPE_ERROR, timeout=0, id="TimerLoadFailed")
 
 	def saveTimer(self):
-		# root_element = xml.etree.ElementTree.Element('timers')
-		# root_element.text = "\n"
-
-		# for timer in self.timer_list + self.processed_timers:
-			# some timers (instant records) don't want to be saved.
-			# skip them
-			# if timer.dontSave:
-				#continue
-			# t = xml.etree.ElementTree.SubElement(root_element, 'timers')
-			# t.set("begin", str(int(timer.begin)))
-			# t.set("end", str(int(timer.end)))
-			# t.set("serviceref", str(timer.service_ref))
-			# t.set("repeated", str(timer.repeated))
-			# t.set("name", timer.name)
-			# t.set("description", timer.description)
-			# t.set("afterevent", str({
-			#	AFTEREVENT.NONE: "nothing",
-			#	AFTEREVENT.STANDBY: "standby",
-			#	AFTEREVENT.DEEPSTANDBY: "deepstandby",
-			#	AFTEREVENT.AUTO: "auto"}))
-			# if timer.eit is not None:
-			#	t.set("eit", str(timer.eit))
-			# if timer.dirname is not None:
-			#	t.set("location", str(timer.dirname))
-			# t.set("disabled", str(int(timer.disabled)))
-			# t.set("justplay", str(int(timer.justplay)))
-			# t.text = "\n"
-			# t.tail = "\n"
-
-			#for time, code, msg in timer.log_entries:
-				#l = xml.etree.ElementTree.SubElement(t, 'log')
-				#l.set("time", str(time))
-				#l.set("code", str(code))
-				#l.text = str(msg)
-				#l.tail = "\n"
-
-		#doc = xml.etree.ElementTree.ElementTree(root_element)
-		#doc.write(self.Filename)
+		# bursts of changes (e.g. an AutoTimer run) are written once, shortly after the last one
+		if self.saveTimerDelay is None:
+			self.saveTimerDelay = eTimer()
+			self.saveTimerDelay.callback.append(self.saveTimerNow)
+		self.saveTimerDelay.start(self.SAVE_DELAY, True)
+
+	def getTimerXML(self, timer):
+		# the XML of a timer is only rebuilt when one of the saved values changed
+		debug = config.recording.debug.value
+		key = (timer.begin, timer.end, str(timer.service_ref), timer.repeated, timer.name, timer.description, timer.afterEvent, timer.eit, timer.dirname, tuple(timer.tags), timer.disabled, timer.justplay, timer.always_zap, timer.pipzap, timer.zap_wakeup, timer.rename_repeat, timer.conflict_detection, timer.descramble, timer.record_ecm, tuple(sorted(timer.flags)), debug and len(timer.log_entries))
+		cached = self.timerXMLCache.get(timer)
+		if cached is not None and cached[0] == key:
+			return cached[1]
 
 		list = []
-
-		list.append('<?xml version="1.0" ?>\n')
-		list.append('<timers>\n')
-
-		for timer in self.timer_list + self.processed_timers:
-			if timer.dontSave:
-				continue
-
-			list.append('<timer')
-			list.append(' begin="' + str(int(timer.begin)) + '"')
-			list.append(' end="' + str(int(timer.end)) + '"')
-			list.append(' serviceref="' + stringToXML(str(timer.service_ref)) + '"')
-			list.append(' repeated="' + str(int(timer.repeated)) + '"')
-			list.append(' name="' + str(stringToXML(timer.name)) + '"')
-			list.append(' description="' + str(stringToXML(timer.description)) + '"')
-			list.append(' afterevent="' + str(stringToXML({
-				AFTEREVENT.NONE: "nothing",
-				AFTEREVENT.STANDBY: "standby",
-				AFTEREVENT.DEEPSTANDBY: "deepstandby",
-				AFTEREVENT.AUTO: "auto"
-				}[timer.afterEvent])) + '"')
-			if timer.eit is not None:
-				list.append(' eit="' + str(timer.eit) + '"')
-			if timer.dirname:
-				list.append(' location="' + str(stringToXML(timer.dirname)) + '"')
-			if timer.tags:
-				list.append(' tags="' + str(stringToXML(' '.join(timer.tags))) + '"')
-			if timer.disabled:
-				list.append(' disabled="' + str(int(timer.disabled)) + '"')
-			list.append(' justplay="' + str(int(timer.justplay)) + '"')
-			list.append(' always_zap="' + str(int(timer.always_zap)) + '"')
-			list.append(' pipzap="' + str(int(timer.pipzap)) + '"')
-			list.append(' zap_wakeup="' + str(timer.zap_wakeup) + '"')
-			list.append(' rename_repeat="' + str(int(timer.rename_repeat)) + '"')
-			list.append(' conflict_detection="' + str(int(timer.conflict_detection)) + '"')
-			list.append(' descramble="' + str(int(timer.descramble)) + '"')
-			list.append(' record_ecm="' + str(int(timer.record_ecm)) + '"')
-			if timer.flags:
-				list.append(' flags="' + ' '.join([stringToXML(x) for x in timer.flags]) + '"')
-			list.append('>\n')
-
-			if config.recording.debug.value:
-				for time, code, msg in timer.log_entries:
-					list.append('<log')
-					list.append(' code="' + str(code) + '"')
-					list.append(' time="' + str(time) + '"')
-					list.append('>')
-					list.append(str(stringToXML(msg)))
-					list.append('</log>\n')
-
-			list.append('</timer>\n')
-
-		list.append('</timers>\n')
+		list.append('<timer')
+		list.append(' begin="' + str(int(timer.begin)) + '"')
+		list.append(' end="' + str(int(timer.end)) + '"')
+		list.append(' serviceref="' + stringToXML(str(timer.service_ref)) + '"')
+		list.append(' repeated="' + str(int(timer.repeated)) + '"')
+		list.append(' name="' + str(stringToXML(timer.name)) + '"')
+		list.append(' description="' + str(stringToXML(timer.description)) + '"')
+		list.append(' afterevent="' + str(stringToXML({
+			AFTEREVENT.NONE: "nothing",
+			AFTEREVENT.STANDBY: "standby",
+			AFTEREVENT.DEEPSTANDBY: "deepstandby",
+			AFTEREVENT.AUTO: "auto"
+			}[timer.afterEvent])) + '"')
+		if timer.eit is not None:
+			list.append(' eit="' + str(timer.eit) + '"')
+		if timer.dirname:
+			list.append(' location="' + str(stringToXML(timer.dirname)) + '"')
+		if timer.tags:
+			list.append(' tags="' + str(stringToXML(' '.join(timer.tags))) + '"')
+		if timer.disabled:
+			list.append(' disabled="' + str(int(timer.disabled)) + '"')
+		list.append(' justplay="' + str(int(timer.justplay)) + '"')
+		list.append(' always_zap="' + str(int(timer.always_zap)) + '"')
+		list.append(' pipzap="' + str(int(timer.pipzap)) + '"')
+		list.append(' zap_wakeup="' + str(timer.zap_wakeup) + '"')
+		list.append(' rename_repeat="' + str(int(timer.rename_repeat)) + '"')
+		list.append(' conflict_detection="' + str(int(timer.conflict_detection)) + '"')
+		list.append(' descramble="' + str(int(timer.descramble)) + '"')
+		list.append(' record_ecm="' + str(int(timer.record_ecm)) + '"')
+		if timer.flags:
+			list.append(' flags="' + ' '.join([stringToXML(x) for x in timer.flags]) + '"')
+		list.append('>\n')
+
+		if debug:
+			for time, code, msg in timer.log_entries:
+				list.append('<log')
+				list.append(' code="' + str(code) + '"')
+				list.append(' time="' + str(time) + '"')
+				list.append('>')
+				list.append(str(stringToXML(msg)))
+				list.append('</log>\n')
+
+		list.append('</timer>\n')
+
+		fragment = ''.join(list)
+		self.timerXMLCache[timer] = (key, fragment)
+		return fragment
+
+	def saveTimerNow(self):
+		if self.saveTimerDelay is not None:
+			self.saveTimerDelay.stop()
+
+		timers = [timer for timer in self.timer_list + self.processed_timers if not timer.dontSave]
+		for timer in set(self.timerXMLCache) - set(timers):
+			del self.timerXMLCache[timer]
 
 		file = open(self.Filename + ".writing", "w")
-		for x in list:
-			file.write(x)
+		file.write('<?xml version="1.0" ?>\n')
+		file.write('<timers>\n')
+		for timer in timers:
+			file.write(self.getTimerXML(timer))
+		file.write('</timers>\n')
 		file.flush()
 
 		import os
@@ -1116,7 +1116,7 @@ class RecordTimer(timer.Timer):
 
 	def record(self, entry, ignoreTSC=False, dosave=True, loadtimer=False):
 		check_timer_list = self.timer_list[:]
-		timersanitycheck = TimerSanityCheck(check_timer_list, entry)
+		timersanitycheck = TimerSanityCheck(check_timer_list, entry, occupancy=self.occupancy)
 		answer = None
 		if not timersanitycheck.check():
 			if not ignoreTSC:
@@ -1142,6 +1142,7 @@ class RecordTimer(timer.Timer):
 		entry.timeChanged()
 		print("[[RecordTimer]] Record " + str(entry))
 		entry.Timer = self
+		self.occupancy.add(entry)
 		self.addTimerEntry(entry)
 		if dosave:
 			self.saveTimer()
@@ -1249,6 +1250,54 @@ class RecordTimer(timer.Timer):
 
 	def setFallbackTimerList(self, list):
 		self.fallback_timer_list = [timer for timer in list if timer.state != 3]
+		self.timersChanged()
+
+	def timersChanged(self):
+		# drop everything derived from the timer lists, see also timerGeneration
+		self.timerGeneration += 1
+		self.serviceTimerIndex = {}
+
+	def addTimerEntry(self, entry, noRecalc=0):
+		timer.Timer.addTimerEntry(self, entry, noRecalc)
+		self.timersChanged()
+
+	def timeChanged(self, entry):
+		timer.Timer.timeChanged(self, entry)
+		self.timersChanged()
+
+	def buildServiceTimerIndex(self, disabledTimers):
+		# service reference (first 11 fields) -> (sorted (begin, position, timer) of single timers, longest single timer, repeated timers)
+		index = {}
+		timersList = self.getAllTimersList() if not disabledTimers else self.getDisabledTimers()
+		for position, x in enumerate(timersList):
+			if disabledTimers and not x.disabled:
+				continue
+			refstr = ':'.join(x.service_ref.ref.toString().split(':')[:11])
+			singles, maxDuration, repeated = index.get(refstr) or ([], 0, [])
+			if x.repeated:
+				repeated.append((position, x))
+			else:
+				singles.append((x.begin, position, x))
+				maxDuration = max(maxDuration, x.end - x.begin)
+			index[refstr] = (singles, maxDuration, repeated)
+		for singles, maxDuration, repeated in index.values():
+			singles.sort(key=lambda item: item[:2])
+		return index
+
+	def getServiceTimers(self, refstr, begin, end, disabledTimers=False):
+		# timers on the service that can overlap begin..end, in the order of the timer lists
+		index = self.serviceTimerIndex.get(disabledTimers)
+		if index is None:
+			index = self.serviceTimerIndex[disabledTimers] = self.buildServiceTimerIndex(disabledTimers)
+		if refstr not in index:
+			return []
+		singles, maxDuration, repeated = index[refstr]
+		# allow for the 59 seconds offset correction and the minute added to short zap timers
+		lo = bisect_left(singles, (begin - maxDuration - 60,))
+		hi = bisect_right(singles, (end + 60, maxsize))
+		timers = [item[1:] for item in singles[lo:hi]] + repeated
+		timers.sort(key=lambda item: item[0])
+		return [x for position, x in timers]
 
 	def getAllTimersList(self):
 		return self.timer_list + self.fallback_timer_list
@@ -1264,97 +1313,73 @@ class RecordTimer(timer.Timer):
 		check_offset_time = not config.recording.margin_before.value and not config.recording.margin_after.value
 		end = begin + duration
 		refstr = ':'.join(service.split(':')[:11])
-		timersList = self.getAllTimersList() if not disabledTimers else self.getDisabledTimers()
-		for x in timersList:
+		for x in self.getServiceTimers(refstr, begin, end, disabledTimers):
 			if disabledTimers and not x.disabled:
 				continue
-			check = ':'.join(x.service_ref.ref.toString().split(':')[:11]) == refstr
-			if check:
-				timer_end = x.end
-				timer_begin = x.begin
-				type_offset = 0
-				if not x.repeated and check_offset_time:
-					if 0 < end - timer_end <= 59:
-						timer_end = end
-					elif 0 < timer_begin - begin <= 59:
-						timer_begin = begin
-				if x.justplay:
-					type_offset = 5
-					if (timer_end - x.begin) <= 1:
-						timer_end += 60
-					if x.pipzap and not x.repeated:
-						type_offset = 30
-				if x.always_zap:
-					type_offset = 10
-
-				timer_repeat = x.repeated
-				# if set 'don't stop current event but disable coming events' for repeat timer
-				running_only_curevent = x.disabled and x.isRunning() and timer_repeat
-				if running_only_curevent:
-					timer_repeat = 0
-					type_offset += 15
-
-				if timer_repeat != 0:
-					type_offset += 15
-					if bt is None:
-						bt = localtime(begin)
-						bday = bt.tm_wday
-						begin2 = 1440 + bt.tm_hour * 60 + bt.tm_min
-						end2 = begin2 + duration / 60
-					xbt = localtime(x.begin)
-					xet = localtime(timer_end)
-					offset_day = False
-					checking_time = x.begin < begin or begin <= x.begin <= end
-					if xbt.tm_yday != xet.tm_yday:
-						oday = bday - 1
-						if oday == -1:
-							oday = 6
-						offset_day = x.repeated & (1 << oday)
-					xbegin = 1440 + xbt.tm_hour * 60 + xbt.tm_min
-					xend = xbegin + ((timer_end - x.begin) / 60)
-					if xend < xbegin:
-						xend += 1440
-					if x.repeated & (1 << bday) and checking_time:
-						if begin2 < xbegin <= end2:
-							if xend < end2:
-								# recording within event
-								time_match = (xend - xbegin) * 60
-								type = type_offset + 3
-							else:
-								# recording last part of event
-								time_match = (end2 - xbegin) * 60
-								type = type_offset + 1
-						elif xbegin <= begin2 <= xend:
-							if xend < end2:
-								# recording first part of event
-								time_match = (xend - begin2) * 60
-								type = type_offset + 4
-							else:
-								# recording whole event
-								time_match = (end2 - begin2) * 60
-								type = type_offset + 2
-						elif offset_day:
-							xbegin -= 1440
-							xend -= 1440
-							if begin2 < xbegin <= end2:
-								if xend < end2:
-									# recording within event
-									time_match = (xend - xbegin) * 60
-									type = type_offset + 3
-								else:
-									# recording last part of event
-									time_match = (end2 - xbegin) * 60
-									type = type_offset + 1
-							elif xbegin <= begin2 <= xend:
-								if xend < end2:
-									# recording first part of event
-									time_match = (xend - begin2) * 60
-									type = type_offset + 4
-								else:
-									# recording whole event
-									time_match = (end2 - begin2) * 60
-									type = type_offset + 2
-					elif offset_day and checking_time:
+			timer_end = x.end
+			timer_begin = x.begin
+			type_offset = 0
+			if not x.repeated and check_offset_time:
+				if 0 < end - timer_end <= 59:
+					timer_end = end
+				elif 0 < timer_begin - begin <= 59:
+					timer_begin = begin
+			if x.justplay:
+				type_offset = 5
+				if (timer_end - x.begin) <= 1:
+					timer_end += 60
+				if x.pipzap and not x.repeated:
+					type_offset = 30
+			if x.always_zap:
+				type_offset = 10
+
+			timer_repeat = x.repeated
+			# if set 'don't stop current event but disable coming events' for repeat timer
+			running_only_curevent = x.disabled and x.isRunning() and timer_repeat
+			if running_only_curevent:
+				timer_repeat = 0
+				type_offset += 15
+
+			if timer_repeat != 0:
+				type_offset += 15
+				if bt is None:
+					bt = localtime(begin)
+					bday = bt.tm_wday
+					begin2 = 1440 + bt.tm_hour * 60 + bt.tm_min
+					end2 = begin2 + duration / 60
+				xbt = localtime(x.begin)
+				xet = localtime(timer_end)
+				offset_day = False
+				checking_time = x.begin < begin or begin <= x.begin <= end
+				if xbt.tm_yday != xet.tm_yday:
+					oday = bday - 1
+					if oday == -1:
+						oday = 6
+					offset_day = x.repeated & (1 << oday)
+				xbegin = 1440 + xbt.tm_hour * 60 + xbt.tm_min
+				xend = xbegin + ((timer_end - x.begin) / 60)
+				if xend < xbegin:
+					xend += 1440
+				if x.repeated & (1 << bday) and checking_time:
+					if begin2 < xbegin <= end2:
+						if xend < end2:
+							# recording within event
+							time_match = (xend - xbegin) * 60
+							type = type_offset + 3
+						else:
+							# recording last part of event
+							time_match = (end2 - xbegin) * 60
+							type = type_offset + 1
+					elif xbegin <= begin2 <= xend:
+						if xend < end2:
+							# recording first part of event
+							time_match = (xend - begin2) * 60
+							type = type_offset + 4
+						else:
+							# recording whole event
+							time_match = (end2 - begin2) * 60
+							type = type_offset + 2
+					elif offset_day:
 						xbegin -= 1440
 						xend -= 1440
 						if begin2 < xbegin <= end2:
@@ -1375,35 +1400,56 @@ class RecordTimer(timer.Timer):
 								# recording whole event
 								time_match = (end2 - begin2) * 60
 								type = type_offset + 2
-				else:
-					if begin < timer_begin <= end:
-						if timer_end < end:
+				elif offset_day and checking_time:
+					xbegin -= 1440
+					xend -= 1440
+					if begin2 < xbegin <= end2:
+						if xend < end2:
 							# recording within event
-							time_match = timer_end - timer_begin
+							time_match = (xend - xbegin) * 60
 							type = type_offset + 3
 						else:
 							# recording last part of event
-							time_match = end - timer_begin
+							time_match = (end2 - xbegin) * 60
 							type = type_offset + 1
-					elif timer_begin <= begin <= timer_end:
-						if timer_end < end:
+					elif xbegin <= begin2 <= xend:
+						if xend < end2:
 							# recording first part of event
-							time_match = timer_end - begin
+							time_match = (xend - begin2) * 60
 							type = type_offset + 4
 						else:
 							# recording whole event
-							time_match = end - begin
+							time_match = (end2 - begin2) * 60
 							type = type_offset + 2
-				if time_match:
-					if type in (2, 7, 12, 17, 22, 27, 32):
-						# When full recording do not look further
-						returnValue = (time_match, [type])
-						break
-					elif returnValue:
-						if type not in returnValue[1]:
-							returnValue[1].append(type)
+			else:
+				if begin < timer_begin <= end:
+					if timer_end < end:
+						# recording within event
+						time_match = timer_end - timer_begin
+						type = type_offset + 3
 					else:
-						returnValue = (time_match, [type])
+						# recording last part of event
+						time_match = end - timer_begin
+						type = type_offset + 1
+				elif timer_begin <= begin <= timer_end:
+					if timer_end < end:
+						# recording first part of event
+						time_match = timer_end - begin
+						type = type_offset + 4
+					else:
+						# recording whole event
+						time_match = end - begin
+						type = type_offset + 2
+			if time_match:
+				if type in (2, 7, 12, 17, 22, 27, 32):
+					# When full recording do not look further
+					returnValue = (time_match, [type])
+					break
+				elif returnValue:
+					if type not in returnValue[1]:
+						returnValue[1].append(type)
+				else:
+					returnValue = (time_match, [type])
 
 		return returnValue
 
@@ -1432,15 +1478,21 @@ class RecordTimer(timer.Timer):
 		if entry in self.processed_timers:
 			# now the timer should be in the processed_timers list. remove it from there.
 			self.processed_timers.remove(entry)
+		self.occupancy.remove(entry)
+		self.timersChanged()
 		self.saveTimer()
 
 	def shutdown(self):
-		self.saveTimer()
+		self.saveTimerNow()
 
 	def cleanup(self):
 		timer.Timer.cleanup(self)
+		self.occupancy.retain(self.timer_list + self.processed_timers)
+		self.timersChanged()
 		self.saveTimer()
 
 	def cleanupDaily(self, days):
 		timer.Timer.cleanupDaily(self, days)
+		self.occupancy.retain(self.timer_list + self.processed_timers)
+		self.timersChanged()
 		self.saveTimer()
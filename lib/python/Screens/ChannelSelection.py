@@ -4,6 +4,7 @@ import Screens.InfoBar
 from Screens.ScreenSaver import InfoBarScreenSaver
 import Components.ParentalControl
 from Components.Button import Button
+from Components.ChannelNumbers import channelNumbers
 from Components.ConfigList import ConfigListScreen
 from Components.Label import Label
 from Components.Sources.Boolean import Boolean
@@ -399,12 +400,14 @@ class ChannelContextMenu(Screen):
 	def addDedicated3DFlag(self):
 		eDVBDB.getInstance().addFlag(eServiceReference(self.csel.getCurrentSelection().toString()), FLAG_IS_DEDICATED_3D)
 		eDVBDB.getInstance().reloadBouquets()
+		channelNumbers.invalidate()
 		self.set3DMode(True)
 		self.close()
 
 	def removeDedicated3DFlag(self):
 		eDVBDB.getInstance().removeFlag(eServiceReference(self.csel.getCurrentSelection().toString()), FLAG_IS_DEDICATED_3D)
 		eDVBDB.getInstance().reloadBouquets()
+		channelNumbers.invalidate()
 		self.set3DMode(False)
 		self.close()
 
@@ -424,12 +427,14 @@ class ChannelContextMenu(Screen):
 	def addCenterDVBSubsFlag(self):
 		eDVBDB.getInstance().addFlag(eServiceReference(self.csel.getCurrentSelection().toString()), FLAG_CENTER_DVB_SUBS)
 		eDVBDB.getInstance().reloadBouquets()
+		channelNumbers.invalidate()
 		config.subtitles.dvb_subtitles_centered.value = True
 		self.close()
 
 	def removeCenterDVBSubsFlag(self):
 		eDVBDB.getInstance().removeFlag(eServiceReference(self.csel.getCurrentSelection().toString()), FLAG_CENTER_DVB_SUBS)
 		eDVBDB.getInstance().reloadBouquets()
+		channelNumbers.invalidate()
 		config.subtitles.dvb_subtitles_centered.value = False
 		self.close()
 
@@ -498,6 +503,7 @@ class ChannelContextMenu(Screen):
 				self.csel.toggleMoveMode()
 			self.csel.removeBouquet()
 			eDVBDB.getInstance().reloadBouquets()
+			channelNumbers.invalidate()
 			self.close()
 
 	def purgeDeletedBouquets(self):
@@ -550,6 +556,7 @@ class ChannelContextMenu(Screen):
 	def reloadServicesBouquets(self):
 		eDVBDB.getInstance().reloadBouquets()
 		eDVBDB.getInstance().reloadServicelist()
+		channelNumbers.invalidate()
 		self.session.openWithCallback(self.close, MessageBox, _("The services/bouquets list is reloaded!"), MessageBox.TYPE_INFO, timeout=5)
 
 	def showServiceInformations(self):
@@ -1090,6 +1097,7 @@ class ChannelSelectionEdit:
 				mutableList.addService(current)
 				mutableList.moveService(current, index)
 				mutableList.flushChanges()
+				channelNumbers.invalidate()
 				self.servicelist.addService(current, True)
 				self.servicelist.removeCurrent()
 				if not self.servicelist.atEnd():
@@ -1104,6 +1112,7 @@ class ChannelSelectionEdit:
 			if not mutableList.addService(ref, current):
 				self.servicelist.addService(ref, True)
 				mutableList.flushChanges()
+				channelNumbers.invalidate()
 
 	def insertService(self, serviceref):
 		current = self.servicelist.getCurrent()
@@ -1111,6 +1120,7 @@ class ChannelSelectionEdit:
 		if mutableList:
 			if not mutableList.addService(serviceref, current):
 				mutableList.flushChanges()
+				channelNumbers.invalidate()
 				self.servicelist.addService(serviceref, True)
 				self.servicelist.resetRoot()
 
@@ -1125,10 +1135,12 @@ class ChannelSelectionEdit:
 				if not mutableList.addService(ref, current):
 					self.servicelist.addService(ref, True)
 					mutableList.flushChanges()
+					channelNumbers.invalidate()
 					break
 			elif not mutableList.addService(ref):
 				self.servicelist.addService(ref, True)
 				mutableList.flushChanges()
+				channelNumbers.invalidate()
 				break
 			cnt += 1
 
@@ -1162,12 +1174,14 @@ class ChannelSelectionEdit:
 				mutableBouquet.removeService(cur_service.ref)
 				mutableBouquet.flushChanges()
 				eDVBDB.getInstance().reloadBouquets()
+				channelNumbers.invalidate()
 				mutableAlternatives = new_ref.list().startEdit()
 				if mutableAlternatives:
 					mutableAlternatives.setListName(name)
 					if mutableAlternatives.addService(cur_service.ref):
 						print("[ChannelSelection] add", cur_service.ref.toString(), "to new alternatives failed")
 					mutableAlternatives.flushChanges()
+					channelNumbers.invalidate()
 					self.servicelist.addService(new_ref.ref, True)
 					self.servicelist.removeCurrent()
 					if not end:
@@ -1198,6 +1212,7 @@ class ChannelSelectionEdit:
 			if not mutableBouquetList.addService(new_bouquet_ref):
 				mutableBouquetList.flushChanges()
 				eDVBDB.getInstance().reloadBouquets()
+				channelNumbers.invalidate()
 				mutableBouquet = serviceHandler.list(new_bouquet_ref).startEdit()
 				if mutableBouquet:
 					mutableBouquet.setListName(bName)
@@ -1206,6 +1221,7 @@ class ChannelSelectionEdit:
 							if mutableBouquet.addService(service):
 								print("add", service.toString(), "to new bouquet failed")
 					mutableBouquet.flushChanges()
+					channelNumbers.invalidate()
 				else:
 					print("[ChannelSelection] get mutable list for new created bouquet failed")
 				# do some voodoo to check if current_root is equal to bouquet_root
@@ -1356,6 +1372,7 @@ class ChannelSelectionEdit:
 				if self.bouquet_mark_edit == EDIT_ALTERNATIVES and not new_marked and self.__marked:
 					self.mutableList.addService(eServiceReference(self.__marked[0]))
 				self.mutableList.flushChanges()
+				channelNumbers.invalidate()
 		self.__marked = []
 		self.clearMarks()
 		self.bouquet_mark_edit = OFF
@@ -1407,6 +1424,7 @@ class ChannelSelectionEdit:
 		if ref.valid() and mutableList is not None:
 			if not mutableList.removeService(ref):
 				mutableList.flushChanges()  # FIXME do not flush on each single removed service
+				channelNumbers.invalidate()
 				self.servicelist.removeCurrent()
 				self.servicelist.resetRoot()
 				playingref = self.session.nav.getCurrentlyPlayingServiceOrGroup()
@@ -1420,6 +1438,7 @@ class ChannelSelectionEdit:
 				service = self.servicelist.getCurrent()
 			if not mutableList.addService(service):
 				mutableList.flushChanges()
+				channelNumbers.invalidate()
 				# do some voodoo to check if current_root is equal to dest
 				cur_root = self.getRoot()
 				str1 = cur_root and cur_root.toString() or -1
@@ -1437,6 +1456,7 @@ class ChannelSelectionEdit:
 				self.toggleMoveMarked()  # unmark current entry
 			self.movemode = False
 			self.mutableList.flushChanges()  # FIXME add check if changes was made
+			channelNumbers.invalidate()
 			self.mutableList = None
 			self.functiontitle = ""
 			self.compileTitle()
@@ -1582,6 +1602,10 @@ class ChannelSelectionBase(Screen):
 		str = bouquet.toString()
 		offset = 0
 		if 'userbouquet.' in bouquet.toCompareString():
+			offset = channelNumbers.getBouquetNumOffset(self.bouquet_root, bouquet)
+			if offset is not None:
+				return offset
+			offset = 0
 			serviceHandler = eServiceCenter.getInstance()
 			servicelist = serviceHandler.list(bouquet)
 			if servicelist:
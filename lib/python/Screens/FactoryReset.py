@@ -84,7 +84,7 @@ class FactoryReset(Screen, ConfigListScreen, ProtectedScreen):
                                 self.keymaps.append(file)
                         elif file in ("automounts.xml",):
                                 self.networks.append(file)
-                        elif file in ("resumepoints.pkl",):
+                        elif file in ("resumepoints.pkl", "resumepoints.journal"):
                                 self.resumePoints.append(file)
                         elif file in ("settings",):
                                 self.settings.append(file)
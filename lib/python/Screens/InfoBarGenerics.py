@@ -2,7 +2,8 @@
 from Screens.ChannelSelection import ChannelSelection, BouquetSelector, SilentBouquetSelector
 
 from Components.ActionMap import ActionMap, HelpableActionMap, HelpableNumberActionMap, NumberActionMap
-from Components.Harddisk import harddiskmanager, findMountPoint
+from Components.ChannelNumbers import channelNumbers
+from Components.Harddisk import harddiskmanager
 from Components.Input import Input
 from Components.Label import Label
 from Components.MovieList import AUDIO_EXTENSIONS, MOVIE_EXTENSIONS, DVD_EXTENSIONS
@@ -38,6 +39,7 @@ from ServiceReference import ServiceReference, isPlayableForCur, getStreamRelayR
 
 from Tools.ASCIItranslit import legacyEncode
 from Tools.Directories import fileExists, fileReadLines, fileWriteLines, fileReadLinesISO, getRecordingFilename, moveFiles
+from Tools.ResumePoints import resumePoints
 from Tools.Notifications import AddPopup, AddNotificationWithCallback, current_notifications, lock, notificationAdded, notifications, RemovePopup
 from keyids import KEYFLAGS, KEYIDS, KEYIDNAMES
 from enigma import eAVControl, eTimer, eServiceCenter, eDVBServicePMTHandler, iServiceInformation, iPlayableService, eServiceReference, eEPGCache, eActionMap, getDesktop, eDVBDB, eDBoxLCD
@@ -67,7 +69,6 @@ def isStandardInfoBar(self):
 
 
 def setResumePoint(session):
-	global resumePointCache, resumePointCacheLast
 	service = session.nav.getCurrentService()
 	ref = session.nav.getCurrentlyPlayingServiceOrGroup()
 	if (service is not None) and (ref is not None):  # and (ref.type != 1):
@@ -76,77 +77,43 @@ def setResumePoint(session):
 		if seek:
 			pos = seek.getPlayPosition()
 			if not pos[0]:
-				key = ref.toString()
-				lru = int(time())
 				sl = seek.getLength()
 				if sl:
 					sl = sl[1]
 				else:
 					sl = None
-				resumePointCache[key] = [lru, pos[1], sl]
-				for k, v in list(resumePointCache.items()):
-					if v[0] < lru:
-						candidate = k
-						filepath = os.path.realpath(candidate.split(':')[-1])
-						mountpoint = findMountPoint(filepath)
-						if os.path.ismount(mountpoint) and not os.path.exists(filepath):
-							del resumePointCache[candidate]
-				if lru - resumePointCacheLast > 3600:
-					saveResumePoints()
+				resumePoints.set(ref.toString(), pos[1], sl)
 
 
 def delResumePoint(ref):
-	global resumePointCache, resumePointCacheLast
-	try:
-		del resumePointCache[ref.toString()]
-	except KeyError:
-		pass
-	if int(time()) - resumePointCacheLast > 3600:
-		saveResumePoints()
+	resumePoints.delete(ref.toString())
 
 
 def getResumePoint(session):
-	global resumePointCache
 	ref = session.nav.getCurrentlyPlayingServiceOrGroup()
 	if (ref is not None) and (ref.type != 1):
-		try:
-			entry = resumePointCache[ref.toString()]
-			entry[0] = int(time())  # update LRU timestamp
+		entry = resumePoints.touch(ref.toString())  # update LRU timestamp
+		if entry is not None:
 			return entry[1]
-		except KeyError:
-			return None
+	return None
 
 
 def saveResumePoints():
-	global resumePointCache, resumePointCacheLast
-	import pickle
-	try:
-		f = open('/etc/enigma2/resumepoints.pkl', 'wb')
-		pickle.dump(resumePointCache, f, pickle.HIGHEST_PROTOCOL)
-		f.close()
-	except Exception as ex:
-		print("[saveResumePoints] Failed to write resumepoints:", ex)
-	resumePointCacheLast = int(time())
+	resumePoints.save()
 
 
-def loadResumePoints():
-	import pickle
-	try:
-		f = open('/etc/enigma2/resumepoints.pkl', 'rb')
-		pickleFile = pickle.load(f)
-		f.close()
-		return pickleFile
-	except Exception as ex:
-		print("[loadResumePoints] Failed to load resumepoints:", ex)
-		return {}
+def updateResumePointCache():
+	resumePoints.load()
 
 
-def updateResumePointCache():
-	global resumePointCache
-	resumePointCache = loadResumePoints()
+# For plugins still using the former resume point cache.
+def loadResumePoints():
+	resumePoints.load()
+	return resumePoints.points
 
 
-resumePointCache = loadResumePoints()
+updateresumePointCache = updateResumePointCache
+resumePointCache = resumePoints.points
 resumePointCacheLast = int(time())
 
 
@@ -869,26 +836,25 @@ class InfoBarNumberZap:
 
 	def searchNumber(self, number, firstBouquetOnly=False, bouquet=None):
 		bouquet = bouquet or self.servicelist.getRoot()
+		root = self.servicelist.bouquet_root
 		service = None
-		serviceHandler = eServiceCenter.getInstance()
 		if not firstBouquetOnly:
-			service = self.searchNumberHelper(serviceHandler, number, bouquet)
+			if channelNumbers.isIndexed(root, bouquet):
+				service = channelNumbers.getService(root, bouquet, number)
+			else:
+				service = self.searchNumberHelper(eServiceCenter.getInstance(), number, bouquet)
 		if config.usage.multibouquet.value and not service:
-			bouquet = self.servicelist.bouquet_root
-			bouquetlist = serviceHandler.list(bouquet)
-			if bouquetlist:
-				bouquet = bouquetlist.getNext()
-				while bouquet.valid():
-					if bouquet.flags & eServiceReference.isDirectory and not bouquet.flags & eServiceReference.isInvisible:
-						service = self.searchNumberHelper(serviceHandler, number, bouquet)
-						if service:
-							playable = not (service.flags & (eServiceReference.isMarker | eServiceReference.isDirectory)) or (service.flags & eServiceReference.isNumberedMarker)
-							if not playable:
-								service = None
-							break
-						if config.usage.alternative_number_mode.value or firstBouquetOnly:
-							break
-					bouquet = bouquetlist.getNext()
+			if config.usage.alternative_number_mode.value or firstBouquetOnly:
+				bouquet = channelNumbers.getFirstBouquet(root)
+				service = bouquet and channelNumbers.getService(root, bouquet, number)
+			else:
+				service, bouquet = channelNumbers.getFirstService(root, number)
+			if service:
+				playable = not (service.flags & (eServiceReference.isMarker | eServiceReference.isDirectory)) or (service.flags & eServiceReference.isNumberedMarker)
+				if not playable:
+					service = None
+			if bouquet is None:
+				bouquet = eServiceReference()
 		return service, bouquet
 
 	def selectAndStartService(self, service, bouquet):
@@ -28,6 +28,7 @@ import Screens.InfoBar
 
 from Tools.NumericalTextInput import NumericalTextInput, MAP_SEARCH_UPCASE
 from Tools.Directories import resolveFilename, SCOPE_HDD
+from Tools.MovieIndex import movieIndex
 from Tools.BoundFunction import boundFunction
 import Tools.Trashcan
 import NavigationInstance
@@ -1723,6 +1724,7 @@ class MovieSelection(Screen, HelpableScreen, SelectionEventInfo, InfoBarBase, Pr
 					metafile.write("%s%s\n%s" % (sid, name, rest))
 					metafile.truncate()
 					metafile.close()
+					movieIndex.invalidate(os.path.dirname(oldfilename))
 					index = self.list.getCurrentIndex()
 					info = self.list.list[index]
 					if hasattr(info[3], 'txt'):
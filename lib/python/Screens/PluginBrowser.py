@@ -2,6 +2,7 @@ from os import unlink
 from os.path import isfile, normpath
 from enigma import checkInternetAccess, eConsoleAppContainer, eDVBDB, eTimer, gRGB
 from Components.ActionMap import ActionMap, NumberActionMap, HelpableActionMap, HelpableNumberActionMap
+from Components.ChannelNumbers import channelNumbers
 from Screens.HelpMenu import HelpableScreen
 from Components.config import config, ConfigSubsection, ConfigYesNo, ConfigText
 from skin import parseColor
@@ -629,6 +630,7 @@ class PluginDownloadBrowser(Screen):
 			self["text"].setText(_("Reloading bouquets and services..."))
 			eDVBDB.getInstance().reloadBouquets()
 			eDVBDB.getInstance().reloadServicelist()
+			channelNumbers.invalidate()
 		plugins.readPluginList(resolveFilename(SCOPE_PLUGINS))
 		self.container.appClosed.remove(self.runFinished)
 		self.container.dataAvail.remove(self.dataAvail)
@@ -7,6 +7,7 @@ from urllib.request import urlopen
 from email.utils import parsedate_to_datetime
 
 from enigma import eTimer, eDVBDB
+from Components.ChannelNumbers import channelNumbers
 from Screens.ChoiceBox import ChoiceBox
 from Screens.MessageBox import MessageBox
 from Screens.ParentalControlSetup import ProtectedScreen
@@ -248,6 +249,7 @@ class UpdatePlugin(Screen, ProtectedScreen):
 					self.showUpdateCompletedMessage()
 					eDVBDB.getInstance().reloadBouquets()
 					eDVBDB.getInstance().reloadServicelist()
+					channelNumbers.invalidate()
 			elif self.error == 0:
 				self.showUpdateCompletedMessage()
 			else:
@@ -1,9 +1,11 @@
 from os import stat
 from time import time
 from Components.config import config
+from Components.Converter.Poll import Poll
 
 ECM_INFO = "/tmp/ecm.info"
 EMPTY_ECM_INFO = "", "0", "0", "0"
+CHECK_INTERVAL = 500  # ms, how often ECM_INFO is checked for changes
 
 old_ecm_time = time()
 info = {}
@@ -30,6 +32,69 @@ def getCaidData():
 	)
 
 
+class EcmInfoMonitor(Poll, object):
+	"""Single reader of ECM_INFO for all converters.
+
+	The file is checked at most once per CHECK_INTERVAL and only read when its mtime
+	changed.  getSnapshot() returns the current (mtime, lines), mtime is None when there
+	is no file.  Callbacks connected with connectCallback() are called after a change.
+	"""
+	def __init__(self):
+		Poll.__init__(self)
+		self.__callbacks = []
+		self.__mtime = None
+		self.__lines = ()
+		self.__lastCheck = 0
+		self.__notified = None
+		self.poll_interval = CHECK_INTERVAL
+
+	def check(self):
+		self.__lastCheck = time()
+		try:
+			mtime = stat(ECM_INFO).st_mtime
+		except OSError:
+			mtime = None
+		if mtime != self.__mtime:
+			lines = ()
+			if mtime is not None:
+				try:
+					with open(ECM_INFO) as fd:
+						lines = tuple(fd.readlines())
+				except OSError:
+					mtime = None
+			self.__mtime = mtime
+			self.__lines = lines
+
+	def getSnapshot(self):
+		if (time() - self.__lastCheck) * 1000 >= CHECK_INTERVAL:
+			self.check()
+		return self.__mtime, self.__lines
+
+	def poll(self):
+		self.check()
+		if self.__mtime != self.__notified:  # the change may also have been found by getSnapshot()
+			self.__notified = self.__mtime
+			for callback in self.__callbacks[:]:
+				callback()
+
+	def connectCallback(self, func):
+		if func not in self.__callbacks:
+			self.__callbacks.append(func)
+		if not self.poll_enabled:
+			self.check()
+			self.__notified = self.__mtime
+			self.poll_enabled = True
+
+	def disconnectCallback(self, func):
+		if func in self.__callbacks:
+			self.__callbacks.remove(func)
+		if not len(self.__callbacks) and self.poll_enabled:
+			self.poll_enabled = False
+
+
+ecmInfoMonitor = EcmInfoMonitor()
+
+
 class GetEcmInfo:
 
 	def __init__(self):
@@ -37,9 +102,8 @@ class GetEcmInfo:
 
 	def pollEcmData(self):
 		global data, ecm, info, old_ecm_time
-		try:
-			ecm_time = stat(ECM_INFO).st_mtime
-		except OSError:
+		ecm_time, lines = ecmInfoMonitor.getSnapshot()
+		if ecm_time is None:
 			ecm_time = old_ecm_time
 			data = EMPTY_ECM_INFO
 			info = {}
@@ -51,10 +115,7 @@ class GetEcmInfo:
 			info["ecminterval2"] = oecmi1
 			info["ecminterval1"] = oecmi0
 			old_ecm_time = ecm_time
-			try:
-				ecm = open(ECM_INFO).readlines()
-			except OSError:
-				ecm = ""
+			ecm = list(lines)
 			for line in ecm:
 				d = line.split(":", 1)
 				if len(d) > 1:
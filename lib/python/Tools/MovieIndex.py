@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+import os
+import pickle
+from collections import OrderedDict
+from time import time
+
+from enigma import eTimer
+
+from Tools.Directories import resolveFilename, SCOPE_CONFIG
+
+MOVIEINDEX_FILE = resolveFilename(SCOPE_CONFIG, "movieindex.pkl")
+INDEX_VERSION = 2  # raise when the layout of the entries changes
+MAX_DIRECTORIES = 200  # least recently listed directories above this are dropped
+MTIME_GRACE = 2  # seconds, a directory changed this recently is indexed again on its next listing
+SAVE_DELAY = 10  # seconds after a change before the index is written
+
+
+def getEntryStamp(path):
+	# (mtime, size) of the .meta file a recording's name, begin time and tags are read
+	# from, or of the recording itself if it has no .meta file.
+	for file in (path + ".meta", path):
+		try:
+			st = os.stat(file)
+			return (st.st_mtime_ns, st.st_size)
+		except OSError:
+			pass
+	return None
+
+
+class MovieIndex:
+	"""Name, begin time and tags of the recordings in each movie directory.
+
+	Every directory is stored as [mtime, {serviceref string: (name, begin, tags, stamp)}]
+	and its entries are used as long as the modification time of the directory is the
+	same, so a directory that did not change is listed without opening the .meta file
+	of every recording.  The stamp of an entry is checked on every listing, see
+	getEntryStamp(), as .meta files are rewritten in place when tags are edited.
+	Changes which neither touch the directory nor the stamp must be reported by
+	invalidate().
+	"""
+	def __init__(self, filename=MOVIEINDEX_FILE, maxDirectories=MAX_DIRECTORIES):
+		self.filename = filename
+		self.maxDirectories = maxDirectories
+		self.directories = None
+		self.saveTimer = None
+
+	def load(self):
+		self.directories = OrderedDict()
+		try:
+			with open(self.filename, "rb") as fd:
+				index = pickle.load(fd)
+			if index.get("version") == INDEX_VERSION:
+				self.directories = index["directories"]
+		except FileNotFoundError:
+			pass
+		except Exception as ex:
+			print("[MovieIndex] Failed to load movie index:", ex)
+
+	def save(self):
+		try:
+			with open(self.filename + ".writing", "wb") as fd:
+				pickle.dump({"version": INDEX_VERSION, "directories": self.directories}, fd, pickle.HIGHEST_PROTOCOL)
+			os.rename(self.filename + ".writing", self.filename)
+		except Exception as ex:
+			print("[MovieIndex] Failed to write movie index:", ex)
+
+	def scheduleSave(self):
+		if self.saveTimer is None:
+			self.saveTimer = eTimer()
+			self.saveTimer.callback.append(self.save)
+		if not self.saveTimer.isActive():
+			self.saveTimer.start(SAVE_DELAY * 1000, True)
+
+	def getMTime(self, path):
+		try:
+			mtime = os.stat(path).st_mtime
+		except OSError:
+			return None
+		# File systems like FAT only store the time in steps of up to two seconds, so a
+		# change right after the directory was indexed may not change its mtime.
+		return None if time() - mtime < MTIME_GRACE else mtime
+
+	def getDirectory(self, path):
+		"""Returns the entries of the directory, or an empty dictionary if they are not valid any more."""
+		if self.directories is None:
+			self.load()
+		path = os.path.normpath(path)
+		directory = self.directories.get(path)
+		if directory is not None and directory[0] is not None and directory[0] == self.getMTime(path):
+			self.directories.move_to_end(path)
+			return directory[1]
+		return {}
+
+	def setDirectory(self, path, entries):
+		if self.directories is None:
+			self.load()
+		path = os.path.normpath(path)
+		mtime = self.getMTime(path)
+		directory = self.directories.get(path)
+		if directory is not None and directory[0] == mtime and directory[1] == entries:
+			return
+		self.directories[path] = [mtime, entries]
+		self.directories.move_to_end(path)
+		while len(self.directories) > self.maxDirectories:
+			self.directories.popitem(last=False)
+		self.scheduleSave()
+
+	def invalidate(self, path):
+		if self.directories is None:
+			self.load()
+		if self.directories.pop(os.path.normpath(path), None) is not None:
+			self.scheduleSave()
+
+
+movieIndex = MovieIndex()
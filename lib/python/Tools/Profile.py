@@ -1,67 +1,167 @@
 # -*- coding: utf-8 -*-
-# the implementation here is a bit crappy.
-import time
+# Boot profiling.
+#
+# profile(id) marks the start of a boot phase.  The checkpoint is always passed on to
+# eProfileWrite which keeps /var/local/profile and the boot progress display going.
+# When the file "bootprofile.enable" exists in the config directory every phase is
+# also timed (wall and cpu), every first time import of a Screens / Components /
+# Plugins module is timed and charged to the phase that triggered it, and plugin
+# autostart / sessionstart callbacks are timed.  profile_final() then writes the
+# results to "bootprofile.json", keeps the previous boot in "bootprofile.prev.json"
+# and writes the differences between both boots to "bootprofile.diff".
+import builtins
+from json import dump, load
+from os import rename
+from os.path import exists
+from sys import modules
+from threading import get_ident
+from time import perf_counter, process_time, time
+
+from enigma import eProfileDone, eProfileWrite
+
 from Tools.Directories import resolveFilename, SCOPE_CONFIG
 
-PERCENTAGE_START = 0
-PERCENTAGE_END = 100
+ENABLE_FILE = "bootprofile.enable"
+REPORT_FILE = "bootprofile.json"
+PREVIOUS_FILE = "bootprofile.prev.json"
+DIFF_FILE = "bootprofile.diff"
+PROFILED_PACKAGES = ("Screens.", "Components.", "Plugins.")
+DIFF_THRESHOLD = 0.005  # seconds, smaller changes are left out of the diff
+DIFF_LINES = 25  # entries per section in the diff
+
+
+class BootProfile:
+	def __init__(self):
+		self.started = time()
+		self.phases = []
+		self.imports = []
+		self.calls = []
+		self.phase = "Start"
+		self.phaseWall = perf_counter()
+		self.phaseCpu = process_time()
+		self.importStack = []
+		self.mainThread = get_ident()
+		self.originalImport = builtins.__import__
+		builtins.__import__ = self.timedImport
 
-profile_start = time.time()
+	def timedImport(self, name, globals=None, locals=None, fromlist=(), level=0):
+		# Only imports that actually load something are timed, modules already loaded
+		# and imports from other threads go straight to the original implementation.
+		if level or name in modules or get_ident() != self.mainThread:
+			return self.originalImport(name, globals, locals, fromlist, level)
+		self.importStack.append(0.0)
+		start = perf_counter()
+		try:
+			return self.originalImport(name, globals, locals, fromlist, level)
+		finally:
+			cumulative = perf_counter() - start
+			children = self.importStack.pop()
+			if self.importStack:
+				self.importStack[-1] += cumulative
+			if name.startswith(PROFILED_PACKAGES):
+				self.imports.append({"module": name, "phase": self.phase, "self": cumulative - children, "cumulative": cumulative})
 
-profile_data = {}
-total_time = 1
-profile_file = None
-# model = BoxInfo.get("machinebuild")  # For when we can use BoxInfo.
-model = None
+	def setPhase(self, id):
+		wall = perf_counter()
+		cpu = process_time()
+		self.phases.append({"phase": self.phase, "wall": wall - self.phaseWall, "cpu": cpu - self.phaseCpu})
+		self.phase = id
+		self.phaseWall = wall
+		self.phaseCpu = cpu
+
+	def call(self, kind, name, function, *args, **kwargs):
+		wall = perf_counter()
+		cpu = process_time()
+		try:
+			return function(*args, **kwargs)
+		finally:
+			self.calls.append({"kind": kind, "name": name, "phase": self.phase, "wall": perf_counter() - wall, "cpu": process_time() - cpu})
+
+	def finish(self):
+		self.setPhase(None)
+		builtins.__import__ = self.originalImport
+		report = {
+			"started": self.started,
+			"total": {"wall": sum(x["wall"] for x in self.phases), "cpu": sum(x["cpu"] for x in self.phases)},
+			"phases": self.phases,
+			"imports": self.imports,
+			"plugins": self.calls
+		}
+		reportFile = resolveFilename(SCOPE_CONFIG, REPORT_FILE)
+		previousFile = resolveFilename(SCOPE_CONFIG, PREVIOUS_FILE)
+		previous = None
+		try:
+			if exists(reportFile):
+				rename(reportFile, previousFile)
+				with open(previousFile) as fd:
+					previous = load(fd)
+		except Exception as err:
+			print("[Profile] Error: Unable to read previous boot profile!  (%s)" % str(err))
+		try:
+			with open(reportFile, "w") as fd:
+				dump(report, fd, indent=1)
+		except Exception as err:
+			print("[Profile] Error: Unable to write boot profile!  (%s)" % str(err))
+		print("[Profile] Boot took %.3fs wall, %.3fs cpu, %d modules imported." % (report["total"]["wall"], report["total"]["cpu"], len(self.imports)))
+		if previous:
+			diff = diffReports(previous, report)
+			for line in diff:
+				print("[Profile] %s" % line)
+			try:
+				with open(resolveFilename(SCOPE_CONFIG, DIFF_FILE), "w") as fd:
+					fd.write("\n".join(diff) + "\n")
+			except Exception as err:
+				print("[Profile] Error: Unable to write boot profile diff!  (%s)" % str(err))
 
-try:
-	profile_old = open(resolveFilename(SCOPE_CONFIG, "profile")).readlines()
 
-	t = None
-	for line in profile_old:
-		(t, id) = line[:-1].split('\t')
-		t = float(t)
-		total_time = t
-		profile_data[id] = t
-except:
-	print("no profile data available")
+def diffReports(previous, current):
+	def totals(entries, key, value):
+		result = {}
+		for entry in entries:
+			name = entry[key] if isinstance(key, str) else tuple(entry[x] for x in key)
+			result[name] = result.get(name, 0.0) + entry[value]
+		return result
 
-try:
-	profile_file = open(resolveFilename(SCOPE_CONFIG, "profile"), "w")
-except IOError:
-	print("WARNING: couldn't open profile file!")
+	def section(title, before, after):
+		changes = []
+		for name in set(before) | set(after):
+			delta = after.get(name, 0.0) - before.get(name, 0.0)
+			if abs(delta) >= DIFF_THRESHOLD:
+				changes.append((delta, name))
+		changes.sort(key=lambda change: -abs(change[0]))
+		lines = ["%s:" % title]
+		for delta, name in changes[:DIFF_LINES]:
+			status = " (new)" if name not in before else (" (gone)" if name not in after else "")
+			if isinstance(name, tuple):
+				name = " ".join(str(x) for x in name)
+			lines.append("  %+8.3fs  %s%s" % (delta, name, status))
+		return lines
+
+	diff = ["Total: %+.3fs wall, %+.3fs cpu" % (current["total"]["wall"] - previous["total"]["wall"], current["total"]["cpu"] - previous["total"]["cpu"])]
+	diff.extend(section("Phases (wall)", totals(previous["phases"], "phase", "wall"), totals(current["phases"], "phase", "wall")))
+	diff.extend(section("Imports (self)", totals(previous["imports"], "module", "self"), totals(current["imports"], "module", "self")))
+	diff.extend(section("Plugins (wall)", totals(previous["plugins"], ("kind", "name"), "wall"), totals(current["plugins"], ("kind", "name"), "wall")))
+	return diff
+
+
+bootProfile = BootProfile() if exists(resolveFilename(SCOPE_CONFIG, ENABLE_FILE)) else None
 
 
 def profile(id):
-	now = time.time() - profile_start
-	if profile_file:
-		profile_file.write("%7.3f\t%s\n" % (now, id))
-
-		if id in profile_data:
-			t = profile_data[id]
-			if total_time:
-				perc = t * (PERCENTAGE_END - PERCENTAGE_START) / total_time + PERCENTAGE_START
-			else:
-				perc = PERCENTAGE_START
-			try:
-				if model == "axodin":
-					open("/dev/dbox/oled0", "w").write("%d" % perc)
-				elif model in ("gb800solo", "gb800se", "gb800seplus", "gbultrase"):
-					open("/dev/mcu", "w").write("%d  \n" % perc)
-				elif model in ("ebox5000", "osmini", "spycatmini", "osminiplus", "spycatminiplus"):
-					open("/proc/progress", "w").write("%d" % perc)
-				elif model in ("sezammarvel", "xpeedlx3", "atemionemesis"):
-					open("/proc/vfd", "w").write("Loading %d %%" % perc)
-				elif model == "beyonwizu4":
-					open("/dev/dbox/oled0", "w").write("Loading %d%%\n" % perc)
-				else:
-					open("/proc/progress", "w").write("%d \n" % perc)
-			except IOError:
-				pass
+	eProfileWrite(id)
+	if bootProfile:
+		bootProfile.setPhase(id)
+
+
+def profileCall(kind, name, function, *args, **kwargs):
+	if bootProfile:
+		return bootProfile.call(kind, name, function, *args, **kwargs)
+	return function(*args, **kwargs)
 
 
 def profile_final():
-	global profile_file
-	if profile_file is not None:
-		profile_file.close()
-		profile_file = None
+	global bootProfile
+	eProfileDone()
+	if bootProfile:
+		bootProfile.finish()
+		bootProfile = None
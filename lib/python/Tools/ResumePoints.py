@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+import os
+import pickle
+from collections import OrderedDict
+from json import dumps, loads
+from time import time
+
+from enigma import eTimer
+from twisted.internet import threads
+
+from Components.Harddisk import getProcMounts, harddiskmanager
+
+RESUMEPOINTS_FILE = "/etc/enigma2/resumepoints.pkl"
+JOURNAL_FILE = "/etc/enigma2/resumepoints.journal"
+MAX_ENTRIES = 1000  # least recently used resume points above this are dropped
+MAX_JOURNAL_ENTRIES = 500  # journal lines before the pickle is rewritten
+PRUNE_DELAY = 60  # seconds after a change before stale entries are looked for
+PRUNE_INTERVAL = 3600  # minimum seconds between two pruning passes
+
+
+def getMount(path, mountpoints):
+	# Returns the longest of the mount points that holds the path, without touching the file system.
+	for mountpoint in mountpoints:
+		if path == mountpoint or path.startswith(mountpoint.rstrip("/") + "/"):
+			return mountpoint
+	return None
+
+
+def findStaleResumePoints(candidates, mountpoints, sleepingMounts):
+	# Runs in a thread. Returns the keys whose file is gone from a mount that is
+	# present and awake.  Entries are matched against the mount points by their path
+	# first, only those on awake mounts are stat'ed, then the resolved path is checked
+	# again.  Paths below /media/ that end up on the root file system belong to a disk
+	# that is not mounted and are kept.
+	mountpoints = sorted(mountpoints, key=len, reverse=True)
+
+	def isAwake(path):
+		mountpoint = getMount(path, mountpoints)
+		return mountpoint is not None and mountpoint not in sleepingMounts and not (mountpoint == "/" and path.startswith("/media/"))
+
+	stale = []
+	for key in candidates:
+		filepath = os.path.normpath(key.split(":")[-1])
+		if not filepath.startswith("/") or not isAwake(filepath):
+			continue
+		filepath = os.path.realpath(filepath)
+		if isAwake(filepath) and not os.path.exists(filepath):
+			stale.append(key)
+	return stale
+
+
+class ResumePoints:
+	"""Resume points keyed by service reference string, kept in least recently used order.
+
+	Every entry is [lastUsed, position, length].  Changes are appended to a journal file
+	and only folded into the pickle file when the journal grows too long or on shutdown.
+	"""
+	def __init__(self, filename=RESUMEPOINTS_FILE, journal=JOURNAL_FILE, maxEntries=MAX_ENTRIES):
+		self.filename = filename
+		self.journal = journal
+		self.maxEntries = maxEntries
+		self.points = OrderedDict()
+		self.journalEntries = 0
+		self.lastPrune = 0
+		self.pruneTimer = None
+		self.isPruning = False
+		self.load()
+
+	def __contains__(self, key):
+		return key in self.points
+
+	def __len__(self):
+		return len(self.points)
+
+	def get(self, key, default=None):
+		return self.points.get(key, default)
+
+	def touch(self, key):
+		entry = self.points.get(key)
+		if entry is not None:
+			entry[0] = int(time())
+			self.points.move_to_end(key)
+			self.appendJournal([key] + entry)
+		return entry
+
+	def set(self, key, position, length):
+		entry = [int(time()), position, length]
+		self.points[key] = entry
+		self.points.move_to_end(key)
+		self.evict()
+		self.appendJournal([key] + entry)
+		self.schedulePrune()
+
+	def delete(self, key):
+		if self.points.pop(key, None) is not None:
+			self.appendJournal([key])
+
+	def evict(self):
+		while len(self.points) > self.maxEntries:
+			self.points.popitem(last=False)
+
+	def load(self):
+		try:
+			with open(self.filename, "rb") as fd:
+				points = pickle.load(fd)
+		except Exception as ex:
+			print("[ResumePoints] Failed to load resumepoints:", ex)
+			points = {}
+		# Updated in place, the dictionary is also available as resumePointCache.
+		self.points.clear()
+		self.points.update(sorted(points.items(), key=lambda item: item[1][0]))
+		self.journalEntries = 0
+		try:
+			with open(self.journal) as fd:
+				for line in fd:
+					try:
+						record = loads(line)
+					except ValueError:  # a partial line from an interrupted write
+						continue
+					self.journalEntries += 1
+					if len(record) == 1:
+						self.points.pop(record[0], None)
+					else:
+						self.points[record[0]] = record[1:]
+						self.points.move_to_end(record[0])
+						self.evict()
+		except OSError:
+			pass
+		self.evict()
+
+	def save(self):
+		try:
+			with open(self.filename + ".writing", "wb") as fd:
+				pickle.dump(dict(self.points), fd, pickle.HIGHEST_PROTOCOL)
+				fd.flush()
+				os.fsync(fd.fileno())
+			os.rename(self.filename + ".writing", self.filename)
+			if os.path.exists(self.journal):
+				os.unlink(self.journal)
+			self.journalEntries = 0
+		except Exception as ex:
+			print("[ResumePoints] Failed to write resumepoints:", ex)
+
+	def appendJournal(self, record):
+		if self.journalEntries >= MAX_JOURNAL_ENTRIES:
+			self.save()
+			return
+		try:
+			with open(self.journal, "a") as fd:
+				fd.write(dumps(record) + "\n")
+			self.journalEntries += 1
+		except Exception as ex:
+			print("[ResumePoints] Failed to write journal:", ex)
+
+	def schedulePrune(self):
+		if self.isPruning or time() - self.lastPrune < PRUNE_INTERVAL:
+			return
+		if self.pruneTimer is None:
+			self.pruneTimer = eTimer()
+			self.pruneTimer.callback.append(self.prune)
+		if not self.pruneTimer.isActive():
+			self.pruneTimer.start(PRUNE_DELAY * 1000, True)
+
+	def prune(self):
+		if self.isPruning:
+			return
+		self.isPruning = True
+		self.lastPrune = time()
+		sleepingMounts = set()
+		for hdd in harddiskmanager.hdd:
+			mountpoint = hdd.findMount()
+			if mountpoint and hdd.isSleeping():
+				sleepingMounts.add(os.path.normpath(mountpoint))
+		mountpoints = [os.path.normpath(mount[1]) for mount in getProcMounts() if len(mount) > 1]
+		threads.deferToThread(findStaleResumePoints, list(self.points.keys()), mountpoints, sleepingMounts).addCallbacks(self.pruneReady, self.pruneFail)
+
+	def pruneReady(self, stale):
+		self.isPruning = False
+		for key in stale:
+			print("[ResumePoints] Removing stale resume point:", key)
+			self.delete(key)
+
+	def pruneFail(self, failure):
+		print("[ResumePoints] ERROR in prune:", failure)
+		self.isPruning = False
+
+
+resumePoints = ResumePoints()
@@ -2,10 +2,18 @@
 import time
 import os
 import enigma
+from collections import deque
+from json import dump, load
 from Components.config import config
 from Components import Harddisk
 from twisted.internet import threads
 
+MANIFEST = ".manifest.json"  # per trash folder: directory -> [mtime, subdirectories, {file: [ctime, size]}]
+ERASE_INTERVAL = 2000  # milliseconds between two batches of expired files handed to the background eraser
+ERASE_BATCH = 512 * 1024 * 1024  # bytes per batch
+ERASE_BATCH_RECORDING = 64 * 1024 * 1024  # the same while recordings are running
+ERASE_FILE_COST = 1024 * 1024  # every file counts as at least this many bytes of a batch
+
 
 def getTrashFolder(path):
 	# Returns trash folder without symlinks. Path may be file or directory or whatever.
@@ -44,6 +52,9 @@ class Trashcan:
 		self.isCleaning = False
 		self.session = None
 		self.dirty = set()
+		self.eraseQueue = deque()  # (path, size) of expired files waiting for the background eraser
+		self.pending = {}  # path -> size of the files in eraseQueue
+		self.eraseTimer = None
 
 	def init(self, session):
 		self.session = session
@@ -86,10 +97,19 @@ class Trashcan:
 		reserveBytes = 1024 * 1024 * 1024 * int(config.usage.movielist_trashcan_reserve.value)
 		cleanset = self.dirty
 		self.dirty = set()
-		threads.deferToThread(purge, cleanset, ctimeLimit, reserveBytes).addCallbacks(self.cleanReady, self.cleanFail)
+		threads.deferToThread(purge, cleanset, ctimeLimit, reserveBytes, dict(self.pending)).addCallbacks(self.cleanReady, self.cleanFail)
 
 	def cleanReady(self, result=None):
 		self.isCleaning = False
+		if result:
+			for fn, size, urgent in result:
+				if urgent:  # needed for the reserve, erase it now
+					self.pending.pop(fn, None)
+					self.erase(fn)
+				elif fn not in self.pending:
+					self.pending[fn] = size
+					self.eraseQueue.append((fn, size))
+			self.eraseNext()
 		# schedule another clean loop if needed (so we clean up all devices, not just one)
 		self.cleanIfIdle()
 
@@ -97,50 +117,140 @@ class Trashcan:
 		print("[Trashcan] ERROR in clean:", failure)
 		self.isCleaning = False
 
+	def erase(self, fn):
+		try:
+			enigma.eBackgroundFileEraser.getInstance().erase(fn)
+		except Exception as e:
+			print("[Trashcan] Failed to erase %s:" % fn, e)
+
+	def eraseNext(self):
+		# hand the expired files to the background eraser in batches of limited size, so
+		# a large purge does not compete with running recordings for disk bandwidth
+		recording = self.session is not None and self.session.nav.getRecordings()
+		budget = ERASE_BATCH_RECORDING if recording else ERASE_BATCH
+		while self.eraseQueue and budget > 0:
+			fn, size = self.eraseQueue.popleft()
+			if fn not in self.pending:  # already erased for the reserve
+				continue
+			del self.pending[fn]
+			self.erase(fn)
+			budget -= max(size, ERASE_FILE_COST)
+		if self.eraseQueue:
+			if self.eraseTimer is None:
+				self.eraseTimer = enigma.eTimer()
+				self.eraseTimer.callback.append(self.eraseNext)
+			self.eraseTimer.start(ERASE_INTERVAL, True)
+
+
+def loadManifest(trash):
+	try:
+		with open(os.path.join(trash, MANIFEST)) as fd:
+			return load(fd)
+	except Exception:
+		return {}
+
+
+def saveManifest(trash, manifest):
+	# Rewritten in place: creating or renaming a file would change the mtime of the
+	# trash folder and force it to be read again next time.
+	try:
+		with open(os.path.join(trash, MANIFEST), "w") as fd:
+			dump(manifest, fd)
+	except Exception as e:
+		print("[Trashcan] Failed to write manifest:", e)
+
+
+def scanTrash(trash):
+	# Returns the manifest of the trash folder. Only directories whose mtime
+	# changed since the last scan are read again, files in them are stat'ed once.
+	manifest = loadManifest(trash)
+	if not manifest:
+		saveManifest(trash, manifest)  # create it before the trash folder's mtime is taken
+	result = {}
+	stack = [""]
+	while stack:
+		relpath = stack.pop()
+		path = os.path.join(trash, relpath)
+		try:
+			mtime = os.stat(path).st_mtime_ns
+		except OSError:
+			continue
+		entry = manifest.get(relpath)
+		if entry is None or entry[0] != mtime:
+			subdirs = []
+			files = {}
+			with os.scandir(path) as it:
+				for item in it:
+					if item.is_dir(follow_symlinks=False):
+						subdirs.append(item.name)
+					elif item.name != MANIFEST and not item.name.endswith(".del"):
+						try:
+							st = item.stat(follow_symlinks=False)
+							files[item.name] = [st.st_ctime, st.st_size]
+						except Exception as e:
+							print("[Trashcan] Failed to stat %s:" % item.name, e)
+			if relpath and not subdirs and not files:
+				# Remove empty directories if possible
+				try:
+					os.rmdir(path)
+					continue
+				except:
+					pass
+			entry = [mtime, subdirs, files]
+		result[relpath] = entry
+		stack.extend(os.path.join(relpath, name) for name in entry[1])
+	if result != manifest:
+		saveManifest(trash, result)
+	return result
+
 
-def purge(cleanset, ctimeLimit, reserveBytes):
-	# Remove expired items from trash, and attempt to have
-	# reserveBytes of free disk space.
+def purge(cleanset, ctimeLimit, reserveBytes, pending=None):
+	# Find expired items in trash, and the items to remove to attempt to have
+	# reserveBytes of free disk space. Returns a list of (path, size, urgent) to erase.
+	# Urgent items are needed for the reserve and taken from the oldest files, expired
+	# ones first. Files already waiting for the eraser (pending) are only returned
+	# again when they became urgent.
+	if pending is None:
+		pending = {}
+	erase = []
 	for trash in cleanset:
 		if not os.path.isdir(trash):
 			print("[Trashcan] No trash.", trash)
-			return 0
+			continue
 		diskstat = os.statvfs(trash)
 		free = diskstat.f_bfree * diskstat.f_bsize
-		bytesToRemove = reserveBytes - free
+		expired = []
 		candidates = []
-		print("[Trashcan] bytesToRemove", bytesToRemove, trash)
 		size = 0
-		for root, dirs, files in os.walk(trash, topdown=False):
-			for name in files:
-				try:
-					fn = os.path.join(root, name)
-					st = os.stat(fn)
-					if st.st_ctime < ctimeLimit:
-						print("[Trashcan] Too old:", name, st.st_ctime)
-						enigma.eBackgroundFileEraser.getInstance().erase(fn)
-						bytesToRemove -= st.st_size
-					else:
-						candidates.append((st.st_ctime, fn, st.st_size))
-						size += st.st_size
-				except Exception as e:
-					print("[Trashcan] Failed to stat %s:" % name, e)
-			# Remove empty directories if possible
-			for name in dirs:
-				try:
-					os.rmdir(os.path.join(root, name))
-				except:
-					pass
+		for relpath, (mtime, subdirs, files) in scanTrash(trash).items():
+			for name, (st_ctime, st_size) in files.items():
+				fn = os.path.join(trash, relpath, name)
+				if fn in pending or st_ctime < ctimeLimit:
+					expired.append((st_ctime, fn, st_size))
+				else:
+					candidates.append((st_ctime, fn, st_size))
+				size += st_size
+		bytesToRemove = reserveBytes - free
+		print("[Trashcan] bytesToRemove", bytesToRemove, trash)
+		expired.sort()
 		candidates.sort()
-		# Now we have a list of ctime, candidates, size. Sorted by ctime (=deletion time)
-		print("[Trashcan] Bytes to remove remaining:", bytesToRemove, trash)
-		for st_ctime, fn, st_size in candidates:
+		# Now we have lists of ctime, candidates, size. Sorted by ctime (=deletion time)
+		urgent = set()
+		for st_ctime, fn, st_size in expired + candidates:
 			if bytesToRemove < 0:
 				break
-			enigma.eBackgroundFileEraser.getInstance().erase(fn)
+			erase.append((fn, st_size, True))
+			urgent.add(fn)
 			bytesToRemove -= st_size
 			size -= st_size
+		for st_ctime, fn, st_size in expired:
+			if fn not in urgent:
+				if fn not in pending:
+					print("[Trashcan] Too old:", fn, st_ctime)
+					erase.append((fn, st_size, False))
+				size -= st_size
 		print("[Trashcan] Size after purging:", size, trash)
+	return erase
 
 
 def cleanAll(trash):
@@ -1,12 +1,19 @@
 # -*- coding: utf-8 -*-
 import enigma
+import pickle
 import xml.etree.ElementTree
+from os import rename, stat
 
+import keyids
 from keyids import KEYIDS
 
+from Tools.Directories import resolveFilename, SCOPE_CONFIG
 # these are only informational (for help)...
 from Tools.KeyBindings import addKeyBinding
 
+CACHE_FILE = resolveFilename(SCOPE_CONFIG, "keymap.cache")
+CACHE_VERSION = 1  # raise when the layout of the compiled keymaps changes
+
 
 class KeymapError(Exception):
 	def __init__(self, message):
@@ -35,7 +42,7 @@ def getKeyId(id):
 	return keyid
 
 
-def parseKeys(context, filename, actionmap, device, keys):
+def parseKeys(context, filename, bindings, device, keys):
 	for x in keys.findall("key"):
 		get_attr = x.attrib.get
 		mapto = get_attr("mapto")
@@ -52,16 +59,15 @@ def parseKeys(context, filename, actionmap, device, keys):
 
 		keyid = getKeyId(id)
 #				print("[keymapparser] " + context + "::" + mapto + " -> " + device + "." + hex(keyid))
-		actionmap.bindKey(filename, device, keyid, flags, context, mapto)
-		addKeyBinding(filename, keyid, context, mapto, flags)
+		bindings.append((context, device, keyid, flags, mapto))
 
 
-def parseTrans(filename, actionmap, device, keys):
+def parseTrans(filename, toggles, translations, device, keys):
 	for x in keys.findall("toggle"):
 		get_attr = x.attrib.get
 		toggle_key = get_attr("from")
 		toggle_key = getKeyId(toggle_key)
-		actionmap.bindToggle(filename, device, toggle_key)
+		toggles.append((device, toggle_key))
 
 	for x in keys.findall("key"):
 		get_attr = x.attrib.get
@@ -74,38 +80,129 @@ def parseTrans(filename, actionmap, device, keys):
 		keyin = getKeyId(keyin)
 		keyout = getKeyId(keyout)
 		toggle = int(toggle)
-		actionmap.bindTranslation(filename, device, keyin, keyout, toggle)
-
+		translations.append((device, keyin, keyout, toggle))
 
-def readKeymap(filename):
-	p = enigma.eActionMap.getInstance()
-	assert p
-
-	try:
-		source = open(filename)
-	except:
-		print("[keymapparser] keymap file " + filename + " not found")
-		return
 
+def compileKeymap(filename, source):
+	# Returns the flattened keymap: ([(context, device, keyid, flags, action)], [(device, keyid)], [(device, keyin, keyout, toggle)]).
 	try:
 		dom = xml.etree.ElementTree.parse(source)
 	except:
 		raise KeymapError("[keymapparser] keymap %s not well-formed." % filename)
 
 	keymap = dom.getroot()
+	bindings = []
+	toggles = []
+	translations = []
 
 	for cmap in keymap.findall("map"):
 		context = cmap.attrib.get("context")
 		assert context, "[keymapparser] map must have context"
 
-		parseKeys(context, filename, p, "generic", cmap)
+		parseKeys(context, filename, bindings, "generic", cmap)
 
 		for device in cmap.findall("device"):
-			parseKeys(context, filename, p, device.attrib.get("name"), device)
+			parseKeys(context, filename, bindings, device.attrib.get("name"), device)
 
 	for ctrans in keymap.findall("translate"):
 		for device in ctrans.findall("device"):
-			parseTrans(filename, p, device.attrib.get("name"), device)
+			parseTrans(filename, toggles, translations, device.attrib.get("name"), device)
+
+	return bindings, toggles, translations
+
+
+class KeymapCache:
+	"""Compiled keymaps of the keymap files read so far.
+
+	The flattened bindings of every keymap file are kept in one pickle file together
+	with the modification time and size of the keymap file, so an unchanged keymap
+	is bound from the cache without parsing its XML again.
+	"""
+	def __init__(self, filename=CACHE_FILE):
+		self.filename = filename
+		self.keymaps = None
+		self.version = None
+
+	def getKey(self, filename):
+		st = stat(filename)
+		return (st.st_mtime_ns, st.st_size)
+
+	def getVersion(self):
+		# Compiled key ids depend on keyids.py.
+		try:
+			return (CACHE_VERSION, stat(keyids.__file__).st_mtime_ns)
+		except OSError:
+			return (CACHE_VERSION, len(KEYIDS))
+
+	def load(self):
+		self.version = self.getVersion()
+		self.keymaps = {}
+		try:
+			with open(self.filename, "rb") as fd:
+				cache = pickle.load(fd)
+			if cache.get("version") == self.version:
+				self.keymaps = cache["keymaps"]
+		except FileNotFoundError:
+			pass
+		except Exception as err:
+			print("[keymapparser] Keymap cache not loaded!  (%s)" % str(err))
+
+	def save(self):
+		try:
+			with open(self.filename + ".tmp", "wb") as fd:
+				pickle.dump({"version": self.version, "keymaps": self.keymaps}, fd, pickle.HIGHEST_PROTOCOL)
+			rename(self.filename + ".tmp", self.filename)
+		except Exception as err:
+			print("[keymapparser] Error: Unable to save keymap cache!  (%s)" % str(err))
+
+	def get(self, filename):
+		if self.keymaps is None:
+			self.load()
+		entry = self.keymaps.get(filename)
+		if entry is not None and entry[0] == self.getKey(filename):
+			return entry[1]
+		return None
+
+	def put(self, filename, key, compiled):
+		if self.keymaps is None:
+			self.load()
+		self.keymaps[filename] = (key, compiled)
+		self.save()
+
+
+keymapCache = KeymapCache()
+
+
+def readKeymap(filename):
+	p = enigma.eActionMap.getInstance()
+	assert p
+
+	try:
+		compiled = keymapCache.get(filename)
+	except OSError:
+		print("[keymapparser] keymap file " + filename + " not found")
+		return
+
+	if compiled is None:
+		try:
+			source = open(filename)
+		except:
+			print("[keymapparser] keymap file " + filename + " not found")
+			return
+		with source:
+			key = keymapCache.getKey(filename)
+			compiled = compileKeymap(filename, source)
+		keymapCache.put(filename, key, compiled)
+
+	bindings, toggles, translations = compiled
+	bindKey = p.bindKey
+	for context, device, keyid, flags, mapto in bindings:
+		bindKey(filename, device, keyid, flags, context, mapto)
+		addKeyBinding(filename, keyid, context, mapto, flags)
+	for device, keyid in toggles:
+		p.bindToggle(filename, device, keyid)
+	for device, keyin, keyout, toggle in translations:
+		p.bindTranslation(filename, device, keyin, keyout, toggle)
 
 
 def removeKeymap(filename):
@@ -2,6 +2,7 @@ from glob import glob
 from os.path import dirname, isfile, join as pathjoin, splitext
 from os import listdir, unlink
 from traceback import print_exc
+from weakref import WeakKeyDictionary
 from xml.etree.ElementTree import Element, ElementTree, fromstring
 
 from enigma import BT_ALPHABLEND, BT_ALPHATEST, BT_HALIGN_CENTER, BT_HALIGN_LEFT, BT_HALIGN_RIGHT, BT_KEEP_ASPECT_RATIO, BT_SCALE, BT_VALIGN_BOTTOM, BT_VALIGN_CENTER, BT_VALIGN_TOP, addFont, eLabel, eListbox, ePixmap, ePoint, eRect, eRectangle, eSize, eSlider, eSubtitleWidget, eWidget, eWindow, eWindowStyleManager, eWindowStyleSkinned, getDesktop, gFont, getFontFaces, gMainDC, gRGB
@@ -50,6 +51,10 @@ scrollLabelStyle = {}  # Dictionary of scrollLabel widget defaults.
 constantWidgets = {}
 layouts = {}
 variables = {}
+compiledAttributes = WeakKeyDictionary()  # Dictionary of the pre-resolved attributes of each skin element.
+embeddedSkins = {}  # Dictionary of parsed embedded skins.
+parserCache = {}  # Dictionary of attribute parser results for each parser and its arguments.
+parserStats = {}  # Dictionary of [hits, misses] for each cached attribute parser.
 isVTISkin = False  # Temporary flag to suppress errors in OpenPLI.
 
 config.skin = ConfigSubsection()
@@ -149,6 +154,7 @@ def InitSkins():
 	if resolution[0] and resolution[1]:
 		gMainDC.getInstance().setResolution(resolution[0], resolution[1])
 		getDesktop(GUI_SKIN_ID).resize(eSize(resolution[0], resolution[1]))
+	clearParserCache()  # Results may depend on the desktop size.
 	runCallbacks = True
 
 
@@ -167,6 +173,7 @@ def loadSkin(filename, scope=SCOPE_SKINS, desktop=getDesktop(GUI_SKIN_ID), scree
 		# For loadSingleSkinData colors, bordersets etc. are applied one after
 		# the other in order of ascending priority.
 		loadSingleSkinData(desktop, screenID, domSkin, filename, scope=scope)
+		clearParserCache()  # The skin data may have changed while it was loaded.
 		resolution = resolutions.get(screenID, (0, 0, 0))
 		if debugMode:
 			print(f"[Skin] Skin resolution is {resolution[0]}x{resolution[1]} and color depth is {resolution[2]} bits.")
@@ -226,6 +233,9 @@ def reloadSkins():
 	parameters.clear()
 	setups.clear()
 	switchPixmap.clear()
+	clearParserCache()
+	compiledAttributes.clear()
+	embeddedSkins.clear()
 	InitSkins()
 
 
@@ -264,6 +274,41 @@ def skinError(errorMessage):
 	print(f"[Skin] Error: {errorMessage}!")
 
 
+# The results of the cached parsers only depend on their arguments and the skin
+# data (colors, fonts, variables and the desktop size), so they are kept until
+# the skin data changes.  Lists are returned as copies as callers may change them.
+#
+def cachedParser(parser):
+	name = parser.__name__
+	stats = parserStats.setdefault(name, [0, 0])
+
+	def cached(*args, **kwargs):
+		key = (name, args, tuple(sorted(kwargs.items()))) if kwargs else (name, args)
+		try:
+			result = parserCache[key]
+			stats[0] += 1
+		except KeyError:
+			result = parserCache[key] = parser(*args, **kwargs)
+			stats[1] += 1
+		except TypeError:  # Unhashable arguments.
+			return parser(*args, **kwargs)
+		return list(result) if isinstance(result, list) else result
+
+	cached.__name__ = name
+	cached.__doc__ = parser.__doc__
+	cached.uncached = parser
+	return cached
+
+
+def clearParserCache():
+	parserCache.clear()
+
+
+def getParserStats():
+	# Returns {parser: (hits, misses)} of the cached attribute parsers.
+	return {name: tuple(stats) for name, stats in parserStats.items()}
+
+
 def attribDeprecationWarning(attribute, replacement):
 	print(f"[Skin] Warning: Attribute '{attribute}' has been deprecated, use '{replacement}' instead!")
 
@@ -309,6 +354,7 @@ def parseBoolean(attribute, value):
 	return value.lower() in ("1", attribute, "enabled", "on", "true", "yes")
 
 
+@cachedParser
 def parseColor(value, default=0x00FFFFFF):
 	if value[0] == "#":
 		try:
@@ -346,6 +392,7 @@ def parseColor(value, default=0x00FFFFFF):
 #         h      : Multiply by current font height. (Only to be used in elements where the font attribute is available, i.e. not "None")
 #         f      : Replace with getSkinFactor().
 #
+@cachedParser
 def parseCoordinate(value, parent, size=0, font=None, scale=(1, 1)):
 	def scaleNumbers(coordinate, scale):
 		inNumber = False
@@ -403,6 +450,7 @@ def parseCoordinate(value, parent, size=0, font=None, scale=(1, 1)):
 	return 0 if result < 0 else result
 
 
+@cachedParser
 def parseFont(value, scale=((1, 1), (1, 1))):
 	if ";" in value:
 		(name, size) = value.split(";")
@@ -432,6 +480,7 @@ def parseFont(value, scale=((1, 1), (1, 1))):
 	return gFont(name, int(size * scale[1][0] / scale[1][1]))
 
 
+@cachedParser
 def parseGradient(value):
 	def validColor(value):
 		if value[0] == "#" and len(value) in (9, 7):
@@ -731,6 +780,7 @@ def parseScrollbarScroll(value):
 	return parseOptions(options, "scrollbarScroll", value, 0)
 
 
+@cachedParser
 def parsePadding(attribute, value):
 	if value in variables:
 		value = variables[value]
@@ -779,6 +829,27 @@ def parseZoom(mode, zoomType):
 
 
 def collectAttributes(skinAttributes, node, context, skinPath=None, ignore=(), filenames=frozenset(("pixmap", "pointer", "seekPointer", "seek_pointer", "backgroundPixmap", "selectionPixmap", "sliderPixmap", "scrollbarBackgroundPixmap", "scrollbarForegroundPixmap", "scrollbarbackgroundPixmap", "scrollbarBackgroundPicture", "scrollbarSliderPicture"))):
+	# The attributes of a skin element, with the image file names resolved, are only
+	# collected the first time the element is used.  Only the position and size,
+	# which depend on the context, are worked out for every screen instance.
+	compiled = compiledAttributes.get(node)
+	if compiled is None:
+		compiled = compiledAttributes[node] = {}
+	key = (skinPath, ignore, filenames)
+	attributes = compiled.get(key)
+	if attributes is None:
+		attributes = compiled[key] = compileAttributes(node, skinPath, ignore, filenames)
+	attributes, pos, size, font = attributes
+	skinAttributes.extend(attributes)
+	if pos is not None:
+		pos, size = context.parse(pos, size, font)
+		skinAttributes.append(("position", pos))
+	if size is not None:
+		skinAttributes.append(("size", size))
+
+
+def compileAttributes(node, skinPath, ignore, filenames):
+	skinAttributes = []
 	size = None
 	pos = None
 	font = None
@@ -807,11 +878,7 @@ def collectAttributes(skinAttributes, node, context, skinPath=None, ignore=(), f
 				skinAttributes.append((attrib, newValue))
 			else:
 				skinAttributes.append((attrib, newValue))
-	if pos is not None:
-		pos, size = context.parse(pos, size, font)
-		skinAttributes.append(("position", pos))
-	if size is not None:
-		skinAttributes.append(("size", size))
+	return tuple(skinAttributes), pos, size, font
 
 
 class AttributeParser:
@@ -1242,6 +1309,7 @@ def loadSingleSkinData(desktop, screenID, domSkin, pathSkin, scope=SCOPE_GUISKIN
 	"""Loads skin data like colors, windowstyle etc."""
 	assert domSkin.tag == "skin", "root element in skin must be 'skin'!"
 	global colors, fonts, menus, parameters, setups, switchPixmap, resolutions, scrollLabelStyle
+	clearParserCache()
 	for tag in domSkin.findall("output"):
 		scrnID = parseInteger(tag.attrib.get("id", GUI_SKIN_ID), GUI_SKIN_ID)
 		if scrnID == GUI_SKIN_ID:
@@ -1785,19 +1853,23 @@ def readSkin(screen, skin, names, desktop):
 			skin = screen.skin[0] % tuple([int(x * getSkinFactor()) for x in screen.skin[1:]])
 		else:
 			skin = screen.skin
-		print(f"[Skin] Parsing embedded skin '{myName}'.")
-		if isinstance(skin, tuple):
-			for xml in skin:
-				candidate = fromstring(xml)
-				if candidate.tag == "screen":
-					screenID = candidate.attrib.get("id")
-					if (not screenID) or (parseInteger(screenID) == DISPLAY_SKIN_ID):
-						myScreen = candidate
-						break
+		myScreen = embeddedSkins.get(skin)  # Embedded skins are only parsed for the first instance of a screen.
+		if myScreen is None:
+			print(f"[Skin] Parsing embedded skin '{myName}'.")
+			if isinstance(skin, tuple):
+				for xml in skin:
+					candidate = fromstring(xml)
+					if candidate.tag == "screen":
+						screenID = candidate.attrib.get("id")
+						if (not screenID) or (parseInteger(screenID) == DISPLAY_SKIN_ID):
+							myScreen = candidate
+							break
+				else:
+					print("[Skin] No suitable screen found!")
 			else:
-				print("[Skin] No suitable screen found!")
-		else:
-			myScreen = fromstring(skin)
+				myScreen = fromstring(skin)
+			if myScreen is not None:
+				embeddedSkins[skin] = myScreen
 		if myScreen is not None:
 			screen.parsedSkin = myScreen
 	if myScreen is None:
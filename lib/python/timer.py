@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
 from bisect import insort
+from heapq import heapify, heappop, heappush
+from itertools import count
 from time import time, localtime, mktime
 from enigma import eTimer
 import datetime
@@ -22,6 +24,7 @@ class TimerEntry:
 		# begindate = localtime(self.begin)
 		# newdate = datetime.datetime(begindate.tm_year, begindate.tm_mon, begindate.tm_mday 0, 0, 0);
 		self.repeatedbegindate = begin
+		self.nextOccurrence = None  # (repeat settings, time until which they give the same occurrence)
 		self.backoff = 0
 
 		self.disabled = False
@@ -56,6 +59,14 @@ class TimerEntry:
 	def isFindNextEvent(self):
 		return self.findNextEvent
 
+	def getDayOccurrence(self, timedatestruct, day):
+		# the same local time of day on another day, None if that time does not exist there (DST gap)
+		t = (day.year, day.month, day.day, timedatestruct.tm_hour, timedatestruct.tm_min, timedatestruct.tm_sec, 0, 0, -1)
+		occurrence = mktime(t)
+		if localtime(occurrence).tm_hour != timedatestruct.tm_hour:
+			return None
+		return occurrence
+
 	# update self.begin and self.end according to the self.repeated-flags
 	def processRepeated(self, findRunningEvent=True, findNextEvent=False):
 		if self.repeated != 0:
@@ -64,33 +75,35 @@ class TimerEntry:
 				now = self.end + 120
 			self.findRunningEvent = findRunningEvent
 			self.findNextEvent = findNextEvent
+			# the result stays valid until the clock passes the occurrence found last time
+			key = (self.begin, self.end, self.repeated, self.repeatedbegindate, findRunningEvent, findNextEvent)
+			if self.nextOccurrence is not None and self.nextOccurrence[0] == key and now <= self.nextOccurrence[1]:
+				self.timeChanged()
+				return
 			# to avoid problems with daylight saving, we need to calculate with localtime, in struct_time representation
-			localrepeatedbegindate = localtime(self.repeatedbegindate)
 			localbegin = localtime(self.begin)
 			localend = localtime(self.end)
-			localnow = localtime(now)
-
-			day = []
-			flags = self.repeated
-			for x in (0, 1, 2, 3, 4, 5, 6):
-				if flags & 1 == 1:
-					day.append(0)
-				else:
-					day.append(1)
-				flags >>= 1
-
-			# if day is NOT in the list of repeated days
-			# OR if the day IS in the list of the repeated days, check, if event is currently running... then if findRunningEvent is false, go to the next event
-			while ((day[localbegin.tm_wday] != 0) or (mktime(localrepeatedbegindate) > mktime(localbegin)) or
-				((day[localbegin.tm_wday] == 0) and ((findRunningEvent and localend < localnow) or ((not findRunningEvent) and localbegin < localnow)))):
-				localbegin = self.addOneDay(localbegin)
-				localend = self.addOneDay(localend)
-
-			# we now have a struct_time representation of begin and end in localtime, but we have to calculate back to (gmt) seconds since epoch
-			self.begin = int(mktime(localbegin))
-			self.end = int(mktime(localend))
+			begindate = datetime.date(localbegin.tm_year, localbegin.tm_mon, localbegin.tm_mday)
+			enddate = datetime.date(localend.tm_year, localend.tm_mon, localend.tm_mday)
+
+			# the earliest begin we can accept, jump to the day before it instead of walking there one day at a time
+			earliest = max(self.repeatedbegindate, now - (self.end - self.begin) if findRunningEvent else now)
+			offset = max(0, (datetime.date.fromtimestamp(earliest) - begindate).days - 1)
+			while True:
+				day = begindate + datetime.timedelta(days=offset)
+				# the day must be in the list of repeated days, and the event must not have passed (or started, if findRunningEvent is false)
+				if self.repeated & (1 << day.weekday()):
+					begin = self.getDayOccurrence(localbegin, day)
+					end = self.getDayOccurrence(localend, enddate + datetime.timedelta(days=offset))
+					if begin is not None and end is not None and begin >= self.repeatedbegindate and ((findRunningEvent and end >= now) or (not findRunningEvent and begin >= now)):
+						break
+				offset += 1
+
+			self.begin = int(begin)
+			self.end = int(end)
 			if self.begin == self.end:
 				self.end += 1
+			self.nextOccurrence = ((self.begin, self.end, self.repeated, self.repeatedbegindate, findRunningEvent, findNextEvent), self.end if findRunningEvent else self.begin)
 
 			self.timeChanged()
 
@@ -149,6 +162,12 @@ class Timer:
 	def __init__(self):
 		self.timer_list = []
 		self.processed_timers = []
+		# next activations of the entries in timer_list. Items are only valid while
+		# their sequence is the one recorded for the entry in self.queued
+		self.activation_queue = []  # heap of (next activation, sequence, entry)
+		self.queued = {}  # entry -> sequence of its valid queue item
+		self.sequence = count()
+		self.nextPoll = 0  # the queue is built again by the first activation from this time on
 
 		self.timer = eTimer()
 		self.timer.callback.append(self.calcNextActivation)
@@ -186,6 +205,7 @@ class Timer:
 		else:
 			if entry not in self.timer_list:
 				insort(self.timer_list, entry)
+				self.queueEntry(entry)
 			if not noRecalc:
 				self.calcNextActivation()
 
@@ -210,6 +230,46 @@ class Timer:
 #		else:
 #			print("no NAV")
 
+	def queueEntry(self, entry):
+		sequence = next(self.sequence)
+		self.queued[entry] = sequence
+		heappush(self.activation_queue, (entry.getNextActivation(), sequence, entry))
+		if len(self.activation_queue) > 2 * len(self.queued) + 16:
+			# too many outdated items, drop them
+			self.activation_queue = [item for item in self.activation_queue if self.queued.get(item[2]) == item[1]]
+			heapify(self.activation_queue)
+
+	def unqueueEntry(self, entry):
+		self.queued.pop(entry, None)
+
+	def rebuildQueue(self):
+		# Entries whose activation was changed without timeChanged() are still queued
+		# under their old activation, the MaxWaitTime poll picks them up again.
+		self.queued = {}
+		self.activation_queue = []
+		for entry in self.timer_list:
+			sequence = next(self.sequence)
+			self.queued[entry] = sequence
+			self.activation_queue.append((entry.getNextActivation(), sequence, entry))
+		heapify(self.activation_queue)
+
+	def getFirstEntry(self):
+		# returns the enabled entry with the earliest activation, dropping outdated items on the way
+		queue = self.activation_queue
+		while queue:
+			activation, sequence, entry = queue[0]
+			if self.queued.get(entry) != sequence:
+				heappop(queue)
+			elif entry.disabled:
+				heappop(queue)
+				del self.queued[entry]  # timeChanged queues it again once it is enabled
+			elif activation != entry.getNextActivation():
+				heappop(queue)
+				self.queueEntry(entry)
+			else:
+				return entry
+		return None
+
 	def setNextActivation(self, now, when):
 		delay = int((when - now) * 1000)
 		self.timer.start(delay, 1)
@@ -226,17 +286,19 @@ class Timer:
 				x.resetState()
 				self.addTimerEntry(x, noRecalc=1)
 
+		if now >= self.nextPoll:
+			self.rebuildQueue()
+			self.nextPoll = int(now) + self.MaxWaitTime
+
 		self.processActivation()
 		self.lastActivation = now
 
 		min = int(now) + self.MaxWaitTime
 
-		self.timer_list and self.timer_list.sort()  # resort/refresh list, try to fix hanging timers
-
 		# calculate next activation point
-		timer_list = [t for t in self.timer_list if not t.disabled]
-		if timer_list:
-			w = timer_list[0].getNextActivation()
+		entry = self.getFirstEntry()
+		if entry is not None:
+			w = entry.getNextActivation()
 			if w < min:
 				min = w
 
@@ -258,6 +320,7 @@ class Timer:
 			except:
 				print("[timer] Failed to remove, not in list")
 				return
+			self.unqueueEntry(timer)
 		# give the timer a chance to re-enqueue
 		if timer.state == TimerEntry.StateEnded:
 			timer.state = TimerEntry.StateWaiting
@@ -265,6 +328,7 @@ class Timer:
 
 	def doActivate(self, w):
 		self.timer_list.remove(w)
+		self.unqueueEntry(w)
 
 		# when activating a timer which has already passed,
 		# simply abort the timer. don't run trough all the stages.
@@ -281,6 +345,7 @@ class Timer:
 		if w.state < TimerEntry.StateEnded:
 			# no, sort it into active list
 			insort(self.timer_list, w)
+			self.queueEntry(w)
 		else:
 			# yes. Process repeated, and re-add.
 			if w.repeated:
@@ -297,8 +362,10 @@ class Timer:
 		t = int(time()) + 1
 		# we keep on processing the first entry until it goes into the future.
 		while True:
-			timer_list = [tmr for tmr in self.timer_list if not tmr.disabled]
-			if timer_list and timer_list[0].getNextActivation() < t:
-				self.doActivate(timer_list[0])
-			else:
+			entry = self.getFirstEntry()
+			if entry is None or entry.getNextActivation() >= t:
 				break
+			if entry in self.timer_list:
+				self.doActivate(entry)
+			else:  # taken out of timer_list behind our back
+				self.unqueueEntry(entry)
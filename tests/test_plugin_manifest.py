@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+import inspect
+import os
+import sys
+import tempfile
+import types
+
+import tests
+
+# test for plugins booted from the plugin manifest, run with
+# PYTHONPATH=.:..:../lib/python/ python test_plugin_manifest.py
+#
+# PluginComponent is tested on its own, so instead of the fake enigma module of the
+# other tests the few modules it needs are stubbed here.
+
+generation = [0]
+
+
+class ConfigSubsection:
+	def __setattr__(self, name, value):
+		object.__setattr__(self, name, value)
+		generation[0] += 1
+
+
+def stub(name, **attributes):
+	module = types.ModuleType(name)
+	module.__dict__.update(attributes)
+	sys.modules[name] = module
+
+
+stub("enigma", eEnv=types.SimpleNamespace(resolve=lambda path: path), getDesktop=None, eGetEnigmaDebugLvl=lambda: 0, eProfileWrite=lambda id: None, eProfileDone=lambda: None)
+stub("Components.config", config=ConfigSubsection(), ConfigSubsection=ConfigSubsection, getConfigGeneration=lambda item: generation[0])
+stub("Tools.LoadPixmap", LoadPixmap=lambda *args, **kwargs: None)
+stub("keymapparser", readKeymap=lambda filename: None)
+
+tmp = tempfile.mkdtemp(prefix="test_plugin_manifest_")
+
+import Tools.Directories
+Tools.Directories.defaultPaths[Tools.Directories.SCOPE_CONFIG] = (tmp + "/", Tools.Directories.PATH_DONTCREATE)
+
+import Plugins.Extensions
+from Components.PluginComponent import LazyPluginFunction, PluginComponent
+from Plugins.Plugin import PluginDescriptor
+
+PLUGINS = {
+	"LazyTest": """from Plugins.Plugin import PluginDescriptor
+calls = []
+
+
+def eventinfo(session, eventName="", **kwargs):
+	calls.append(("eventinfo", session))
+
+
+def selectedevent(session, selectedevent, **kwargs):
+	calls.append(("selectedevent", session))
+
+
+def extension(session, **kwargs):
+	calls.append(("extension", session))
+
+
+def Plugins(**kwargs):
+	return [
+		PluginDescriptor(name="Lazy event info", where=PluginDescriptor.WHERE_EVENTINFO, fnc=eventinfo),
+		PluginDescriptor(name="Lazy selected event", where=PluginDescriptor.WHERE_EVENTINFO, fnc=selectedevent),
+		PluginDescriptor(name="Lazy extension", where=PluginDescriptor.WHERE_EXTENSIONSMENU, fnc=extension)
+	]
+""",
+	"ConfigTest": """from Components.config import config, ConfigSubsection
+from Plugins.Plugin import PluginDescriptor
+config.configtest = ConfigSubsection()
+
+
+def Plugins(**kwargs):
+	return PluginDescriptor(name="Configured", where=PluginDescriptor.WHERE_PLUGINMENU, fnc=lambda session, **kwargs: None)
+"""
+}
+
+pluginDirectory = os.path.join(tmp, "Plugins")
+os.makedirs(os.path.join(pluginDirectory, "Extensions"))
+for name, source in PLUGINS.items():
+	os.makedirs(os.path.join(pluginDirectory, "Extensions", name))
+	open(os.path.join(pluginDirectory, "Extensions", name, "__init__.py"), "w").close()
+	with open(os.path.join(pluginDirectory, "Extensions", name, "plugin.py"), "w") as fd:
+		fd.write(source)
+Plugins.Extensions.__path__.append(os.path.join(pluginDirectory, "Extensions"))
+
+
+def forgetPlugins():
+	for name in list(sys.modules):
+		if name.startswith(("Plugins.Extensions.LazyTest", "Plugins.Extensions.ConfigTest")):
+			del sys.modules[name]
+
+
+def test_plugin_manifest():
+	# the first boot imports the plugins and writes the manifest
+	PluginComponent().readPluginList(pluginDirectory)
+	if not os.path.isfile(os.path.join(tmp, "pluginmanifest.json")):
+		raise tests.TestError("no manifest written")
+	forgetPlugins()
+
+	# the next boot builds the lazy plugins from the manifest
+	plugins = PluginComponent()
+	plugins.readPluginList(pluginDirectory)
+	if "Plugins.Extensions.LazyTest.plugin" in sys.modules:
+		raise tests.TestError("lazy plugin imported at boot")
+	if "Plugins.Extensions.ConfigTest.plugin" not in sys.modules:
+		raise tests.TestError("plugin adding config not imported at boot")
+
+	eventinfo = plugins.getPlugins(PluginDescriptor.WHERE_EVENTINFO)
+	if not all(isinstance(p.fnc, LazyPluginFunction) for p in eventinfo):
+		raise tests.TestError("event info plugins not lazy")
+
+	# the plugin lists of EventView and EpgSelection
+	eventView = [p for p in eventinfo if 'servicelist' not in p.fnc.__code__.co_varnames if 'selectedevent' not in p.fnc.__code__.co_varnames]
+	epgSelection = [p for p in eventinfo if 'selectedevent' in p.fnc.__code__.co_varnames]
+	if [p.name for p in eventView] != ["Lazy event info"] or [p.name for p in epgSelection] != ["Lazy selected event"]:
+		raise tests.TestError(f"wrong event info lists {[p.name for p in eventView]} {[p.name for p in epgSelection]}")
+
+	# the extension list of InfoBarPlugins
+	extensions = [p for p in plugins.getPlugins(PluginDescriptor.WHERE_EXTENSIONSMENU) if len(inspect.getfullargspec(p.fnc)[0]) == 1]
+	if [p.name for p in extensions] != ["Lazy extension"]:
+		raise tests.TestError(f"wrong extension list {[p.name for p in extensions]}")
+
+	if "Plugins.Extensions.LazyTest.plugin" in sys.modules:
+		raise tests.TestError("lazy plugin imported by listing it")
+
+	eventView[0](session="session")
+	extensions[0](session="session")
+	calls = sys.modules["Plugins.Extensions.LazyTest.plugin"].calls
+	if calls != [("eventinfo", "session"), ("extension", "session")]:
+		raise tests.TestError(f"wrong calls {calls}")
+
+
+test_plugin_manifest()
+print("[test_plugin_manifest] passed")
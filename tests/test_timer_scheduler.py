@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+import sys
+import time
+import types
+
+import tests
+
+# benchmark and test for the activation queue of timer.Timer, run with
+# PYTHONPATH=.:..:../lib/python/ python test_timer_scheduler.py
+#
+# timer.py only needs eTimer from enigma, so instead of the fake enigma module of
+# the other tests, which imports half of the tree, a minimal one with a virtual
+# clock is installed before timer is imported.
+
+clock = [1192917600.0]
+time.time = lambda: clock[0]
+
+timers = set()
+
+
+class eTimer:
+	def __init__(self):
+		self.callback = []
+		self.next_activation = None
+
+	def start(self, msec, singleshot=False):
+		self.next_activation = time.time() + msec / 1000.0
+		self.msec = msec
+		self.singleshot = singleshot
+		timers.add(self)
+
+	def stop(self):
+		timers.discard(self)
+
+	def isActive(self):
+		return self in timers
+
+	def do(self):
+		if self.singleshot:
+			self.stop()
+		else:
+			self.next_activation += self.msec / 1000.0
+		for f in self.callback[:]:
+			f()
+
+
+def run(duration):
+	end = time.time() + duration
+	while timers:
+		next_timer = min(timers, key=lambda x: x.next_activation)
+		if next_timer.next_activation > end:
+			break
+		clock[0] = max(clock[0], next_timer.next_activation)
+		next_timer.do()
+	clock[0] = max(clock[0], end)
+
+
+enigma = types.ModuleType("enigma")
+enigma.eTimer = eTimer
+sys.modules["enigma"] = enigma
+
+import timer
+
+
+class BenchTimerEntry(timer.TimerEntry):
+	def activate(self):
+		return True
+
+	def getNextActivation(self):
+		if self.state == self.StateEnded:
+			return self.end
+		return {self.StatePrepared: self.begin - self.prepare_time,
+				self.StateRunning: self.begin,
+				self.StateEnded: self.end}[self.state + 1]
+
+
+def test_timer_scheduler(entries=10000, timer_length=600, sim_length=86400):
+	at = time.time()
+
+	t = timer.Timer()
+	t.MaxWaitTime = 86400 * 1000
+
+	# spread the entries over the simulated period, several of them overlapping
+	for x in range(entries):
+		begin = int(at + 60 + (x * sim_length) // entries)
+		t.addTimerEntry(BenchTimerEntry(begin, begin + timer_length), noRecalc=1)
+	t.calcNextActivation()
+
+	cpu = time.process_time()
+
+	# run virtual environment
+	run(sim_length + timer_length + 3600)
+
+	cpu = time.process_time() - cpu
+	print(f"[test_timer_scheduler] {entries} entries processed in {cpu:f}s cpu, {cpu * 1000000 / entries:f}us per entry")
+
+	if t.timer_list or len(t.processed_timers) != entries:
+		raise tests.TestError(f"{len(t.timer_list)} entries left, {len(t.processed_timers)} processed")
+
+	for x in t.processed_timers:
+		if x.state != timer.TimerEntry.StateEnded:
+			raise tests.TestError(f"entry {x.begin - at} not ended")
+
+
+def test_timer_moved_without_timechanged():
+	# an entry deep in the queue that is moved earlier behind the back of the timer
+	# must still be activated by the next MaxWaitTime poll
+	at = time.time()
+
+	t = timer.Timer()
+	t.MaxWaitTime = 100
+	for x in range(10):
+		begin = int(at + 3600 + x * 600)
+		t.addTimerEntry(BenchTimerEntry(begin, begin + 600), noRecalc=1)
+	t.calcNextActivation()
+
+	moved = t.timer_list[-1]
+	moved.begin = int(at + 600)
+	moved.end = moved.begin + 60
+
+	run(900)
+
+	if moved.state != timer.TimerEntry.StateEnded:
+		raise tests.TestError(f"moved entry in state {moved.state} instead of ended")
+	t.timer.stop()
+
+
+test_timer_moved_without_timechanged()
+test_timer_scheduler()
+print("[test_timer_scheduler] passed")